@@ -0,0 +1,72 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+"""Measures the Python overhead of calling a hybridized HybridBlock.
+
+A stack of tiny Dense layers is run with batch size 1, so that the time per call
+is dominated by the frontend rather than by the operators. The time spent on
+collecting the parameter arrays the way `_call_cached_op` used to, by calling
+`Parameter.data()` for every parameter, is reported alongside.
+"""
+import argparse
+import timeit
+
+import mxnet as mx
+from mxnet import gluon
+
+
+def build_net(num_layers, units, ctx):
+    net = gluon.nn.HybridSequential()
+    for _ in range(num_layers):
+        net.add(gluon.nn.Dense(units, in_units=units))
+    net.initialize(ctx=ctx)
+    return net
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--num-layers', type=int, default=200,
+                        help='number of Dense layers, each with 2 parameters')
+    parser.add_argument('--units', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=1000)
+    parser.add_argument('--static-alloc', action='store_true')
+    parser.add_argument('--gpu', action='store_true')
+    args = parser.parse_args()
+
+    ctx = mx.gpu() if args.gpu else mx.cpu()
+    net = build_net(args.num_layers, args.units, ctx)
+    net.hybridize(static_alloc=args.static_alloc, static_shape=args.static_alloc)
+    x = mx.nd.ones((1, args.units), ctx=ctx)
+    net(x).wait_to_read()
+    params = list(net.collect_params().values())
+
+    def forward():
+        net(x)
+
+    def collect_params():
+        with ctx:
+            [p.data() for p in params]
+
+    print('{} parameters, batch size 1, {}'.format(len(params), ctx))
+    for name, func in [('forward', forward), ('Parameter.data() per parameter', collect_params)]:
+        elapsed = timeit.timeit(func, number=args.repeat)
+        mx.nd.waitall()
+        print('{:<32}{:>10.1f} us/call'.format(name, elapsed / args.repeat * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -45,7 +45,7 @@ from ..base import (_NP_OP_PREFIX, _NP_OP_SUBMODULE_LIST, _NP_EXT_OP_PREFIX,
                     _NP_EXT_OP_SUBMODULE_LIST, _NP_INTERNAL_OP_PREFIX,
                     c_str_array, SymbolHandle, check_call, _LIB, mx_uint, c_array_buf)
 from .. import optimizer as opt
-from .loss_scaler import LossScaler
+from .loss_scaler import LossScaler, AsyncLossScaler
 from ..operator import get_all_registered_operators_grouped
 
 bfloat16 = np.dtype([('bfloat16', np.uint16)])
@@ -290,6 +290,18 @@ _loss_scaler = None
 def scale_loss(loss, optimizer_or_trainer):
     assert optimizer_or_trainer._amp_loss_scaler is not None, \
         'Loss scaler is not initialized, did you forget to call amp.init_trainer()?'
+    loss_scaler = optimizer_or_trainer._amp_loss_scaler
+    if isinstance(loss_scaler, AsyncLossScaler):
+        # the loss scale is divided out of the gradients on device, in Trainer.update
+        optimizer_or_trainer._scale = optimizer_or_trainer._amp_original_scale
+        def _scale(l):
+            scale = loss_scaler.scale(l.context)
+            return l * (scale.as_np_ndarray() if isinstance(l, numpy.ndarray) else scale)
+        if isinstance(loss, (list, tuple)):
+            yield [_scale(l) for l in loss]
+        else:
+            yield _scale(loss)
+        return
     optimizer_or_trainer._scale = (optimizer_or_trainer._amp_original_scale /
                                    optimizer_or_trainer._amp_loss_scaler.loss_scale)
     if isinstance(loss, (list, tuple)):
@@ -371,19 +383,33 @@ def init(target_dtype='float16', target_precision_ops=None,
                                    get_fun, target_precision_ops, conditional_fp32_ops, fp32_ops)
             _wrap_loss_output_functions(module, _loss_scaler, target_dtype)
 
-def init_trainer(optimizer_or_trainer):
+def init_trainer(optimizer_or_trainer, async_loss_scale=False):
     """Initialize trainer or optimizer to work with AMP dynamic loss scaling.
 
     Parameters
     ----------
     optimizer_or_trainer : Optimizer or Trainer
         MXNet Optimizer or Gluon trainer to initialize with AMP
+    async_loss_scale : bool, default False
+        If True, the loss scale and the overflow check stay on device, and an update
+        is skipped inside the optimizer kernels instead of by the trainer, so that
+        training steps do not wait for the gradients to be checked. This requires an
+        optimizer whose fused update takes `rescale_grad` as an NDArray, currently
+        AdamW with `use_fused_step=True`. Reading `amp_loss_scale` blocks in this mode.
     """
     global _amp_loss_scale_initialized
     global _amp_initialized
     global _loss_scaler
     assert _amp_initialized, "AMP not initialized, did you forget to call amp.init()?"
-    if not _amp_loss_scale_initialized:
+    if async_loss_scale:
+        if isinstance(optimizer_or_trainer, trainer.Trainer):
+            optimizer = optimizer_or_trainer._optimizer
+            if not (isinstance(optimizer, opt.AdamW) and optimizer.use_fused_step):
+                raise ValueError("async_loss_scale requires an optimizer whose fused update "
+                                 "takes rescale_grad as an NDArray, e.g. AdamW with "
+                                 "use_fused_step=True, got %s" % type(optimizer).__name__)
+        loss_scaler = AsyncLossScaler()
+    elif not _amp_loss_scale_initialized:
         _amp_loss_scale_initialized = True
         loss_scaler = _loss_scaler
     else:
@@ -409,6 +435,10 @@ def unscale(optimizer_or_trainer):
         MXNet optimizer or Gluon Trainer used when scaling the gradients
     """
     if isinstance(optimizer_or_trainer, trainer.Trainer):
+        if isinstance(getattr(optimizer_or_trainer, '_amp_loss_scaler', None), AsyncLossScaler):
+            raise TypeError("unscale is not supported with async_loss_scale, since the "
+                            "gradients are unscaled inside the optimizer. Use "
+                            "Trainer(max_grad_norm=...) to clip them.")
         valid_grads = [p._grad for p in optimizer_or_trainer._params if p._grad is not None]
         for grads in valid_grads:
             # TODO(ptredak): make a bulked unscale
@@ -42,8 +42,9 @@ class LossScaler(object):
     def loss_scale(self):
         return self._loss_scale
 
-    def has_overflow(self, params):
-        """Check gradients for overflow."""
+    def _all_finite(self, params):
+        """Checks on device that all gradients are finite. Returns an array of shape (1,)
+        that holds 1 if they are and 0 otherwise."""
         if is_np_array():
             all_finite_f = ndarray.numpy._internal.multi_all_finite
             ones_f = ndarray.numpy.ones
@@ -59,7 +60,11 @@ class LossScaler(object):
                 all_finite_f(*valid_params[idx:idx+chunk_size],
                              num_arrays=len(valid_params[idx:idx+chunk_size]),
                              init_output=False, out=gpu_output)
-        has_overflow = not bool(gpu_output.asnumpy())
+        return gpu_output
+
+    def has_overflow(self, params):
+        """Check gradients for overflow."""
+        has_overflow = not bool(self._all_finite(params).asnumpy())
         self._loss_scale = self._next_loss_scale
         if has_overflow:
             self._next_loss_scale = self._loss_scale / 2.
@@ -72,3 +77,62 @@ class LossScaler(object):
             self._next_loss_scale = min(self._max_loss_scale, self._loss_scale * 2.)
             logging.info("AMP: increasing loss scale to %f", self._next_loss_scale)
         return has_overflow
+
+
+class AsyncLossScaler(LossScaler):
+    """Dynamic loss scaler that keeps the loss scale and the overflow check on device.
+
+    Instead of returning the overflow flag to the host, `rescale_grad` folds it into the
+    gradient rescaling factor passed to the optimizer, which is 0 on overflow. Optimizers
+    whose fused update reads this factor from an NDArray skip the update when it is 0,
+    so a training step never waits for its gradients to be checked.
+
+    Properties
+    ----------
+    loss_scale : float
+        The current loss scale. Reading it blocks until the previous steps are done.
+    """
+    def __init__(self):
+        super(AsyncLossScaler, self).__init__()
+        self._scales = {}
+        self._unskipped_nd = None
+
+    @property
+    def loss_scale(self):
+        if not self._scales:
+            return self._loss_scale
+        return next(iter(self._scales.values())).asscalar()
+
+    def scale(self, ctx):
+        """Returns the loss scale on `ctx`, as an NDArray of shape (1,)."""
+        if not self._scales:
+            self._scales[ctx] = ndarray.full((1,), self._loss_scale, ctx=ctx)
+            self._unskipped_nd = ndarray.zeros((1,), ctx=ctx)
+        elif ctx not in self._scales:
+            self._scales[ctx] = next(iter(self._scales.values())).as_in_context(ctx)
+        return self._scales[ctx]
+
+    def rescale_grad(self, params, rescale_grad):
+        """Returns `rescale_grad` divided by the loss scale, or 0 if any gradient
+        overflowed, as an NDArray of shape (1,). Also updates the loss scale for the
+        next step. Nothing is read back to the host."""
+        if is_np_array():
+            is_finite = self._all_finite(params).as_nd_ndarray()
+        else:
+            is_finite = self._all_finite(params)
+        loss_scale = self.scale(is_finite.context)
+        with ag.pause():
+            out = ndarray.where(is_finite, rescale_grad / loss_scale,
+                                ndarray.zeros_like(loss_scale))
+            unskipped = (self._unskipped_nd.as_in_context(is_finite.context) + 1) * is_finite
+            grow = unskipped == self._scale_seq_len
+            next_scale = ndarray.where(
+                is_finite,
+                ndarray.where(grow, ndarray.minimum(loss_scale * 2., self._max_loss_scale),
+                              loss_scale),
+                loss_scale / 2.)
+            unskipped = unskipped * (1 - grow)
+            unskipped.copyto(self._unskipped_nd)
+            for scale in self._scales.values():
+                next_scale.copyto(scale)
+        return out
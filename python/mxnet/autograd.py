@@ -242,6 +242,39 @@ def _parse_head(heads, head_grads):
     return head_handles, hgrad_handles
 
 
+# functions called with the heads of each backward pass
+_BACKWARD_HOOKS = []
+
+
+def _register_backward_hook(hook):
+    """Registers `hook(heads)` to be called by `backward` and `NDArray.backward`.
+
+    The hook is called before the backward pass and may return a callback, which is
+    called with ``True`` after all operators of the pass have been pushed to the engine,
+    or with ``False`` if the pass failed. Operators pushed by the callback that read
+    the gradients start as soon as each gradient is written, while the rest of the
+    backward pass is still running.
+    """
+    _BACKWARD_HOOKS.append(hook)
+
+
+def _remove_backward_hook(hook):
+    """Removes a hook registered by `_register_backward_hook`."""
+    if hook in _BACKWARD_HOOKS:
+        _BACKWARD_HOOKS.remove(hook)
+
+
+def _run_backward_hooks(heads):
+    """Calls the hooks before a backward pass and returns their callbacks."""
+    callbacks = [hook(heads) for hook in list(_BACKWARD_HOOKS)]
+    return [callback for callback in callbacks if callback is not None]
+
+
+def _run_backward_callbacks(callbacks, done):
+    for callback in callbacks:
+        callback(done)
+
+
 def backward(heads, head_grads=None, retain_graph=False, train_mode=True): #pylint: disable=redefined-outer-name
     """Compute the gradients of heads w.r.t previously marked variables.
 
@@ -256,17 +289,25 @@ def backward(heads, head_grads=None, retain_graph=False, train_mode=True): #pyli
     """
     head_handles, hgrad_handles = _parse_head(heads, head_grads)
 
-    check_call(_LIB.MXAutogradBackwardEx(
-        len(head_handles),
-        head_handles,
-        hgrad_handles,
-        0,
-        ctypes.c_void_p(0),
-        ctypes.c_int(retain_graph),
-        ctypes.c_int(0),
-        ctypes.c_int(train_mode),
-        ctypes.c_void_p(0),
-        ctypes.c_void_p(0)))
+    callbacks = []
+    if _BACKWARD_HOOKS:
+        callbacks = _run_backward_hooks([heads] if isinstance(heads, NDArray) else heads)
+    try:
+        check_call(_LIB.MXAutogradBackwardEx(
+            len(head_handles),
+            head_handles,
+            hgrad_handles,
+            0,
+            ctypes.c_void_p(0),
+            ctypes.c_int(retain_graph),
+            ctypes.c_int(0),
+            ctypes.c_int(train_mode),
+            ctypes.c_void_p(0),
+            ctypes.c_void_p(0)))
+    except:  # pylint: disable=bare-except
+        _run_backward_callbacks(callbacks, False)
+        raise
+    _run_backward_callbacks(callbacks, True)
 
 
 def grad(heads, variables, head_grads=None, retain_graph=None, create_graph=False,
@@ -20,6 +20,8 @@ import abc
 import ctypes
 import logging
 import os
+import queue
+import threading
 import warnings
 import numpy as np
 import mxnet as mx
@@ -160,6 +162,16 @@ def _quantize_symbol(sym, ctx, excluded_symbols=None, excluded_operators=None,
     return Symbol(out), calib_layers
 
 
+def _histogram(arr, num_bins, hist_range):
+    """Computes the histogram of `arr` on its own device if it is an NDArray."""
+    if not isinstance(arr, ndarray.NDArray):
+        return np.histogram(arr, bins=num_bins, range=hist_range)
+    if hist_range[0] == hist_range[1]:
+        # same as numpy, which cannot split an empty range into bins
+        hist_range = (hist_range[0] - 0.5, hist_range[1] + 0.5)
+    return ndarray.histogram(arr, bins=num_bins, range=hist_range)
+
+
 class CalibrationCollector(object):
     """Base class for all other collectors used with quantization"""
     __metaclass__ = abc.ABCMeta
@@ -194,32 +206,75 @@ class _LayerHistogramCollector(CalibrationCollector):
     """Saves layer histogram in a dict with layer names as keys and lists of NDArrays as
     values. The collected histogram will be used for calculating the optimal thresholds for
     quantization using KL divergence.
+
+    The min/max values and the histograms are computed by operators running on the device
+    of the layer outputs, so only the histograms are copied to the host. If `async_collect`
+    is True, the histograms are accumulated by a background thread, so that the forward
+    passes of the calibration batches do not wait for the min/max values of each layer.
     """
-    def __init__(self, quantized_dtype, num_bins=8001, include_layers=None, logger=None):
+    def __init__(self, quantized_dtype, num_bins=8001, include_layers=None, logger=None,
+                 async_collect=False):
         super(_LayerHistogramCollector, self).__init__()
         self.hist_dict = {}
         self.num_bins = num_bins
         self.include_layers = include_layers
         self.logger = logger
         self.quantized_dtype = quantized_dtype
+        self.async_collect = async_collect
+        self._queue = None
+        self._worker = None
+        self._worker_error = None
 
     def collect(self, name, op_name, arr):
         """Callback function for collecting layer output NDArrays."""
         if name not in self.include_layers:
             return
-        arr = arr.copyto(cpu()).asnumpy()
         if self.logger:
             self.logger.debug("Collecting layer %s histogram of shape %s" % (name, arr.shape))
-        min_range = np.min(arr)
-        max_range = np.max(arr)
+        if not np.issubdtype(arr.dtype, np.floating):
+            arr = arr.astype('float32')
+        min_max = ndarray.concat(ndarray.min(arr).reshape((1,)), ndarray.max(arr).reshape((1,)),
+                                 dim=0)
+        if not self.async_collect:
+            self._update_histogram(name, arr, min_max)
+            return
+        if self._worker is None:
+            # at most the outputs of one forward pass wait for the background thread
+            self._queue = queue.Queue(maxsize=len(self.include_layers))
+            self._worker = threading.Thread(target=self._worker_loop, daemon=True)
+            self._worker.start()
+        # arr is overwritten by the next forward pass, so the queue holds a copy of it
+        self._queue.put((name, arr.copy(), min_max))
+
+    def _worker_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._worker_error is not None:
+                continue
+            try:
+                self._update_histogram(*item)
+            except Exception as e:  # pylint: disable=broad-except
+                self._worker_error = e
+
+    def _update_histogram(self, name, arr, min_max):
+        min_range, max_range = min_max.asnumpy().tolist()
         th = max(abs(min_range), abs(max_range))
         if name in self.hist_dict:
             self.hist_dict[name] = self.combine_histogram(self.hist_dict[name], arr, min_range, max_range, th)
         else:
-            hist, hist_edges = np.histogram(arr, bins=self.num_bins, range=(-th, th))
+            hist, hist_edges = _histogram(arr, self.num_bins, (-th, th))
             self.hist_dict[name] = (hist, hist_edges, min_range, max_range, th)
 
     def post_collect(self):
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
+            if self._worker_error is not None:
+                error, self._worker_error = self._worker_error, None
+                raise error
         min_max_dict = self.get_optimal_thresholds(self.hist_dict, self.quantized_dtype, logger=self.logger)
         return min_max_dict
 
@@ -229,7 +284,7 @@ class _LayerHistogramCollector(CalibrationCollector):
         """
         (old_hist, old_hist_edges, old_min, old_max, old_th) = old_hist
         if new_th <= old_th:
-            hist, _ = np.histogram(arr, bins=len(old_hist), range=(-old_th, old_th))
+            hist, _ = _histogram(arr, len(old_hist), (-old_th, old_th))
             return (old_hist + hist, old_hist_edges, min(old_min, new_min), max(old_max, new_max), old_th)
         else:
             # Need to generate new histogram with new_th
@@ -238,7 +293,7 @@ class _LayerHistogramCollector(CalibrationCollector):
             half_increased_bins = int((new_th - old_th) // old_step + 1)
             new_num_bins = half_increased_bins * 2 + old_num_bins
             new_th = half_increased_bins * old_step + old_th
-            hist, hist_edges = np.histogram(arr, bins=new_num_bins, range=(-new_th, new_th))
+            hist, hist_edges = _histogram(arr, new_num_bins, (-new_th, new_th))
             hist[half_increased_bins:new_num_bins - half_increased_bins] += old_hist
             return (hist, hist_edges, min(old_min, new_min), max(old_max, new_max), new_th)
 
@@ -251,21 +306,35 @@ class _LayerHistogramCollector(CalibrationCollector):
 
         Ref: http://on-demand.gputechconf.com/gtc/2017/presentation/s7310-8-bit-inference-with-tensorrt.pdf
         """
+        min_val, max_val, threshold, divergence = \
+            _LayerHistogramCollector._calibrate_entropy(hist_data, quantized_dtype, num_quantized_bins)
+        threshold = threshold.asnumpy()
+        divergence = divergence.asnumpy()
+        return min_val, max_val, threshold, divergence
+    # pylint: enable=line-too-long
+
+    @staticmethod
+    def _calibrate_entropy(hist_data, quantized_dtype, num_quantized_bins):
+        """Pushes the threshold search of `get_optimal_threshold` to the engine without waiting
+        for its result."""
         (hist, hist_edges, min_val, max_val, _) = hist_data
         num_bins = len(hist)
         assert (num_bins % 2 == 1)
         if min_val >= 0 and quantized_dtype in ['auto', 'uint8']:
             # We need to move negative bins to positive bins to fit uint8 range.
             num_quantized_bins = num_quantized_bins * 2 + 1
-        hist = ndarray.array(hist, ctx=cpu())
-        hist_edges = ndarray.array(hist_edges, ctx=cpu())
+        if isinstance(hist, ndarray.NDArray):
+            hist = hist.as_in_context(cpu()).astype('float32')
+        else:
+            hist = ndarray.array(hist, ctx=cpu(), dtype='float32')
+        if isinstance(hist_edges, ndarray.NDArray):
+            hist_edges = hist_edges.as_in_context(cpu()).astype('float32')
+        else:
+            hist_edges = ndarray.array(hist_edges, ctx=cpu(), dtype='float32')
         threshold, divergence = ndarray.contrib.calibrate_entropy(hist=hist,
                                                                   hist_edges=hist_edges,
                                                                   num_quantized_bins=num_quantized_bins)
-        threshold = threshold.asnumpy()
-        divergence = divergence.asnumpy()
         return min_val, max_val, threshold, divergence
-    # pylint: enable=line-too-long
 
     @staticmethod
     def get_optimal_thresholds(hist_dict, quantized_dtype, num_quantized_bins=255, logger=None):
@@ -274,20 +343,26 @@ class _LayerHistogramCollector(CalibrationCollector):
         if logger is not None:
             logger.info('Calculating optimal thresholds for quantization using KL divergence'
                         ' with num_quantized_bins=%d' % num_quantized_bins)
-        th_dict = {}
         # copy hist_dict keys since the keys() only returns a view in python3
         layer_names = list(hist_dict.keys())
+        # the searches of all layers are pushed before waiting for any of them,
+        # so that the engine can run them in parallel
+        results = {}
         for name in layer_names:
             assert name in hist_dict
-            min_val, max_val, th, divergence = \
-                _LayerHistogramCollector.get_optimal_threshold(hist_dict[name], quantized_dtype,
-                                                               num_quantized_bins=num_quantized_bins)
+            results[name] = _LayerHistogramCollector._calibrate_entropy(
+                hist_dict[name], quantized_dtype, num_quantized_bins)
+            del hist_dict[name]  # release the memory
+        th_dict = {}
+        for name in layer_names:
+            min_val, max_val, th, divergence = results.pop(name)
+            th = th.asnumpy()
             if min_val >= 0 and quantized_dtype in ['auto', 'uint8']:
                 th_dict[name] = (0, th)
             else:
                 th_dict[name] = (-th, th)
-            del hist_dict[name]  # release the memory
             if logger:
+                divergence = divergence.asnumpy()
                 logger.debug(f"layer={name}, min_val={min_val}, max_val={max_val}, th={th}, divergence={divergence}")
         return th_dict
 
@@ -319,6 +394,145 @@ class _LayerOutputMinMaxCollector(CalibrationCollector):
             self.logger.debug("Collecting layer %s min_range=%f, max_range=%f"
                               % (name, min_range, max_range))
 
+class PercentileCollector(CalibrationCollector):
+    """Saves a fixed-size sketch of the magnitudes of each layer output and uses a percentile
+    of them as the threshold for quantization.
+
+    The sketch of a layer is a histogram of ``log2(abs(x))`` with `num_bins` bins over the fixed
+    range ``[-24, 24]``, along with the min and max values of the layer. It takes the same memory
+    regardless of the amount of calibration data, is updated by operators on the device of the
+    layer outputs without waiting for them, and estimates any percentile with a relative error
+    of at most ``2 ** (48 / num_bins) - 1``. Sketches of the same layer are merged by addition,
+    so the calibration dataset can be split across processes whose collectors are saved with
+    `save` and combined with `load` or `merge`.
+
+    Parameters
+    ----------
+    quantized_dtype : str
+        The quantized destination type, 'int8', 'uint8' or 'auto'.
+    percentile : float, default 99.99
+        The percentile of the magnitudes of a layer output used as its threshold.
+    num_bins : int, default 8192
+        Number of bins of the sketch of each layer.
+    include_layers : list of str, default None
+        Names of the layers to calibrate.
+    logger : Object, default None
+        A logging object for printing information during calibration.
+    """
+    LOG2_RANGE = (-24., 24.)
+
+    def __init__(self, quantized_dtype='auto', percentile=99.99, num_bins=8192,
+                 include_layers=None, logger=None):
+        super(PercentileCollector, self).__init__()
+        if not 0 < percentile <= 100:
+            raise ValueError('percentile must be in (0, 100], but got %s' % str(percentile))
+        self.quantized_dtype = quantized_dtype
+        self.percentile = percentile
+        self.num_bins = num_bins
+        self.include_layers = include_layers
+        self.logger = logger
+        self.sketch_dict = {}
+
+    def collect(self, name, op_name, arr):
+        """Callback function for updating the sketch of a layer with an NDArray."""
+        if name not in self.include_layers:
+            return
+        if self.logger:
+            self.logger.debug("Collecting layer %s sketch of shape %s" % (name, arr.shape))
+        if not np.issubdtype(arr.dtype, np.floating):
+            arr = arr.astype('float32')
+        low, high = self.LOG2_RANGE
+        # magnitudes out of range, including zeros, fall into the first or the last bin
+        log_abs = ndarray.clip(ndarray.log2(ndarray.abs(arr)), low, high)
+        hist, _ = ndarray.histogram(log_abs, bins=self.num_bins, range=self.LOG2_RANGE)
+        self._merge_sketch(name, (hist, ndarray.min(arr), ndarray.max(arr)))
+
+    def _merge_sketch(self, name, sketch):
+        hist, min_val, max_val = sketch
+        if hist.shape[0] != self.num_bins:
+            raise ValueError('Cannot merge a sketch of %d bins into a collector of %d bins'
+                             % (hist.shape[0], self.num_bins))
+        if name not in self.sketch_dict:
+            self.sketch_dict[name] = (hist, min_val, max_val)
+            return
+        cur_hist, cur_min, cur_max = self.sketch_dict[name]
+        ctx = cur_hist.context
+        self.sketch_dict[name] = (cur_hist + hist.as_in_context(ctx),
+                                  ndarray.minimum(cur_min, min_val.as_in_context(ctx)),
+                                  ndarray.maximum(cur_max, max_val.as_in_context(ctx)))
+
+    def merge(self, other):
+        """Merges the sketches of another `PercentileCollector` into this one.
+
+        Parameters
+        ----------
+        other : PercentileCollector
+            A collector with the same `num_bins`.
+        """
+        for name, sketch in other.sketch_dict.items():
+            self._merge_sketch(name, sketch)
+
+    def save(self, fname):
+        """Saves the sketches of all layers to a file.
+
+        Parameters
+        ----------
+        fname : str
+            Path to the output file.
+        """
+        data = {}
+        for name, (hist, min_val, max_val) in self.sketch_dict.items():
+            data[name + ':hist'] = hist
+            data[name + ':min'] = min_val
+            data[name + ':max'] = max_val
+        ndarray.save(fname, data)
+
+    def load(self, fname):
+        """Merges the sketches saved by `save` into this collector.
+
+        Parameters
+        ----------
+        fname : str
+            Path to a file created by `save`.
+        """
+        data = ndarray.load(fname)
+        for key in data:
+            if key.endswith(':hist'):
+                name = key[:-len(':hist')]
+                self._merge_sketch(name, (data[key], data[name + ':min'], data[name + ':max']))
+
+    def get_threshold(self, name):
+        """Returns the min and max values of a layer and the estimated percentile of the
+        magnitudes of its outputs, capped by the largest magnitude."""
+        hist, min_val, max_val = self.sketch_dict[name]
+        hist = hist.asnumpy()
+        min_val, max_val = float(min_val.asscalar()), float(max_val.asscalar())
+        max_abs = max(abs(min_val), abs(max_val))
+        cumsum = np.cumsum(hist)
+        idx = min(int(np.searchsorted(cumsum, cumsum[-1] * self.percentile / 100.)),
+                  self.num_bins - 1)
+        # the upper edge of the bin, so that no value of the bin is clipped
+        low, high = self.LOG2_RANGE
+        th = 2 ** (low + (high - low) * (idx + 1) / self.num_bins)
+        return min_val, max_val, min(th, max_abs)
+
+    def post_collect(self):
+        if self.logger:
+            self.logger.info('Calculating thresholds for quantization using the %s-th percentile'
+                             % str(self.percentile))
+        th_dict = {}
+        for name in list(self.sketch_dict.keys()):
+            min_val, max_val, th = self.get_threshold(name)
+            if min_val >= 0 and self.quantized_dtype in ['auto', 'uint8']:
+                th_dict[name] = (0, th)
+            else:
+                th_dict[name] = (-th, th)
+            if self.logger:
+                self.logger.debug("layer=%s, min_val=%f, max_val=%f, th=%f"
+                                  % (name, min_val, max_val, th))
+        self.min_max_dict = th_dict
+        return th_dict
+
 def _calibrate_quantized_sym(qsym, min_max_dict):
     """Given a dictionary containing the thresholds for quantizing the layers,
     set the thresholds into the quantized symbol as the params of requantize operators.
@@ -573,7 +787,7 @@ def quantize_graph(sym, arg_params, aux_params, ctx=cpu(),
                    excluded_sym_names=None, excluded_op_names=None,
                    calib_mode='entropy', quantized_dtype='int8',
                    quantize_mode='full', quantize_granularity='tensor-wise',
-                   LayerOutputCollector=None, logger=None):
+                   LayerOutputCollector=None, logger=None, async_collect=False):
     """User-level API for generating a quantized model from a FP32 model w/o calibration
     and a collector for naive or entropy calibration.
     The backend quantized operators are only enabled for Linux systems. Please do not run
@@ -604,6 +818,9 @@ def quantize_graph(sym, arg_params, aux_params, ctx=cpu(),
         If calib_mode='entropy' (default mode), the thresholds for quantization will be
         derived such that the KL divergence between the distributions of FP32 layer outputs and
         quantized layer outputs is minimized based upon the calibration dataset.
+        If calib_mode='percentile', the thresholds for quantization will be the 99.99-th
+        percentile of the magnitudes of the layer outputs, estimated from fixed-size sketches
+        that can be saved and merged across processes. See `PercentileCollector`.
     quantized_dtype : str
         The quantized destination type for input data. Currently support 'int8'
         , 'uint8' and 'auto'. 'auto' means automatically select output type according to calibration result.
@@ -620,6 +837,9 @@ def quantize_graph(sym, arg_params, aux_params, ctx=cpu(),
         Passed object's include_layers attribute will be feed with names of layers which needs calibration
     logger : Object
         A logging object for printing information during the process of quantization.
+    async_collect : bool
+        If True and calib_mode='entropy', the layer output histograms are accumulated by
+        a background thread, overlapping with the forward passes on the calibration dataset.
     Returns
     -------
     quantized_model : tuple
@@ -653,7 +873,8 @@ def quantize_graph(sym, arg_params, aux_params, ctx=cpu(),
     if calib_mode is not None and calib_mode != 'none':
         if calib_mode == 'entropy':
             collector = _LayerHistogramCollector(quantized_dtype=quantized_dtype,
-                                                 include_layers=calib_layers, logger=logger)
+                                                 include_layers=calib_layers, logger=logger,
+                                                 async_collect=async_collect)
             if logger:
                 logger.info(
                     'Create a layer output collector for entropy calibration.')
@@ -663,6 +884,12 @@ def quantize_graph(sym, arg_params, aux_params, ctx=cpu(),
             if logger:
                 logger.info(
                     'Create a layer output minmax collector for naive calibration')
+        elif calib_mode == 'percentile':
+            collector = PercentileCollector(quantized_dtype=quantized_dtype,
+                                            include_layers=calib_layers, logger=logger)
+            if logger:
+                logger.info(
+                    'Create a layer output sketch collector for percentile calibration')
         elif calib_mode == 'custom' and LayerOutputCollector is not None:
             if not isinstance(LayerOutputCollector, CalibrationCollector):
                 raise ValueError('LayerOutputCollecotr must be a subclass of a CalibrationCollector class,'
@@ -681,7 +908,7 @@ def quantize_graph(sym, arg_params, aux_params, ctx=cpu(),
                     'Create a custom layer output minmax collector for calibration')
         else:
             raise ValueError('unknown calibration mode %s received,'
-                             ' expected `none`, `naive`, `entropy` or `custom`' % calib_mode)
+                             ' expected `none`, `naive`, `entropy`, `percentile` or `custom`' % calib_mode)
         if logger:
             logger.info('Collector created, please use set_monitor_callback'
                         ' to collect calibration information.')
@@ -720,6 +947,9 @@ def calib_graph(qsym, arg_params, aux_params, collector,
         If calib_mode='entropy' (default mode), the thresholds for quantization will be
         derived such that the KL divergence between the distributions of FP32 layer outputs and
         quantized layer outputs is minimized based upon the calibration dataset.
+        If calib_mode='percentile', the thresholds for quantization will be the 99.99-th
+        percentile of the magnitudes of the layer outputs, estimated from fixed-size sketches
+        that can be saved and merged across processes. See `PercentileCollector`.
     quantized_dtype : str
         The quantized destination type for input data. Currently support 'int8'
         , 'uint8' and 'auto'. 'auto' means automatically select output type according to calibration result.
@@ -733,15 +963,15 @@ def calib_graph(qsym, arg_params, aux_params, collector,
     """
     min_max_dict = {}
     if calib_mode is not None and calib_mode != 'none':
-        if calib_mode in ('entropy', 'naive', 'custom'):
+        if calib_mode in ('entropy', 'naive', 'percentile', 'custom'):
             min_max_dict = collector.post_collect()
 
         else:
             raise ValueError('unknown calibration mode %s received,'
-                             ' expected `none`, `naive`, `entropy` or `custom`' % calib_mode)
+                             ' expected `none`, `naive`, `entropy`, `percentile` or `custom`' % calib_mode)
         qsym = _calibrate_quantized_sym(qsym, min_max_dict)
     else:
-        raise ValueError('Please set calibration mode to naive, entropy or custom (with custom CalibrationCollector)')
+        raise ValueError('Please set calibration mode to naive, entropy, percentile or custom (with custom CalibrationCollector)')
 
     if logger:
         logger.info('Quantizing parameters')
@@ -755,7 +985,8 @@ def calib_graph(qsym, arg_params, aux_params, collector,
 def quantize_net(network, quantized_dtype='auto', quantize_mode='full', quantize_granularity='tensor-wise',
                  exclude_layers=None, exclude_layers_match=None, exclude_operators=None,
                  calib_data=None, data_shapes=None, calib_mode='none',
-                 num_calib_batches=None, ctx=cpu(), LayerOutputCollector=None, logger=None):
+                 num_calib_batches=None, ctx=cpu(), LayerOutputCollector=None, logger=None,
+                 async_collect=False):
     """User-level API for Gluon users to generate a quantized SymbolBlock from a FP32 HybridBlock w/ or w/o calibration.
     The backend quantized operators are only enabled for Linux systems. Please do not run
     inference using the quantized models on Windows for now.
@@ -797,6 +1028,9 @@ def quantize_net(network, quantized_dtype='auto', quantize_mode='full', quantize
         If calib_mode='entropy' (default mode), the thresholds for quantization will be
         derived such that the KL divergence between the distributions of FP32 layer outputs and
         quantized layer outputs is minimized based upon the calibration dataset.
+        If calib_mode='percentile', the thresholds for quantization will be the 99.99-th
+        percentile of the magnitudes of the layer outputs, estimated from fixed-size sketches
+        that can be saved and merged across processes. See `PercentileCollector`.
         If calib_mode='custom', the provided LayerOutputCollector will be used to determine
         the thresholds for quantization. For more information refer to CalibrationCollector
         documentation.
@@ -811,6 +1045,9 @@ def quantize_net(network, quantized_dtype='auto', quantize_mode='full', quantize
         Passed object's include_layers attribute will be feed with names of layers which needs calibration
     logger : Object
         A logging object for printing information during the process of quantization.
+    async_collect : bool
+        If True and calib_mode='entropy', the layer output histograms are accumulated by
+        a background thread, overlapping with the forward passes on the calibration dataset.
 
     Returns
     -------
@@ -901,7 +1138,7 @@ def quantize_net(network, quantized_dtype='auto', quantize_mode='full', quantize
         excluded_sym_names=exclude_layers, excluded_op_names=exclude_operators,
         calib_mode=calib_mode, quantized_dtype=quantized_dtype, quantize_mode=quantize_mode,
         quantize_granularity=quantize_granularity, LayerOutputCollector=LayerOutputCollector,
-        logger=logger)
+        logger=logger, async_collect=async_collect)
 
     if calib_mode is not None and calib_mode != 'none':
         if not isinstance(ctx, Context):
@@ -910,7 +1147,7 @@ def quantize_net(network, quantized_dtype='auto', quantize_mode='full', quantize
         if calib_data is None:
             raise ValueError(
                 'calib_data must be provided when calib_mode=%s' % calib_mode)
-        if calib_mode in ['naive', 'entropy', 'custom']:
+        if calib_mode in ['naive', 'entropy', 'percentile', 'custom']:
             inputs = [mx.sym.var(desc.name) for desc in data_descs]
             calib_net = SymbolBlock(symnet, inputs)
             calib_net.load_dict(params, cast_dtype=True, dtype_source='saved')
@@ -926,7 +1163,7 @@ def quantize_net(network, quantized_dtype='auto', quantize_mode='full', quantize
                 qsym=qsym, arg_params=args, aux_params=auxs, collector=collector,
                 calib_mode=calib_mode, logger=logger)
         else:
-            raise ValueError('calib_mode has to be one of: naive, entropy, custom')
+            raise ValueError('calib_mode has to be one of: naive, entropy, percentile, custom')
     elif calib_mode is not None and calib_mode == 'none':
         inputs = [mx.sym.var(desc.name) for desc in data_descs]
 
@@ -21,12 +21,15 @@
 
 """Text token embeddings."""
 
+import json
 import logging
 import os
 import tarfile
 import warnings
 import zipfile
 
+import numpy as np
+
 from . import _constants as C
 from . import vocab
 from ... import ndarray as nd
@@ -37,6 +40,134 @@ from ... import numpy as _mx_np
 from ... import numpy_extension as _mx_npx
 
 
+# Number of bytes of text parsed at a time when loading an embedding file.
+_PARSE_CHUNK_SIZE = 1 << 24
+
+
+def _embedding_cache_paths(pretrained_file_path):
+    return pretrained_file_path + '.npy', pretrained_file_path + '.vocab'
+
+
+def _parse_embedding_file(pretrained_file_path, elem_delim, encoding):
+    """Parses a pre-trained token embedding file.
+
+    The file is parsed in chunks of lines. The vectors of each chunk are converted by a single
+    call to `numpy.loadtxt` and written into a preallocated float32 matrix, whose first row is reserved for
+    the unknown token.
+
+    Returns
+    -------
+    tokens : list of str
+        The first-encountered tokens, excluding the header.
+    vecs : numpy.ndarray
+        The matrix of shape (len(tokens) + 1, vec_len), where row i + 1 is the vector of tokens[i].
+    """
+    # Upper bound of the number of vectors.
+    num_lines = 0
+    with open(pretrained_file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_PARSE_CHUNK_SIZE), b''):
+            num_lines += chunk.count(b'\n')
+    num_lines += 1
+
+    vec_len = None
+    vecs = None
+    tokens = []
+    seen = set()
+    line_num = 0
+    with open(pretrained_file_path, 'r', encoding=encoding) as f:
+        while True:
+            lines = f.readlines(_PARSE_CHUNK_SIZE)
+            if not lines:
+                break
+            chunk_elems = []
+            for line in lines:
+                line_num += 1
+                token, delim, elems = line.rstrip().partition(elem_delim)
+
+                assert delim, 'At line %d of the pre-trained text embedding file: the ' \
+                              'data format of the pre-trained token embedding file %s ' \
+                              'is unexpected.' % (line_num, pretrained_file_path)
+
+                num_elems = elems.count(elem_delim) + 1
+                if token in seen:
+                    warnings.warn('At line %d of the pre-trained token embedding file: the '
+                                  'embedding vector for token %s has been loaded and a duplicate '
+                                  'embedding for the  same token is seen and skipped.' %
+                                  (line_num, token))
+                elif num_elems == 1:
+                    warnings.warn('At line %d of the pre-trained text embedding file: token %s '
+                                  'with 1-dimensional vector %s is likely a header and is '
+                                  'skipped.' % (line_num, token, elems))
+                else:
+                    if vec_len is None:
+                        vec_len = num_elems
+                        vecs = np.zeros((num_lines + 1, vec_len), dtype=np.float32)
+                    else:
+                        assert num_elems == vec_len, \
+                            'At line %d of the pre-trained token embedding file: the dimension ' \
+                            'of token %s is %d but the dimension of previous tokens is %d. ' \
+                            'Dimensions of all the tokens must be the same.' \
+                            % (line_num, token, num_elems, vec_len)
+                    chunk_elems.append(elems)
+                    tokens.append(token)
+                    seen.add(token)
+            if not chunk_elems:
+                continue
+            start = len(tokens) - len(chunk_elems) + 1
+            end = len(tokens) + 1
+            if end > vecs.shape[0]:
+                vecs.resize((max(end, 2 * vecs.shape[0]), vec_len), refcheck=False)
+            try:
+                vecs[start:end] = np.loadtxt(chunk_elems, dtype=np.float32, delimiter=elem_delim,
+                                             comments=None, ndmin=2)
+            except ValueError as e:
+                raise ValueError('Failed to parse the vectors at lines %d to %d of the '
+                                 'pre-trained token embedding file %s: %s'
+                                 % (line_num - len(lines) + 1, line_num, pretrained_file_path, e))
+
+    assert vec_len is not None, 'The pre-trained token embedding file %s does not contain ' \
+                                'any embedding vector.' % pretrained_file_path
+    return tokens, vecs[:len(tokens) + 1]
+
+
+def _load_embedding_cache(pretrained_file_path, elem_delim, encoding):
+    """Returns the tokens and the memory-mapped vectors cached for a pre-trained token embedding
+    file, or None if there is no cache or it is older than the file."""
+    vecs_path, vocab_path = _embedding_cache_paths(pretrained_file_path)
+    try:
+        if min(os.path.getmtime(vecs_path), os.path.getmtime(vocab_path)) < \
+                os.path.getmtime(pretrained_file_path):
+            return None
+        with open(vocab_path, 'r', encoding='utf8', newline='\n') as f:
+            header = json.loads(f.readline())
+            if header != {'elem_delim': elem_delim, 'encoding': encoding}:
+                return None
+            tokens = f.read().split('\n')[:-1]
+        vecs = np.load(vecs_path, mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+    if vecs.ndim != 2 or vecs.shape[0] != len(tokens) + 1:
+        return None
+    return tokens, vecs
+
+
+def _save_embedding_cache(pretrained_file_path, elem_delim, encoding, tokens, vecs):
+    """Writes the parsed tokens and vectors next to the pre-trained token embedding file, so that
+    they can be memory-mapped the next time the file is loaded."""
+    vecs_path, vocab_path = _embedding_cache_paths(pretrained_file_path)
+    try:
+        np.save(vecs_path + '.tmp.npy', vecs)
+        with open(vocab_path + '.tmp', 'w', encoding='utf8', newline='\n') as f:
+            f.write(json.dumps({'elem_delim': elem_delim, 'encoding': encoding}) + '\n')
+            for token in tokens:
+                f.write(token + '\n')
+        os.replace(vecs_path + '.tmp.npy', vecs_path)
+        os.replace(vocab_path + '.tmp', vocab_path)
+    except OSError as e:
+        logging.warning('Failed to cache the pre-trained token embedding file %s: %s',
+                        pretrained_file_path, e)
+
+
 def register(embedding_cls):
     """Registers a new token embedding.
 
@@ -248,62 +379,40 @@ class _TokenEmbedding(vocab.Vocabulary):
             raise ValueError('`pretrained_file_path` must be a valid path to '
                              'the pre-trained token embedding file.')
 
-        logging.info('Loading pre-trained token embedding vectors from %s', pretrained_file_path)
-        vec_len = None
-        all_elems = []
-        tokens = set()
-        loaded_unknown_vec = None
-        line_num = 0
-        with open(pretrained_file_path, 'r', encoding=encoding) as f:
-            for line in f:
-                line_num += 1
-                elems = line.rstrip().split(elem_delim)
-
-                assert len(elems) > 1, 'At line %d of the pre-trained text embedding file: the ' \
-                                       'data format of the pre-trained token embedding file %s ' \
-                                       'is unexpected.' % (line_num, pretrained_file_path)
+        cached = _load_embedding_cache(pretrained_file_path, elem_delim, encoding)
+        if cached is not None:
+            logging.info('Loading pre-trained token embedding vectors from cache of %s',
+                         pretrained_file_path)
+            tokens, vecs = cached
+        else:
+            logging.info('Loading pre-trained token embedding vectors from %s',
+                         pretrained_file_path)
+            tokens, vecs = _parse_embedding_file(pretrained_file_path, elem_delim, encoding)
+            _save_embedding_cache(pretrained_file_path, elem_delim, encoding, tokens, vecs)
+
+        # Row 0 of `vecs` is reserved for the unknown token.
+        if self.unknown_token in tokens:
+            unknown_row = tokens.index(self.unknown_token) + 1
+            vecs = np.concatenate([vecs[unknown_row:unknown_row + 1], vecs[1:unknown_row],
+                                   vecs[unknown_row + 1:]])
+            tokens = tokens[:unknown_row - 1] + tokens[unknown_row:]
+            loaded_unknown_vec = True
+        else:
+            loaded_unknown_vec = False
 
-                token, elems = elems[0], [float(i) for i in elems[1:]]
+        offset = len(self._idx_to_token)
+        self._idx_to_token.extend(tokens)
+        for i, token in enumerate(tokens):
+            self._token_to_idx[token] = offset + i
 
-                if token == self.unknown_token and loaded_unknown_vec is None:
-                    loaded_unknown_vec = elems
-                    tokens.add(self.unknown_token)
-                elif token in tokens:
-                    warnings.warn('At line %d of the pre-trained token embedding file: the '
-                                  'embedding vector for token %s has been loaded and a duplicate '
-                                  'embedding for the  same token is seen and skipped.' %
-                                  (line_num, token))
-                elif len(elems) == 1:
-                    warnings.warn('At line %d of the pre-trained text embedding file: token %s '
-                                  'with 1-dimensional vector %s is likely a header and is '
-                                  'skipped.' % (line_num, token, elems))
-                else:
-                    if vec_len is None:
-                        vec_len = len(elems)
-                        # Reserve a vector slot for the unknown token at the very beggining because
-                        # the unknown index is 0.
-                        all_elems.extend([0] * vec_len)
-                    else:
-                        assert len(elems) == vec_len, \
-                            'At line %d of the pre-trained token embedding file: the dimension ' \
-                            'of token %s is %d but the dimension of previous tokens is %d. ' \
-                            'Dimensions of all the tokens must be the same.' \
-                            % (line_num, token, len(elems), vec_len)
-                    all_elems.extend(elems)
-                    self._idx_to_token.append(token)
-                    self._token_to_idx[token] = len(self._idx_to_token) - 1
-                    tokens.add(token)
-
-        self._vec_len = vec_len
+        self._vec_len = vecs.shape[1]
         array_fn = _mx_np.array if is_np_array() else nd.array
-        self._idx_to_vec = array_fn(all_elems).reshape((-1, self.vec_len))
+        self._idx_to_vec = array_fn(vecs)
 
-        if loaded_unknown_vec is None:
+        if not loaded_unknown_vec:
             init_val = init_unknown_vec(shape=self.vec_len)
             self._idx_to_vec[C.UNKNOWN_IDX] =\
                 init_val.as_np_ndarray() if is_np_array() else init_val
-        else:
-            self._idx_to_vec[C.UNKNOWN_IDX] = array_fn(loaded_unknown_vec)
 
     def _index_tokens_from_vocabulary(self, vocabulary):
         self._token_to_idx = vocabulary.token_to_idx.copy() \
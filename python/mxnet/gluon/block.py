@@ -20,11 +20,13 @@
 """Base container class for all neural network models."""
 __all__ = ['Block', 'HybridBlock', 'SymbolBlock']
 
+import bisect
 import copy
 import inspect
 import warnings
 import weakref
 from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import contextlib
 import contextvars
 
@@ -42,6 +44,7 @@ from .parameter import Parameter, DeferredInitializationError
 from .utils import _indent, _brief_print_list, HookHandle, shape_is_known
 from .utils import _check_same_symbol_type, _check_all_np_ndarrays
 from .. import numpy_extension as _mx_npx
+from ..numpy_extension.utils import _mmap_npz
 from .. import numpy as _mx_np, ndarray as nd
 from .. util import is_np_array, np_shape, np_array
 
@@ -200,6 +203,28 @@ def _regroup(args, fmt):
     return _merger(args, fmt)[0]
 
 
+def _pad_to_buckets(arr, buckets):
+    """Pads `arr` with zeros at the end of each axis in `buckets` up to the smallest
+    bucket size that fits it."""
+    if not isinstance(arr, NDArray):
+        return arr
+    for axis, sizes in buckets.items():
+        if axis >= arr.ndim:
+            continue
+        size = arr.shape[axis]
+        i = bisect.bisect_left(sizes, size)
+        if i == len(sizes) or sizes[i] == size:
+            continue
+        pad_shape = arr.shape[:axis] + (sizes[i] - size,) + arr.shape[axis + 1:]
+        if isinstance(arr, _mx_np.ndarray):
+            pad = _mx_np.zeros(pad_shape, dtype=arr.dtype, ctx=arr.ctx)
+            arr = _mx_np.concatenate([arr, pad], axis=axis)
+        else:
+            pad = nd.zeros(pad_shape, dtype=arr.dtype, ctx=arr.context)
+            arr = nd.concat(arr, pad, dim=axis)
+    return arr
+
+
 class Block:
     """Base class for all neural network layers and models. Your models should
     subclass this class.
@@ -377,7 +402,8 @@ class Block:
             ndarray.save(filename, arg_dict)
 
     def load_parameters(self, filename, ctx=None, allow_missing=False,
-                        ignore_extra=False, cast_dtype=False, dtype_source='current'):
+                        ignore_extra=False, cast_dtype=False, dtype_source='current',
+                        mmap=False, num_workers=0):
         """Load parameters from file previously saved by `save_parameters`.
 
         Parameters
@@ -398,12 +424,21 @@ class Block:
             must be in {'current', 'saved'}
             Only valid if cast_dtype=True, specify the source of the dtype for casting
             the parameters
+        mmap : bool, default False
+            Memory-map the file instead of reading it whole, and copy each parameter
+            straight from the mapping to `ctx`. Only the parameters of this Block are
+            read from disk, and the file is never held in memory twice. Requires a
+            ``.npz`` file, as written by `save_parameters` under NumPy semantics;
+            other files are loaded as usual.
+        num_workers : int, default 0
+            Number of threads copying the parameters to `ctx` when `mmap` is True.
         References
         ----------
         `Saving and Loading Gluon Models \
         <https://mxnet.apache.org/api/python/docs/tutorials/packages/gluon/blocks/save_load_params.html>`_
         """
-        if is_np_array():
+        loaded = _mmap_npz(filename) if mmap else None
+        if loaded is None and is_np_array():
             # failure may happen when loading parameters saved as NDArrays within
             # NumPy semantics. Check the failure type and recover from it if it happens.
             try:
@@ -423,16 +458,18 @@ class Block:
                     loaded = {k: loaded_nds[k].as_np_ndarray() for k in loaded_nds}
                 else:
                     raise ValueError(err_msg)
-        else:
+        elif loaded is None:
             loaded = ndarray.load(filename)
 
         if not loaded:
             return
         full_dict = {'params': loaded, 'filename': filename}
-        self.load_dict(full_dict, ctx, allow_missing, ignore_extra, cast_dtype, dtype_source)
+        self.load_dict(full_dict, ctx, allow_missing, ignore_extra, cast_dtype, dtype_source,
+                       num_workers=num_workers)
 
     def load_dict(self, param_dict, ctx=None, allow_missing=False,
-                  ignore_extra=False, cast_dtype=False, dtype_source="current"):
+                  ignore_extra=False, cast_dtype=False, dtype_source="current",
+                  num_workers=0):
         """Load parameters from dict
 
         Parameters
@@ -453,6 +490,8 @@ class Block:
             must be in {'current', 'saved'}
             Only valid if cast_dtype=True, specify the source of the dtype for casting
             the parameters
+        num_workers : int, default 0
+            Number of threads copying the NumPy arrays of `param_dict` to `ctx`.
         """
         if isinstance(param_dict.get('filename'), str):
             # pass from load_parameters
@@ -484,11 +523,24 @@ class Block:
                     "Parameter '%s' loaded from '%s' is not present in Dict, " \
                     "which contains parameters %s. Set ignore_extra=True to ignore. "%(
                         name, error_str, _brief_print_list(params.keys())))
-            if name in params:
-                param = loaded[name]
-                if isinstance(param, np.ndarray):
-                    param = _mx_np.array(param) if is_np_array() else nd.array(param)
-                params[name]._load_init(param, ctx, cast_dtype=cast_dtype, dtype_source=dtype_source)
+        names = [name for name in loaded if name in params]
+        # NumPy arrays, e.g. memory-mapped ones, are copied straight to the first context
+        first_ctx = ctx[0] if isinstance(ctx, (list, tuple)) else ctx
+        array_fn = _mx_np.array if is_np_array() else nd.array
+        def convert(param):
+            if isinstance(param, np.ndarray):
+                # memory-mapped parameters keep their saved dtype, other NumPy arrays
+                # get the default dtype of array_fn as before
+                dtype = param.dtype if isinstance(param, np.memmap) else None
+                return array_fn(param, dtype=dtype, ctx=first_ctx)
+            return param
+        if num_workers:
+            with ThreadPoolExecutor(max_workers=num_workers) as pool:
+                arrays = list(pool.map(convert, [loaded[name] for name in names]))
+        else:
+            arrays = [convert(loaded[name]) for name in names]
+        for name, param in zip(names, arrays):
+            params[name]._load_init(param, ctx, cast_dtype=cast_dtype, dtype_source=dtype_source)
 
     def register_child(self, block, name=None):
         """Registers block as a child of self. :py:class:`Block` s assigned to self as
@@ -1042,6 +1094,13 @@ class HybridBlock(Block):
         self._v2 = inspect.unwrap(self.hybrid_forward.__func__) is HybridBlock.hybrid_forward
         self._cached_graph = ()
         self._cached_op = None
+        self._cached_op_cargs = {}
+        self._cached_op_data_indices = []
+        self._cached_op_sym = None
+        self._shape_cache_size = None
+        self._shape_buckets = None
+        self._shape_cached_ops = OrderedDict()
+        self._shape_cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
         self._out_format = None
         self._in_format = None
         self._called_infer_shape_already = False
@@ -1242,6 +1301,9 @@ class HybridBlock(Block):
                 triple = (False, serialization_name, param)
 
             self._cached_op_args.append(triple)
+        self._cached_op_cargs = {}
+        self._cached_op_data_indices = [(pos, i) for pos, (is_arg, _, i)
+                                        in enumerate(self._cached_op_args) if is_arg]
 
         for i in range(len(self._flags) - 1, -1, -1):
             kv = self._flags[i]
@@ -1249,6 +1311,8 @@ class HybridBlock(Block):
                 self._flags.remove(kv)
         self._flags = [('data_indices', data_indices), ('param_indices', param_indices)] + self._flags
         self._cached_op = ndarray.CachedOp(out, self._flags)
+        self._cached_op_sym = out
+        self._shape_cached_ops = OrderedDict()
 
     def _deferred_infer_shape(self, *args):
         try:
@@ -1276,11 +1340,6 @@ class HybridBlock(Block):
                                 "This should never happen. " \
                                 "Please submit an issue on Github" \
                                 " https://github.com/apache/incubator-mxnet."
-        if self._callback:
-            self._cached_op._register_op_hook(self._callback, self._monitor_all)
-            if len(self._flags) >= 2 and (self._flags[1] or self._flags[0]):
-                warnings.warn("register_op_hook is experimental when static_alloc=True / static_shape=True "
-                              " and may not work correctly")
 
         args, fmt = _flatten(args, "input")
         if fmt != self._in_format:
@@ -1302,13 +1361,103 @@ class HybridBlock(Block):
                                  .format(fmt, self._in_format))
 
         args_without_none = [ele for ele in args if ele is not None]
-        cargs = [args_without_none[i] if is_arg else i.data()
-                 for is_arg, name, i in self._cached_op_args]
-        out = self._cached_op(*cargs)
+        if self._shape_buckets and not (autograd.is_recording() or autograd.is_training()):
+            # padded rows must not reach gradients or running statistics
+            args_without_none = [_pad_to_buckets(ele, self._shape_buckets)
+                                 for ele in args_without_none]
+        if self._shape_cache_size:
+            cached_op = self._get_shape_cached_op(args_without_none)
+        else:
+            cached_op = self._cached_op
+        if self._callback:
+            cached_op._register_op_hook(self._callback, self._monitor_all)
+            if len(self._flags) >= 2 and (self._flags[1] or self._flags[0]):
+                warnings.warn("register_op_hook is experimental when static_alloc=True / static_shape=True "
+                              " and may not work correctly")
+        cargs = self._get_cached_op_cargs(args_without_none)
+        out = cached_op(*cargs)
         if isinstance(out, NDArray):
             out = [out]
         return _regroup(out, self._out_format)
 
+    def _get_shape_cached_op(self, args):
+        """Returns the CachedOp for the shapes and dtypes of `args`, creating it and
+        evicting the least recently used one if needed."""
+        key = tuple((arr.shape, arr.dtype) for arr in args)
+        cached_op = self._shape_cached_ops.get(key)
+        if cached_op is not None:
+            self._shape_cached_ops.move_to_end(key)
+            self._shape_cache_stats['hits'] += 1
+            return cached_op
+        self._shape_cache_stats['misses'] += 1
+        if self._shape_cached_ops:
+            cached_op = ndarray.CachedOp(self._cached_op_sym, self._flags)
+        else:
+            cached_op = self._cached_op
+        self._shape_cached_ops[key] = cached_op
+        if len(self._shape_cached_ops) > self._shape_cache_size:
+            self._shape_cached_ops.popitem(last=False)
+            self._shape_cache_stats['evictions'] += 1
+        return cached_op
+
+    def shape_cache_info(self):
+        """Returns the statistics of the per-shape CachedOps kept when hybridized
+        with `shape_cache_size`.
+
+        Returns
+        -------
+        dict
+            `hits`, `misses` and `evictions` since the last `hybridize`, the current
+            number of CachedOps as `size` and the limit as `max_size`.
+        """
+        info = dict(self._shape_cache_stats)
+        info['size'] = len(self._shape_cached_ops)
+        info['max_size'] = self._shape_cache_size
+        return info
+
+    def warmup(self, shapes, dtype='float32', ctx=None):
+        """Runs a forward pass on zeros for each of the given input shapes, so that
+        the CachedOps of a block hybridized with `shape_cache_size` are built and
+        their memory is planned before real requests arrive.
+
+        Parameters
+        ----------
+        shapes : list of tuple or list of list of tuple
+            One entry per forward pass, either the shape of a single input or the
+            list of the shapes of all inputs.
+        dtype : str or numpy.dtype, default 'float32'
+            Data type of the inputs.
+        ctx : Context, default :py:meth:`context.current_context()`
+            Context of the inputs.
+        """
+        if not self._active:
+            raise RuntimeError("warmup() requires the block to be hybridized.")
+        zeros_fn = _mx_np.zeros if is_np_array() else nd.zeros
+        outs = []
+        with autograd.pause():
+            for shape in shapes:
+                if shape and isinstance(shape[0], (list, tuple)):
+                    inputs = [zeros_fn(s, dtype=dtype, ctx=ctx) for s in shape]
+                else:
+                    inputs = [zeros_fn(shape, dtype=dtype, ctx=ctx)]
+                outs.append(self(*inputs))
+        for out in _flatten(outs, "output")[0]:
+            out.wait_to_read()
+
+    def _get_cached_op_cargs(self, args):
+        """Returns the inputs of the CachedOp. The parameter arrays of the current
+        context are collected once and reused until the data arrays of a Parameter
+        are replaced, so that only the data inputs are filled in on each call."""
+        ctx = _context.current_context()
+        version, cargs = self._cached_op_cargs.get(ctx, (None, None))
+        if version != Parameter._data_version:
+            cargs = [None if is_arg else i.data() for is_arg, _, i in self._cached_op_args]
+            self._cached_op_cargs[ctx] = (Parameter._data_version, cargs)
+        cargs = list(cargs)
+        for pos, i in self._cached_op_data_indices:
+            cargs[pos] = args[i]
+        return cargs
+
     def optimize_for(self, x, *args, backend=None, clear=False,
                      partition_if_dynamic=True,
                      static_alloc=False,
@@ -1400,6 +1549,7 @@ class HybridBlock(Block):
     def _clear_cached_op(self):
         self._cached_graph = ()
         self._cached_op = None
+        self._shape_cached_ops = OrderedDict()
         self._first_forward = True
 
     def register_child(self, block, name=None):
@@ -1422,7 +1572,9 @@ class HybridBlock(Block):
                   static_shape=False,
                   inline_limit=2,
                   forward_bulk_size=None,
-                  backward_bulk_size=None):
+                  backward_bulk_size=None,
+                  shape_cache_size=None,
+                  shape_buckets=None):
         """Activates or deactivates :py:class:`HybridBlock` s recursively. Has no effect on
         non-hybrid children.
 
@@ -1444,6 +1596,19 @@ class HybridBlock(Block):
             Segment size of bulk execution during forward pass.
         backward_bulk_size : optional int, default None
             Segment size of bulk execution during backward pass.
+        shape_cache_size : optional int, default None
+            If set, a separate CachedOp is kept for each combination of input shapes and
+            dtypes, up to `shape_cache_size` of them, evicting the least recently used
+            one. With static_alloc and static_shape, this avoids re-planning the memory
+            whenever the input shape switches between a few values. See
+            :py:meth:`shape_cache_info` and :py:meth:`warmup`.
+        shape_buckets : optional dict of int to list of int, default None
+            Rounds the inputs up to a few shapes by padding them with zeros. Maps an axis
+            to the sorted sizes allowed along it, e.g. ``{0: [1, 4, 16], 1: [32, 64, 128]}``,
+            and applies to every input with that axis. Sizes larger than the last bucket are
+            kept. The outputs are computed on the padded inputs and are not sliced back.
+            Bucketing is for inference only: inputs are passed unchanged while autograd
+            is recording or in training mode.
         """
 
         self._active = active
@@ -1454,6 +1619,9 @@ class HybridBlock(Block):
             self._flags.append(("forward_bulk_size", forward_bulk_size))
         if backward_bulk_size is not None:
             self._flags.append(("backward_bulk_size", backward_bulk_size))
+        self._shape_cache_size = shape_cache_size
+        self._shape_buckets = shape_buckets
+        self._shape_cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
         self._clear_cached_op()
         if active and self._forward_hooks or self._forward_pre_hooks:
             warnings.warn('"{block}" is being hybridized while still having forward hook/pre-hook. '
@@ -1464,7 +1632,9 @@ class HybridBlock(Block):
                                            static_shape=static_shape,
                                            inline_limit=inline_limit,
                                            forward_bulk_size=forward_bulk_size,
-                                           backward_bulk_size=backward_bulk_size)
+                                           backward_bulk_size=backward_bulk_size,
+                                           shape_cache_size=shape_cache_size,
+                                           shape_buckets=shape_buckets)
 
     def cast(self, dtype):
         if self._active:
@@ -1706,9 +1876,9 @@ class HybridBlock(Block):
         """
         params = self.collect_params()
         if self._cached_op:
-            for p in self._cached_op_args:
+            for is_arg, name, p in self._cached_op_args:
                 # resetting parameters creating by the partitioning backend
-                if p.name not in params:
+                if not is_arg and name not in params:
                     p.reset_ctx(ctx)
         for p in params.values():
             p.reset_ctx(ctx)
@@ -374,6 +374,7 @@ class Estimator(object):
         self.max_epoch = epochs
         self.max_batch = batches
         self.batch_axis = batch_axis
+        self.train_data = train_data
 
         # provide default handlers
         event_handlers = self._prepare_default_handlers(val_data, event_handlers)
@@ -19,12 +19,17 @@
 # pylint: disable=wildcard-import, unused-argument, too-many-ancestors
 """Gluon EventHandlers for Estimators"""
 
+import json
 import os
 import time
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 
+from .... import ndarray
+from .... import numpy_extension as _mx_npx
+from ....util import is_np_array
 from ...metric import CompositeEvalMetric, EvalMetric
 from ...metric import Loss as metric_loss
 from .utils import _check_metrics
@@ -333,12 +338,14 @@ class LoggingHandler(TrainBegin, TrainEnd, EpochBegin, EpochEnd, BatchBegin, Bat
         self.batch_index = 0
 
 
-class CheckpointHandler(TrainBegin, BatchEnd, EpochEnd):
+class CheckpointHandler(TrainBegin, TrainEnd, BatchEnd, EpochEnd):
     """Save the model after user define period
 
     :py:class:`CheckpointHandler` saves the network architecture after first batch if the model
     can be fully hybridized, saves model parameters and trainer states after user defined period,
-    default saves every epoch.
+    default saves every epoch. If the sampler of the training DataLoader supports `state_dict`,
+    the iteration state of the DataLoader is saved as well, so that training resumed from a
+    checkpoint taken in the middle of an epoch continues with the next unseen batch.
 
     Parameters
     ----------
@@ -372,6 +379,13 @@ class CheckpointHandler(TrainBegin, BatchEnd, EpochEnd):
         Whether to resume training from checkpoint in model_dir. If True and checkpoints
         found, :py:class:`CheckpointHandler` will load net parameters and trainer states,
         and train the remaining of epochs and batches.
+    async_save : bool, default False
+        Whether to write checkpoints from a background thread. Parameters and trainer
+        states are copied to host memory on the training thread and written to disk
+        while training continues. Each file is written under a temporary name and
+        renamed when complete, so an interrupted write never leaves a partial checkpoint.
+        A new checkpoint waits for the previous one to be written, and `train_end`
+        waits for all pending writes.
     """
 
     def __init__(self,
@@ -384,7 +398,8 @@ class CheckpointHandler(TrainBegin, BatchEnd, EpochEnd):
                  epoch_period=1,
                  batch_period=None,
                  max_checkpoints=5,
-                 resume_from_checkpoint=False):
+                 resume_from_checkpoint=False,
+                 async_save=False):
         self.monitor = monitor
         self.verbose = verbose
         if not os.path.exists(model_dir):
@@ -402,6 +417,9 @@ class CheckpointHandler(TrainBegin, BatchEnd, EpochEnd):
         self.max_checkpoints = max_checkpoints
         self.resume_from_checkpoint = resume_from_checkpoint
         self.saved_checkpoints = []
+        self.async_save = async_save
+        self._executor = None
+        self._pending_saves = []
         if self.save_best:
             if mode not in ['auto', 'min', 'max']:
                 warnings.warn('ModelCheckpoint mode %s is unknown, '
@@ -452,6 +470,12 @@ class CheckpointHandler(TrainBegin, BatchEnd, EpochEnd):
 
             self._resume_from_checkpoint(estimator)
 
+    def train_end(self, estimator, *args, **kwargs):
+        self._wait_pending_saves()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
     def batch_end(self, estimator, *args, **kwargs):
         # only save symbol once after first batch
         if self.current_batch == 0:
@@ -477,6 +501,8 @@ class CheckpointHandler(TrainBegin, BatchEnd, EpochEnd):
         else:
             save_epoch_number = self.current_epoch
             save_batch_number = self.current_batch
+        # bound host memory held by snapshots to one checkpoint
+        self._wait_pending_saves()
         prefix = "%s-epoch%dbatch%d" % (self.model_prefix, save_epoch_number, save_batch_number)
         self._save_params_and_trainer(estimator, prefix)
         if self.verbose > 0:
@@ -526,8 +552,22 @@ class CheckpointHandler(TrainBegin, BatchEnd, EpochEnd):
     def _save_params_and_trainer(self, estimator, file_prefix):
         param_file = os.path.join(self.model_dir, file_prefix + '.params')
         trainer_file = os.path.join(self.model_dir, file_prefix + '.states')
-        estimator.net.save_parameters(param_file)
-        estimator.trainer.save_states(trainer_file)
+        if self.async_save:
+            params = {key: val._reduce() for key, val in
+                      estimator.net._collect_params_with_prefix().items()}
+            states = estimator.trainer._snapshot_states()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1)
+            self._pending_saves.append(self._executor.submit(
+                self._write_snapshot, param_file, params, trainer_file, states, is_np_array()))
+        else:
+            estimator.net.save_parameters(param_file)
+            estimator.trainer.save_states(trainer_file)
+        loader_state = self._get_loader_state(estimator)
+        if loader_state is not None:
+            loader_file = os.path.join(self.model_dir, file_prefix + '.loader')
+            with open(loader_file, 'w') as f:
+                json.dump(loader_state, f)
 
         # only count checkpoints with epoch or batch number in file name
         if 'best' not in file_prefix:
@@ -535,9 +575,50 @@ class CheckpointHandler(TrainBegin, BatchEnd, EpochEnd):
         # remove old checkpoint when max number of checkpoints reached
         if len(self.saved_checkpoints) > self.max_checkpoints:
             prefix = self.saved_checkpoints.pop(0)
-            for fname in os.listdir(self.model_dir):
-                if fname.startswith(prefix):
-                    os.remove(os.path.join(self.model_dir, fname))
+            if self.async_save:
+                # runs after the writes already queued on the executor
+                self._pending_saves.append(self._executor.submit(self._remove_checkpoint, prefix))
+            else:
+                self._remove_checkpoint(prefix)
+
+    def _remove_checkpoint(self, prefix):
+        for fname in os.listdir(self.model_dir):
+            if fname.startswith(prefix):
+                os.remove(os.path.join(self.model_dir, fname))
+
+    def _write_snapshot(self, param_file, params, trainer_file, states, np_array):
+        # the .params file is renamed last, as its presence marks a complete checkpoint
+        states_tmp = self._tmp_file(trainer_file)
+        states.save_states(states_tmp, dump_optimizer=True)
+        os.replace(states_tmp, trainer_file)
+        params_tmp = self._tmp_file(param_file)
+        # numpy semantics are thread local, so the caller's mode is passed in
+        if np_array:
+            _mx_npx.savez(params_tmp, **params)
+        else:
+            ndarray.save(params_tmp, params)
+        os.replace(params_tmp, param_file)
+
+    @staticmethod
+    def _tmp_file(fname):
+        # hidden name, so that checkpoint discovery and pruning by prefix skip it
+        dirname, basename = os.path.split(fname)
+        return os.path.join(dirname, '.' + basename + '.tmp')
+
+    def _wait_pending_saves(self):
+        pending, self._pending_saves = self._pending_saves, []
+        for future in pending:
+            # re-raises errors from the background thread
+            future.result()
+
+    def _get_loader_state(self, estimator):
+        train_data = getattr(estimator, 'train_data', None)
+        if train_data is None or not hasattr(train_data, 'state_dict'):
+            return None
+        try:
+            return train_data.state_dict()
+        except NotImplementedError:
+            return None
 
     def _resume_from_checkpoint(self, estimator):
         prefix = self.model_prefix + '-epoch'
@@ -588,6 +669,11 @@ class CheckpointHandler(TrainBegin, BatchEnd, EpochEnd):
             assert os.path.exists(trainer_file), "Failed to load checkpoint, %s does not exist" % trainer_file
             estimator.net.load_parameters(param_file, ctx=estimator.context)
             estimator.trainer.load_states(trainer_file)
+            loader_file = "%s-epoch%dbatch%d.loader" % (self.model_prefix, self.trained_epoch, self.trained_batch)
+            loader_file = os.path.join(self.model_dir, loader_file)
+            if os.path.exists(loader_file) and getattr(estimator, 'train_data', None) is not None:
+                with open(loader_file) as f:
+                    estimator.train_data.load_state_dict(json.load(f))
             estimator.logger.warning(msg)
 
     def _find_max_iteration(self, dir, prefix, start, end, saved_checkpoints=None):
@@ -23,6 +23,7 @@ import warnings
 import numpy as np
 
 from ...context import Context, cpu
+from ...dlpack import DLDataType
 from ... import ndarray as nd
 from ... import numpy as _np
 from ...util import is_np_array
@@ -97,11 +98,39 @@ class Stack(object):
             else:
                 return _arr.array(out, dtype=dtype)
 
+    def _batchify_into(self, data, alloc):
+        """Batchify the input data into numpy arrays returned by `alloc(shape, dtype)`."""
+        if isinstance(data[0], nd.NDArray):
+            out = alloc((len(data),) + data[0].shape, data[0].dtype)
+            _write_into(out, data)
+            return out
+        elif isinstance(data[0], (tuple, list)):
+            data = zip(*data)
+            return [self._batchify_into(i, alloc) for i in data]
+        else:
+            arrs = [np.asarray(x) for x in data]
+            out = alloc((len(arrs),) + arrs[0].shape, np.result_type(*arrs))
+            for i, arr in enumerate(arrs):
+                out[i] = arr
+            return out
+
     def __mx_handle__(self):
         from ._internal import StackBatchify
         return StackBatchify()
 
-def _pad_arrs_to_max_length(arrs, pad_val, use_shared_mem, dtype, round_to=None):
+def _write_into(out, arrs):
+    """Stack NDArrays directly into the numpy array `out` without a temporary."""
+    if str(out.dtype) not in DLDataType.TYPE_MAP:
+        out[...] = nd.stack(*[x.as_nd_ndarray() for x in arrs]).asnumpy()
+        return
+    target = nd.from_numpy(out, zero_copy=True)
+    if is_np_array():
+        _np.stack([x.as_np_ndarray() for x in arrs], out=target.as_np_ndarray())
+    else:
+        nd.stack(*arrs, out=target)
+    target.wait_to_read()
+
+def _pad_arrs_to_max_length(arrs, pad_val, use_shared_mem, dtype, round_to=None, alloc=None):
     """Inner Implementation of the Pad batchify
     Parameters
     ----------
@@ -109,6 +138,9 @@ def _pad_arrs_to_max_length(arrs, pad_val, use_shared_mem, dtype, round_to=None)
     pad_val : number
     use_shared_mem : bool, default False
     round_to : int
+    alloc : callable, default None
+        If given, the padded batch is written into the numpy array returned by
+        `alloc(shape, dtype)`, which is returned instead of an NDArray.
 
     Returns
     -------
@@ -134,7 +166,11 @@ def _pad_arrs_to_max_length(arrs, pad_val, use_shared_mem, dtype, round_to=None)
         ret_shape[pad_axis] = max_size
     ret_shape = (len(arrs), ) + tuple(ret_shape)
 
-    ret = np.full(shape=ret_shape, fill_value=pad_val, dtype=dtype)
+    if alloc is None:
+        ret = np.full(shape=ret_shape, fill_value=pad_val, dtype=dtype)
+    else:
+        ret = alloc(ret_shape, np.dtype(dtype))
+        ret.fill(pad_val)
 
     for i, arr in enumerate(arrs):
         if arr.shape == ret_shape[1:]:
@@ -147,6 +183,8 @@ def _pad_arrs_to_max_length(arrs, pad_val, use_shared_mem, dtype, round_to=None)
             slices = [slice(i, i + 1)] + slices
             ret[tuple(slices)] = arr
 
+    if alloc is not None:
+        return ret
 
     ctx = Context('cpu_shared', 0) if use_shared_mem else cpu()
     ret = _arr.array(ret, ctx=ctx, dtype=dtype)
@@ -252,6 +290,14 @@ class Pad(object):
             raise NotImplementedError(
                 "Pad() does not support multiple items, use Group(Pad(), Pad(), ...) instead")
 
+    def _batchify_into(self, data, alloc):
+        """Batchify the input data into numpy arrays returned by `alloc(shape, dtype)`."""
+        if isinstance(data[0], (nd.NDArray, np.ndarray, list)):
+            return _pad_arrs_to_max_length(data, self._pad_val, False, self._dtype,
+                                           self._round_to, alloc=alloc)
+        raise NotImplementedError(
+            "Pad() does not support multiple items, use Group(Pad(), Pad(), ...) instead")
+
     def __mx_handle__(self):
         from ._internal import PadBatchify
         return PadBatchify(pad_val=self._pad_val, dtype=self._dtype if self._dtype is not None else -1)
@@ -376,6 +422,16 @@ class Group(object):
             ret.append(ele_fn([ele[i] for ele in data]))
         return tuple(ret)
 
+    def _batchify_into(self, data, alloc):
+        """Batchify the input data into numpy arrays returned by `alloc(shape, dtype)`.
+
+        Only available if all wrapped batchify functions support it."""
+        assert len(data[0]) == len(self._fn),\
+            'The number of attributes in each data sample should contains' \
+            ' {} elements'.format(len(self._fn))
+        return tuple(ele_fn._batchify_into([ele[i] for ele in data], alloc)
+                     for i, ele_fn in enumerate(self._fn))
+
     def __mx_handle__(self):
         if self._handle  is None:
             from ._internal import GroupBatchify
@@ -18,13 +18,18 @@
 # coding: utf-8
 # pylint: disable=ungrouped-imports
 """Dataset generator."""
-__all__ = ['DataLoader']
+__all__ = ['DataLoader', 'WorkerPool']
 
 import pickle
 import logging
 import io
+import os
 import sys
 import signal
+import gc
+import mmap
+import shutil
+import tempfile
 import multiprocessing
 import multiprocessing.queues
 from multiprocessing.reduction import ForkingPickler
@@ -39,9 +44,12 @@ except ImportError:
 
 from . import sampler as _sampler
 from . import batchify as _batchify
+from .dataset import _getitems
 from ... import ndarray as nd, context
+from ...dlpack import DLDataType
 from ...util import is_np_shape, is_np_array, set_np
 from ... import numpy as _mx_np  # pylint: disable=reimported
+from ..utils import split_data
 
 if sys.platform == 'darwin' or sys.platform == 'win32':
     def rebuild_ndarray(*args):
@@ -189,7 +197,7 @@ def worker_loop_v1(dataset, key_queue, data_queue, batchify_fn):
         idx, samples = key_queue.get()
         if idx is None:
             break
-        batch = batchify_fn([dataset[i] for i in samples])
+        batch = batchify_fn(_getitems(dataset, samples))
         data_queue.put((idx, batch))
 
 def fetcher_loop_v1(data_queue, data_buffer, pin_memory=False,
@@ -392,7 +400,7 @@ class DataLoaderV1(object):
         if self._num_workers == 0:
             def same_process_iter():
                 for batch in self._batch_sampler:
-                    ret = self._batchify_fn([self._dataset[idx] for idx in batch])
+                    ret = self._batchify_fn(_getitems(self._dataset, batch))
                     if self._pin_memory:
                         ret = _as_in_context(ret, context.cpu_pinned(self._pin_device_id))
                     yield ret
@@ -428,20 +436,354 @@ def _worker_fn(samples, batchify_fn, dataset=None):
     # it is required that each worker process has to fork a new MXIndexedRecordIO handle
     # preserving dataset as global variable can save tons of overhead and is safe in new process
     global _worker_dataset
-    batch = batchify_fn([_worker_dataset[i] for i in samples])
+    batch = batchify_fn(_getitems(_worker_dataset, samples))
     buf = io.BytesIO()
     ForkingPickler(buf, pickle.HIGHEST_PROTOCOL).dump(batch)
     return buf.getvalue()
 
 def _thread_worker_fn(samples, batchify_fn, dataset):
     """Threadpool worker function for processing data."""
-    return batchify_fn([dataset[i] for i in samples])
+    return batchify_fn(_getitems(dataset, samples))
+
+# datasets attached to a WorkerPool, loaded lazily in each worker process
+_worker_pool_datasets = {}
+def _get_pooled_dataset(dataset):
+    """Returns the dataset referenced by a `_PooledDataset`, loading it on first use."""
+    cached = _worker_pool_datasets.get(dataset.key)
+    if cached is None:
+        # release datasets that were detached from the pool since the last load
+        for key, (_, path) in list(_worker_pool_datasets.items()):
+            if not os.path.exists(path):
+                del _worker_pool_datasets[key]
+        with open(dataset.path, 'rb') as f:
+            cached = (pickle.load(f), dataset.path)
+        _worker_pool_datasets[dataset.key] = cached
+    return cached[0]
+
+def _pool_worker_fn(samples, batchify_fn, dataset):
+    """Function for processing data in a `WorkerPool` worker process."""
+    batch = batchify_fn(_getitems(_get_pooled_dataset(dataset), samples))
+    buf = io.BytesIO()
+    ForkingPickler(buf, pickle.HIGHEST_PROTOCOL).dump(batch)
+    return buf.getvalue()
+
+
+# shared memory rings mapped in this worker process
+_worker_rings = {}
+def _ring_worker_fn(samples, batchify_fn, dataset, slot):
+    """Function for processing data in worker process into a `_SharedMemRing` slot.
+
+    Returns the pickled layout of the batch, with every array replaced by its
+    location in the ring."""
+    if dataset is None:
+        dataset = _worker_dataset
+    elif isinstance(dataset, _PooledDataset):
+        dataset = _get_pooled_dataset(dataset)
+    buf = _worker_rings.get(slot.path)
+    if buf is None:
+        # release rings that were closed since the last one was mapped
+        for path in [p for p in _worker_rings if not os.path.exists(p)]:
+            del _worker_rings[path]
+        with open(slot.path, 'r+b') as f:
+            buf = mmap.mmap(f.fileno(), 0)
+        _worker_rings[slot.path] = buf
+    alloc = _SlotAllocator(buf, slot)
+    samples = _getitems(dataset, samples)
+    if _can_batchify_into(batchify_fn):
+        batch = batchify_fn._batchify_into(samples, alloc)
+    else:
+        batch = _copy_into(batchify_fn(samples), alloc)
+    return pickle.dumps(alloc.layout(batch), pickle.HIGHEST_PROTOCOL)
+
+def _can_batchify_into(batchify_fn):
+    """Whether `batchify_fn` can write its output into preallocated arrays."""
+    if isinstance(batchify_fn, _batchify.Group):
+        return all(_can_batchify_into(fn) for fn in batchify_fn._fn)
+    return hasattr(batchify_fn, '_batchify_into')
+
+def _copy_into(batch, alloc):
+    """Copy the arrays of an already batchified output into arrays from `alloc`."""
+    if isinstance(batch, nd.NDArray):
+        out = alloc(batch.shape, batch.dtype)
+        if str(out.dtype) in DLDataType.TYPE_MAP:
+            target = nd.from_numpy(out, zero_copy=True)
+            batch.as_nd_ndarray().copyto(target)
+            target.wait_to_read()
+        else:
+            out[...] = batch.asnumpy()
+        return out
+    elif isinstance(batch, np.ndarray):
+        out = alloc(batch.shape, batch.dtype)
+        out[...] = batch
+        return out
+    elif isinstance(batch, (list, tuple)):
+        return type(batch)(_copy_into(b, alloc) for b in batch)
+    return batch
+
+
+class _RingSlot(object):
+    """Location of one slot of a `_SharedMemRing`, sent to the worker with each batch."""
+    def __init__(self, path, index, offset, size):
+        self.path = path
+        self.index = index
+        self.offset = offset
+        self.size = size
+
+
+class _RingArray(object):
+    """Location of a batch array inside a `_SharedMemRing`."""
+    def __init__(self, offset, shape, dtype):
+        self.offset = offset
+        self.shape = shape
+        self.dtype = dtype
+
+
+class _SlotAllocator(object):
+    """Allocates consecutive 64-byte aligned numpy arrays from one ring slot."""
+    def __init__(self, buf, slot):
+        self._buf = buf
+        self._size = slot.size
+        self._end = slot.offset + slot.size
+        self._pos = slot.offset
+        self._arrays = {}
+
+    def __call__(self, shape, dtype):
+        dtype = np.dtype(dtype)
+        shape = tuple(int(d) for d in shape)
+        count = int(np.prod(shape))
+        nbytes = count * dtype.itemsize
+        if self._pos + nbytes > self._end:
+            raise ValueError("Batch does not fit into a shared memory ring slot of {} bytes. "
+                             "Please increase `ring_slot_size` of the DataLoader."
+                             .format(self._size))
+        arr = np.frombuffer(self._buf, dtype=dtype, count=count, offset=self._pos).reshape(shape)
+        self._arrays[id(arr)] = (arr, self._pos)
+        self._pos += (nbytes + 63) // 64 * 64
+        return arr
+
+    def layout(self, batch):
+        """Replace the arrays allocated from the slot by their location."""
+        if isinstance(batch, np.ndarray) and id(batch) in self._arrays:
+            return _RingArray(self._arrays[id(batch)][1], batch.shape, batch.dtype.str)
+        elif isinstance(batch, (list, tuple)):
+            return type(batch)(self.layout(b) for b in batch)
+        return batch
+
+
+class _SharedMemRing(object):
+    """A fixed number of fixed-size slots in one shared memory file.
+
+    Workers write each batch into the slot they are given, and the main process
+    wraps the slot as NDArrays without copying. A slot is handed out again only
+    after the batch read from it has been consumed, i.e. on the next request for
+    a batch, and after all pending engine operations on it have finished."""
+    def __init__(self, num_slots, slot_size):
+        self._buf = None
+        slot_size = (slot_size + 63) // 64 * 64
+        shm_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+        fd, self.path = tempfile.mkstemp(prefix='mxnet-ring-', dir=shm_dir)
+        try:
+            os.ftruncate(fd, num_slots * slot_size)
+            self._buf = mmap.mmap(fd, num_slots * slot_size)
+        finally:
+            os.close(fd)
+        self._slot_size = slot_size
+        self._free = list(range(num_slots))
+        self._consumed = []
+
+    def acquire(self):
+        """Take a free slot."""
+        assert self._free, "No free slot in shared memory ring"
+        index = self._free.pop(0)
+        return _RingSlot(self.path, index, index * self._slot_size, self._slot_size)
+
+    def wrap(self, slot, layout):
+        """Build the batch from the layout returned by the worker writing to `slot`."""
+        arrays = []
+        batch = self._wrap(layout, arrays)
+        self._consumed.append((slot.index, arrays))
+        return batch
+
+    def _wrap(self, layout, arrays):
+        if isinstance(layout, _RingArray):
+            arr = np.frombuffer(self._buf, dtype=layout.dtype, count=int(np.prod(layout.shape)),
+                                offset=layout.offset).reshape(layout.shape)
+            if str(arr.dtype) in DLDataType.TYPE_MAP:
+                ret = nd.from_numpy(arr, zero_copy=True)
+            else:
+                ret = nd.array(arr, dtype=arr.dtype)
+            if is_np_array():
+                ret = ret.as_np_ndarray()
+            arrays.append(ret)
+            return ret
+        elif isinstance(layout, (list, tuple)):
+            return type(layout)(self._wrap(l, arrays) for l in layout)
+        return layout
+
+    def release_consumed(self):
+        """Return the slots of all consumed batches to the free list."""
+        for index, arrays in self._consumed:
+            for arr in arrays:
+                arr.wait_to_write()
+            self._free.append(index)
+        self._consumed = []
+
+    def close(self):
+        """Remove the shared memory file. Batches still referenced stay valid."""
+        if self._buf is None:
+            return
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        try:
+            self._buf.close()
+        except BufferError:
+            # the mapping is released once the last batch using it is collected
+            pass
+        self._buf = None
+
+    def __del__(self):
+        self.close()
+
+
+class _PooledDataset(object):
+    """Reference to a dataset attached to a `WorkerPool` process pool."""
+    def __init__(self, key, path):
+        self.key = key
+        self.path = path
+
+
+class WorkerPool(object):
+    """A pool of data loading workers that can be shared by several DataLoaders.
+
+    By default every `DataLoader` with ``num_workers > 0`` starts its own pool and
+    copies its dataset to every worker. Loaders that are recreated often, e.g. a
+    validation loader per epoch, or that are used side by side can share one
+    long-lived pool instead: pass it as ``worker_pool`` to each `DataLoader`.
+    The pool serializes each attached dataset once, and every worker loads it the
+    first time it processes a batch from it, so switching datasets does not
+    restart any worker.
+
+    Note that workers see the dataset as it was when it was first attached.
+
+    Parameters
+    ----------
+    num_workers : int
+        The number of workers in the pool.
+    thread_pool : bool, default False
+        If ``True``, use threading pool instead of multiprocessing pool. Datasets
+        are then shared with the workers without serialization.
+
+    Examples
+    --------
+    >>> pool = gluon.data.WorkerPool(8)
+    >>> for epoch in range(epochs):
+    ...     val_loader = gluon.data.DataLoader(val_dataset, 64, worker_pool=pool)
+    ...     for data, label in val_loader:
+    ...         pass
+    >>> pool.close()
+    """
+    def __init__(self, num_workers, thread_pool=False):
+        assert num_workers > 0, "WorkerPool requires at least one worker, given {}".format(
+            num_workers)
+        self._num_workers = num_workers
+        self._thread_pool = thread_pool
+        # id(dataset) -> [handle, dataset, attach count]
+        self._attached = {}
+        self._next_key = 0
+        self._tmpdir = None
+        self._pool = None
+        nd.waitall()
+        gc.collect()
+        nd.waitall()
+        if thread_pool:
+            self._pool = ThreadPool(num_workers,
+                                    initializer=_thread_worker_initializer,
+                                    initargs=(is_np_shape(), is_np_array()))
+        else:
+            self._tmpdir = tempfile.mkdtemp(prefix='mxnet-worker-pool-')
+            # set ignore keyboard interupt signal before forking processes
+            original_sigint_handler = signal.signal(signal.SIGINT, signal.SIG_IGN)
+            self._pool = multiprocessing.Pool(
+                num_workers, initializer=_thread_worker_initializer,
+                initargs=[is_np_shape(), is_np_array()])
+            # resume keyboard interupt signal in main process
+            signal.signal(signal.SIGINT, original_sigint_handler)
+
+    @property
+    def num_workers(self):
+        """The number of workers in the pool."""
+        return self._num_workers
+
+    @property
+    def thread_pool(self):
+        """Whether the workers are threads instead of processes."""
+        return self._thread_pool
+
+    def attach(self, dataset):
+        """Makes `dataset` available to the workers.
+
+        Attaching the same dataset again is cheap and returns the same handle.
+
+        Parameters
+        ----------
+        dataset : Dataset
+            The dataset to attach.
+
+        Returns
+        -------
+        object
+            The handle that is passed to the workers along with each batch.
+        """
+        assert self._pool is not None, "WorkerPool is closed"
+        entry = self._attached.get(id(dataset))
+        if entry is None:
+            if self._thread_pool:
+                handle = dataset
+            else:
+                path = os.path.join(self._tmpdir, '%d.pkl' % self._next_key)
+                with open(path, 'wb') as f:
+                    pickle.dump(dataset, f, pickle.HIGHEST_PROTOCOL)
+                handle = _PooledDataset(self._next_key, path)
+                self._next_key += 1
+            # keep a reference so that id(dataset) stays unique while attached
+            entry = [handle, dataset, 0]
+            self._attached[id(dataset)] = entry
+        entry[2] += 1
+        return entry[0]
+
+    def detach(self, dataset):
+        """Releases a dataset previously attached with `attach`.
+
+        The dataset is dropped by the workers once it has been detached as many
+        times as it was attached.
+        """
+        entry = self._attached.get(id(dataset))
+        if entry is None:
+            return
+        entry[2] -= 1
+        if entry[2] == 0:
+            del self._attached[id(dataset)]
+            if isinstance(entry[0], _PooledDataset) and os.path.exists(entry[0].path):
+                os.remove(entry[0].path)
+
+    def close(self):
+        """Terminates all workers and releases attached datasets."""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+        self._attached = {}
+        if self._tmpdir is not None:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+            self._tmpdir = None
+
+    def __del__(self):
+        self.close()
 
 class _MultiWorkerIter(object):
     """Internal multi-worker iterator for DataLoader."""
     def __init__(self, worker_pool, batchify_fn, batch_sampler, pin_memory=False,
                  pin_device_id=0, worker_fn=_worker_fn, prefetch=0, dataset=None,
-                 data_loader=None, timeout=120):
+                 data_loader=None, timeout=120, ring=None):
         self._worker_pool = worker_pool
         self._batchify_fn = batchify_fn
         self._batch_sampler = batch_sampler
@@ -455,6 +797,9 @@ class _MultiWorkerIter(object):
         self._dataset = dataset
         self._data_loader = data_loader
         self._timeout = timeout
+        self._ring = ring
+        self._ring_slots = {}
+        self._sampler_states = {}
         # pre-fetch
         for _ in range(prefetch):
             self._push_next()
@@ -467,27 +812,45 @@ class _MultiWorkerIter(object):
         r = next(self._iter, None)
         if r is None:
             return
-        async_ret = self._worker_pool.apply_async(
-            self._worker_fn, (r, self._batchify_fn, self._dataset))
+        if self._data_loader is not None:
+            # batches are prefetched, remember where the sampler was for each of them
+            self._sampler_states[self._sent_idx] = self._data_loader._capture_sampler_state()
+        args = (r, self._batchify_fn, self._dataset)
+        if self._ring is not None:
+            slot = self._ring.acquire()
+            self._ring_slots[self._sent_idx] = slot
+            args += (slot,)
+        async_ret = self._worker_pool.apply_async(self._worker_fn, args)
         self._data_buffer[self._sent_idx] = async_ret
         self._sent_idx += 1
 
     def __next__(self):
+        if self._ring is not None:
+            # the previous batch is consumed once the next one is requested
+            self._ring.release_consumed()
         self._push_next()
         if self._rcvd_idx == self._sent_idx:
             assert not self._data_buffer, "Data buffer should be empty at this moment"
+            if self._ring is not None:
+                self._ring.close()
+            if self._data_loader is not None:
+                self._data_loader._sampler_state = None
             raise StopIteration
 
         assert self._rcvd_idx < self._sent_idx, "rcvd_idx must be smaller than sent_idx"
         assert self._rcvd_idx in self._data_buffer, "fatal error with _push_next, rcvd_idx missing"
         ret = self._data_buffer.pop(self._rcvd_idx)
         try:
-            if self._dataset is None:
-                batch = pickle.loads(ret.get(self._timeout))
-            else:
+            if isinstance(self._worker_pool, ThreadPool):
                 batch = ret.get(self._timeout)
+            else:
+                batch = pickle.loads(ret.get(self._timeout))
+            if self._ring is not None:
+                batch = self._ring.wrap(self._ring_slots.pop(self._rcvd_idx), batch)
             if self._pin_memory:
                 batch = _as_in_context(batch, context.cpu_pinned(self._pin_device_id))
+            if self._data_loader is not None:
+                self._data_loader._sampler_state = self._sampler_states.pop(self._rcvd_idx)
             self._rcvd_idx += 1
             return batch
         except multiprocessing.context.TimeoutError:
@@ -511,6 +874,81 @@ class _MultiWorkerIter(object):
         return self
 
 
+_PREFETCH_END = object()
+
+
+class _DevicePrefetchIter(object):
+    """Copies batches to device contexts one batch ahead of the consumer.
+
+    Every array of a batch is split along `batch_axis` and copied to the contexts
+    like `gluon.utils.split_and_load`. With `pin_memory`, arrays are first staged
+    in a fixed pool of pinned host buffers, which the engine reuses as soon as the
+    previous copies out of them are done. All copies are asynchronous engine
+    operations, so the transfer of the next batch overlaps with the computation
+    on the current one."""
+    def __init__(self, batches, ctx_list, batch_axis=0, pin_memory=False,
+                 pin_device_id=0, data_loader=None, num_buffers=2):
+        self._iter = iter(batches)
+        self._ctx_list = ctx_list
+        self._batch_axis = batch_axis
+        self._pin_ctx = context.cpu_pinned(pin_device_id) if pin_memory else None
+        self._buffers = [[] for _ in range(num_buffers)]
+        self._slot = 0
+        self._data_loader = data_loader
+        self._next = self._load()
+
+    def _load(self):
+        """Fetch the next batch and queue its copies to the contexts."""
+        batch = next(self._iter, _PREFETCH_END)
+        if batch is _PREFETCH_END:
+            return None
+        # the sampler state of the loader refers to this batch until it is returned
+        state = self._data_loader._sampler_state if self._data_loader is not None else None
+        buffers = self._buffers[self._slot]
+        self._slot = (self._slot + 1) % len(self._buffers)
+        return self._to_device(batch, buffers, []), state
+
+    def _to_device(self, data, buffers, staged):
+        if isinstance(data, nd.NDArray):
+            if self._pin_ctx is not None and data.stype == 'default':
+                data = self._pin(data, buffers, staged)
+            slices = split_data(data, len(self._ctx_list), self._batch_axis, even_split=False)
+            return [x.copyto(ctx) for x, ctx in zip(slices, self._ctx_list)]
+        elif isinstance(data, (list, tuple)):
+            return [self._to_device(d, buffers, staged) for d in data]
+        return data
+
+    def _pin(self, data, buffers, staged):
+        """Copy data into the next buffer of the pool, reallocating it on shape change."""
+        src = data.as_nd_ndarray()
+        i = len(staged)
+        if i == len(buffers):
+            buffers.append(None)
+        buf = buffers[i]
+        if buf is None or buf.shape != src.shape or buf.dtype != src.dtype:
+            buf = buffers[i] = nd.empty(src.shape, ctx=self._pin_ctx, dtype=src.dtype)
+        src.copyto(buf)
+        staged.append(buf)
+        return buf if src is data else buf.as_np_ndarray()
+
+    def __next__(self):
+        if self._next is None:
+            if self._data_loader is not None:
+                self._data_loader._sampler_state = None
+            raise StopIteration
+        batch, state = self._next
+        self._next = self._load()
+        if self._data_loader is not None:
+            self._data_loader._sampler_state = state
+        return batch
+
+    def next(self):
+        return self.__next__()
+
+    def __iter__(self):
+        return self
+
+
 class DataLoader(object):
     """Loads data from a dataset and returns mini-batches of data.
 
@@ -586,19 +1024,59 @@ class DataLoader(object):
         compilation feature or leave it to `None` to allow MXNet to determine it automatically.
         If you request `try_nopython` to `True` and the compilation fails, it will raise a
         RuntimeError with the failure reason.
+    worker_pool : WorkerPool, default None
+        A `WorkerPool` shared with other DataLoaders. If specified, the workers of the
+        pool are used instead of starting new ones, and `num_workers` and `thread_pool`
+        are taken from the pool. The dataset is detached from the pool when the
+        DataLoader is garbage collected.
+    ring_slot_size : int, default None
+        If specified, multiprocessing workers write each batch into a fixed ring of
+        ``prefetch + 1`` preallocated shared memory slots of `ring_slot_size` bytes,
+        and batches are returned as NDArrays that share memory with the ring. This
+        avoids allocating a new shared memory segment and passing file descriptors
+        for every batch, and caps shared memory usage at
+        ``(prefetch + 1) * ring_slot_size``. `ring_slot_size` must be large enough to
+        hold all arrays of one batch. A returned batch is only valid until the next
+        batch is requested from the iterator, so copy it if it has to be kept.
+        `Stack`, `Pad` and `Group` of them write directly into the ring; the output of
+        other batchify functions is copied into it. Ignored with `thread_pool`.
+    ctx : Context or list of Context, default None
+        If specified, every array of a batch is split along `batch_axis` and loaded
+        to the contexts like `gluon.utils.split_and_load`, so each array is returned
+        as a list with one slice per context. The copies of the next batch are issued
+        before the current batch is returned and run asynchronously. With
+        `pin_memory`, arrays are staged in a fixed pool of reused pinned buffers
+        instead of new pinned arrays for every batch. The last batch may be split
+        unevenly.
+    batch_axis : int, default 0
+        The axis along which batches are split when `ctx` is specified.
 
     """
     def __init__(self, dataset, batch_size=None, shuffle=False, sampler=None,
                  last_batch=None, batch_sampler=None, batchify_fn=None,
                  num_workers=0, pin_memory=False, pin_device_id=0,
-                 prefetch=None, thread_pool=False, timeout=120, try_nopython=None):
+                 prefetch=None, thread_pool=False, timeout=120, try_nopython=None,
+                 worker_pool=None, ring_slot_size=None, ctx=None, batch_axis=0):
         self._dataset = dataset
         self._pin_memory = pin_memory
         self._pin_device_id = pin_device_id
         self._thread_pool = thread_pool
         self._timeout = timeout
         self._mx_iter = None
+        self._shared_pool = None
+        self._ring_slot_size = ring_slot_size
+        if isinstance(ctx, context.Context):
+            ctx = [ctx]
+        self._ctx_list = ctx
+        self._batch_axis = batch_axis
+        # state of the batch sampler right after the last batch returned to the user,
+        # None if the sampler is not ahead of the user
+        self._sampler_state = None
+        self._stateful_sampler = True
         assert timeout > 0, "timeout must be positive, given {}".format(timeout)
+        if worker_pool is not None:
+            num_workers = worker_pool.num_workers
+            self._thread_pool = thread_pool = worker_pool.thread_pool
 
         if batch_sampler is None:
             if batch_size is None:
@@ -631,7 +1109,8 @@ class DataLoader(object):
         else:
             self._batchify_fn = batchify_fn
 
-        if num_workers > 0 and (try_nopython or try_nopython is None):
+        if worker_pool is None and ring_slot_size is None and num_workers > 0 and \
+                (try_nopython or try_nopython is None):
             # check for capability to use mx backend threadedLoader
             use_mx_iter, mx_iter_args = _check_mx_loader_capability(
                 self._dataset, self._batch_sampler, self._batchify_fn)
@@ -649,9 +1128,12 @@ class DataLoader(object):
                 pin_memory=self._pin_memory,
                 pin_device_id=self._pin_device_id,
                 prefetch=self._prefetch, **mx_iter_args)
+        elif worker_pool is not None:
+            self._shared_pool = worker_pool
+            self._worker_pool = worker_pool._pool
+            self._worker_dataset = worker_pool.attach(self._dataset)
         else:
             nd.waitall()
-            import gc
             gc.collect()
             nd.waitall()
             if self._num_workers > 0:
@@ -669,31 +1151,108 @@ class DataLoader(object):
                     signal.signal(signal.SIGINT, original_sigint_handler)
 
     def __iter__(self):
+        if self._ctx_list is None:
+            return self._host_iter(self._pin_memory)
+        # pinning happens in the staging pool, the backend loader pins by itself
+        return _DevicePrefetchIter(self._host_iter(False), self._ctx_list, self._batch_axis,
+                                   pin_memory=self._pin_memory and self._mx_iter is None,
+                                   pin_device_id=self._pin_device_id,
+                                   data_loader=None if self._mx_iter is not None else self)
+
+    def _host_iter(self, pin_memory):
+        """Returns an iterator over batches in host memory."""
         if self._mx_iter is not None:
             return iter(self._mx_iter)
 
+        self._sampler_state = self._capture_sampler_state()
         if self._num_workers == 0:
             def same_process_iter():
                 for batch in self._batch_sampler:
-                    ret = self._batchify_fn([self._dataset[idx] for idx in batch])
-                    if self._pin_memory:
+                    ret = self._batchify_fn(_getitems(self._dataset, batch))
+                    if pin_memory:
                         ret = _as_in_context(ret, context.cpu_pinned(self._pin_device_id))
+                    self._sampler_state = self._capture_sampler_state()
                     yield ret
+                self._sampler_state = None
             return same_process_iter()
 
         # multi-worker
+        if self._shared_pool is not None:
+            worker_fn = _thread_worker_fn if self._thread_pool else _pool_worker_fn
+            dataset = self._worker_dataset
+        else:
+            worker_fn = _thread_worker_fn if self._thread_pool else _worker_fn
+            dataset = self._dataset if self._thread_pool else None
+        ring = None
+        if self._ring_slot_size is not None and not self._thread_pool:
+            ring = _SharedMemRing(self._prefetch + 1, self._ring_slot_size)
+            worker_fn = _ring_worker_fn
         return _MultiWorkerIter(self._worker_pool, self._batchify_fn, self._batch_sampler,
-                                pin_memory=self._pin_memory, pin_device_id=self._pin_device_id,
-                                worker_fn=_thread_worker_fn if self._thread_pool else _worker_fn,
-                                prefetch=self._prefetch,
-                                dataset=self._dataset if self._thread_pool else None,
-                                data_loader=self, timeout=self._timeout)
+                                pin_memory=pin_memory, pin_device_id=self._pin_device_id,
+                                worker_fn=worker_fn, prefetch=self._prefetch, dataset=dataset,
+                                data_loader=self, timeout=self._timeout, ring=ring)
 
     def __len__(self):
         return len(self._batch_sampler)
 
+    def _capture_sampler_state(self):
+        """Returns the current state of the batch sampler, None if not supported."""
+        if not self._stateful_sampler:
+            return None
+        try:
+            return self._batch_sampler.state_dict()
+        except (NotImplementedError, AttributeError):
+            self._stateful_sampler = False
+            return None
+
+    def state_dict(self):
+        """Returns the iteration state of the DataLoader.
+
+        The state records the shuffling seed of the current epoch and the batches
+        already returned from it. Batches prefetched by workers but not yet
+        returned are not counted, so they are produced again after
+        `load_state_dict`. The batch sampler must implement `state_dict`.
+
+        Returns
+        -------
+        dict
+            The DataLoader state, which can be serialized with json.
+        """
+        if self._mx_iter is not None:
+            raise NotImplementedError("state_dict is not supported by the MXNet backend "
+                                      "DataLoader, please set try_nopython=False")
+        state = self._sampler_state
+        if state is None:
+            try:
+                state = self._batch_sampler.state_dict()
+            except AttributeError:
+                # a user batch sampler, or a plain iterable given as sampler
+                raise NotImplementedError("state_dict requires the batch sampler and its "
+                                          "sampler to implement state_dict")
+        return {'batch_sampler': state}
+
+    def load_state_dict(self, state):
+        """Restores a state returned by `state_dict`.
+
+        The next iteration over the DataLoader continues with the first batch that
+        was not returned when the state was taken. Samples of the skipped batches
+        are not read.
+
+        Parameters
+        ----------
+        state : dict
+            The DataLoader state.
+        """
+        if self._mx_iter is not None:
+            raise NotImplementedError("load_state_dict is not supported by the MXNet backend "
+                                      "DataLoader, please set try_nopython=False")
+        self._batch_sampler.load_state_dict(state['batch_sampler'])
+        self._sampler_state = None
+
     def __del__(self):
-        if self._worker_pool:
+        if self._shared_pool is not None:
+            self._shared_pool.detach(self._dataset)
+        elif self._worker_pool:
             # manually terminate due to a bug that pool is not automatically terminated
             # https://bugs.python.org/issue34172
             assert isinstance(self._worker_pool, multiprocessing.pool.Pool)
@@ -733,7 +1292,8 @@ def _check_mx_loader_capability(dataset, batch_sampler, batchify_fn):
                 start=batch_sampler._sampler._start,
                 batch_size=batch_sampler._batch_size,
                 last_batch=batch_sampler._last_batch)
-        elif isinstance(batch_sampler._sampler, _sampler.RandomSampler):
+        elif isinstance(batch_sampler._sampler, _sampler.RandomSampler) and \
+                batch_sampler._sampler._seed is None:
             mx_loader_args['batch_sampler'] = MXSampler(
                 'RandomSampler', length=batch_sampler._sampler._length,
                 batch_size=batch_sampler._batch_size,
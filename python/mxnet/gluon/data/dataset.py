@@ -32,6 +32,9 @@ class Dataset(object):
 
     Subclasses need to override `__getitem__`, which returns the i-th
     element, and `__len__`, which returns the total number elements.
+    Subclasses that can fetch many samples more efficiently at once may also
+    implement `__getitems__`, which takes a list of indices and returns the
+    list of samples. DataLoader uses it to fetch whole batches.
 
     .. note:: An mxnet or numpy array can be directly used as a dataset.
     """
@@ -189,6 +192,13 @@ class Dataset(object):
         return self.transform(_TransformFirstClosure(fn), lazy)
 
 
+def _getitems(dataset, indices):
+    """Returns the samples at `indices`, fetched as one batch if `dataset` supports it."""
+    if hasattr(dataset, '__getitems__'):
+        return dataset.__getitems__(indices)
+    return [dataset[i] for i in indices]
+
+
 class SimpleDataset(Dataset):
     """Simple Dataset wrapper for lists and arrays.
 
@@ -236,6 +246,11 @@ class _LazyTransformDataset(Dataset):
             return self._fn(*item)
         return self._fn(item)
 
+    def __getitems__(self, indices):
+        items = _getitems(self._data, indices)
+        return [self._fn(*item) if isinstance(item, tuple) else self._fn(item)
+                for item in items]
+
     def __mx_handle__(self):
         if self.handle is None:
             from ..block import HybridBlock
@@ -297,6 +312,9 @@ class _FilteredDataset(Dataset):
     def __getitem__(self, idx):
         return self._dataset[self._indices[idx]]
 
+    def __getitems__(self, indices):
+        return _getitems(self._dataset, [self._indices[i] for i in indices])
+
     def __mx_handle__(self):
         if self.handle is None:
             from ._internal import MXDataset, IndexedDataset
@@ -325,6 +343,9 @@ class _SampledDataset(Dataset):
     def __getitem__(self, idx):
         return self._dataset[self._indices[idx]]
 
+    def __getitems__(self, indices):
+        return _getitems(self._dataset, [self._indices[i] for i in indices])
+
     def __mx_handle__(self):
         if self.handle is None:
             from ._internal import MXDataset, IndexedDataset
@@ -396,15 +417,23 @@ class RecordFileDataset(Dataset):
     ----------
     filename : str
         Path to rec file.
+    use_mmap : bool, default False
+        If True, memory-map the rec file and return each sample as a zero-copy
+        ``memoryview`` instead of ``bytes``. See `recordio.MXIndexedRecordIO`.
     """
-    def __init__(self, filename):
+    def __init__(self, filename, use_mmap=False):
         self.idx_file = os.path.splitext(filename)[0] + '.idx'
         self.filename = filename
-        self._record = recordio.MXIndexedRecordIO(self.idx_file, self.filename, 'r')
+        self._record = recordio.MXIndexedRecordIO(self.idx_file, self.filename, 'r',
+                                                  use_mmap=use_mmap)
 
     def __getitem__(self, idx):
         return self._record.read_idx(self._record.keys[idx])
 
+    def __getitems__(self, indices):
+        keys = self._record.keys
+        return self._record.read_batch([keys[i] for i in indices])
+
     def __len__(self):
         return len(self._record.keys)
 
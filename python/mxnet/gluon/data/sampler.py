@@ -19,15 +19,17 @@
 # pylint: disable=
 """Dataset sampler."""
 __all__ = ['Sampler', 'SequentialSampler', 'RandomSampler', 'FilterSampler', 'BatchSampler',
-           'IntervalSampler']
+           'IntervalSampler', 'DistributedSampler', 'FixedBucketSampler']
 
+import itertools
 import numpy as np
 
 class Sampler(object):
     """Base class for samplers.
 
     All samplers should subclass `Sampler` and define `__iter__` and `__len__`
-    methods.
+    methods. Samplers that can be checkpointed in the middle of an epoch also
+    define `state_dict` and `load_state_dict`.
     """
     def __iter__(self):
         raise NotImplementedError
@@ -35,6 +37,34 @@ class Sampler(object):
     def __len__(self):
         raise NotImplementedError
 
+    def state_dict(self):
+        """Returns the iteration state of the sampler.
+
+        The state is a dict of JSON serializable values that identifies the
+        current epoch and the number of elements already returned from it.
+
+        Returns
+        -------
+        dict
+            The sampler state.
+        """
+        raise NotImplementedError
+
+    def load_state_dict(self, state):
+        """Restores a state returned by `state_dict`.
+
+        If the state was taken in the middle of an epoch, the next iteration
+        continues that epoch right after the last returned element, without
+        visiting the elements before it. Otherwise the next iteration starts a
+        new epoch.
+
+        Parameters
+        ----------
+        state : dict
+            The sampler state.
+        """
+        raise NotImplementedError
+
 
 class SequentialSampler(Sampler):
     """Samples elements from [start, start+length) sequentially.
@@ -49,32 +79,77 @@ class SequentialSampler(Sampler):
     def __init__(self, length, start=0):
         self._length = length
         self._start = start
+        self._position = 0
+        self._resume = False
 
     def __iter__(self):
-        return iter(range(self._start, self._start + self._length))
+        if not self._resume:
+            self._position = 0
+        self._resume = False
+        for i in range(self._start + self._position, self._start + self._length):
+            self._position += 1
+            yield i
 
     def __len__(self):
         return self._length
 
+    def state_dict(self):
+        return {'position': self._position}
+
+    def load_state_dict(self, state):
+        self._position = state['position']
+        self._resume = self._position < self._length
+
 class RandomSampler(Sampler):
     """Samples elements from [0, length) randomly without replacement.
 
+    Each epoch is shuffled with its own seed, which is recorded in `state_dict`
+    so that an interrupted epoch can be resumed with the same order.
+
     Parameters
     ----------
     length : int
         Length of the sequence.
+    seed : int, default None
+        If specified, epoch `i` is shuffled with seed ``seed + i`` and the order
+        of all epochs is deterministic. Otherwise the seed of each epoch is drawn
+        from `numpy.random`.
     """
-    def __init__(self, length):
+    def __init__(self, length, seed=None):
         self._length = length
+        self._seed = seed
+        self._epoch = -1
+        self._epoch_seed = None
+        self._position = 0
+        self._resume = False
 
     def __iter__(self):
+        if not self._resume:
+            self._epoch += 1
+            if self._seed is None:
+                self._epoch_seed = int(np.random.randint(0, 2**31 - 1))
+            else:
+                self._epoch_seed = self._seed + self._epoch
+            self._position = 0
+        self._resume = False
         indices = np.arange(self._length)
-        np.random.shuffle(indices)
-        return iter(indices)
+        np.random.RandomState(self._epoch_seed).shuffle(indices)
+        for i in indices[self._position:]:
+            self._position += 1
+            yield i
 
     def __len__(self):
         return self._length
 
+    def state_dict(self):
+        return {'epoch': self._epoch, 'seed': self._epoch_seed, 'position': self._position}
+
+    def load_state_dict(self, state):
+        self._epoch = state['epoch']
+        self._epoch_seed = state['seed']
+        self._position = state['position']
+        self._resume = self._epoch_seed is not None and self._position < self._length
+
 class FilterSampler(Sampler):
     """Samples elements from a Dataset for which `fn` returns True.
 
@@ -89,13 +164,27 @@ class FilterSampler(Sampler):
         self._fn = fn
         self._dataset = dataset
         self._indices = [i for i, sample in enumerate(dataset) if fn(sample)]
+        self._position = 0
+        self._resume = False
 
     def __iter__(self):
-        return iter(self._indices)
+        if not self._resume:
+            self._position = 0
+        self._resume = False
+        for i in self._indices[self._position:]:
+            self._position += 1
+            yield i
 
     def __len__(self):
         return len(self._indices)
 
+    def state_dict(self):
+        return {'position': self._position}
+
+    def load_state_dict(self, state):
+        self._position = state['position']
+        self._resume = self._position < len(self._indices)
+
 
 class BatchSampler(Sampler):
     """Wraps over another `Sampler` and return mini-batches of samples.
@@ -130,16 +219,31 @@ class BatchSampler(Sampler):
         self._batch_size = batch_size
         self._last_batch = last_batch
         self._prev = []
+        # leftover of the previous epoch and number of batches returned in this epoch
+        self._epoch_prev = []
+        self._num_batches = 0
+        self._in_epoch = False
+        self._resume = False
 
     def __iter__(self):
-        batch, self._prev = self._prev, []
+        if not self._resume:
+            self._epoch_prev = self._prev
+            self._num_batches = 0
+        self._resume = False
+        self._in_epoch = True
+        # the leftover of the previous epoch goes into the first batch
+        batch = [] if self._num_batches else list(self._epoch_prev)
+        self._prev = []
         for i in self._sampler:
             batch.append(i)
             if len(batch) == self._batch_size:
+                self._num_batches += 1
                 yield batch
                 batch = []
+        self._in_epoch = False
         if batch:
             if self._last_batch == 'keep':
+                self._num_batches += 1
                 yield batch
             elif self._last_batch == 'discard':
                 return
@@ -161,6 +265,25 @@ class BatchSampler(Sampler):
             "last_batch must be one of 'keep', 'discard', or 'rollover', " \
             "but got %s"%self._last_batch)
 
+    def state_dict(self):
+        if self._in_epoch:
+            prev, num_batches = self._epoch_prev, self._num_batches
+        else:
+            prev, num_batches = self._prev, 0
+        return {'sampler': self._sampler.state_dict(),
+                'prev': [int(i) for i in prev],
+                'num_batches': num_batches}
+
+    def load_state_dict(self, state):
+        self._sampler.load_state_dict(state['sampler'])
+        self._epoch_prev = list(state['prev'])
+        self._num_batches = state['num_batches']
+        self._in_epoch = False
+        # number of elements of the wrapped sampler in the returned batches
+        consumed = self._num_batches * self._batch_size - len(self._epoch_prev)
+        self._resume = self._num_batches > 0 and consumed < len(self._sampler)
+        self._prev = [] if self._num_batches else self._epoch_prev
+
 
 class IntervalSampler(Sampler):
     """Samples elements from [0, length) at fixed intervals.
@@ -192,11 +315,292 @@ class IntervalSampler(Sampler):
         self._length = length
         self._interval = interval
         self._rollover = rollover
+        self._position = 0
+        self._resume = False
 
     def __iter__(self):
+        if not self._resume:
+            self._position = 0
+        self._resume = False
+        for j in itertools.islice(self._indices(), self._position, None):
+            self._position += 1
+            yield j
+
+    def _indices(self):
         for i in range(self._interval if self._rollover else 1):
             for j in range(i, self._length, self._interval):
                 yield j
 
     def __len__(self):
         return self._length
+
+    def state_dict(self):
+        return {'position': self._position}
+
+    def load_state_dict(self, state):
+        self._position = state['position']
+        total = self._length if self._rollover else len(range(0, self._length, self._interval))
+        self._resume = self._position < total
+
+
+class DistributedSampler(Sampler):
+    """Samples the part of [0, length) that belongs to one of several workers.
+
+    The index space is shuffled with the same seed on every worker and then split
+    into `num_parts` parts of equal length, so that all workers run the same number
+    of iterations per epoch and none of them waits for the others in gradient
+    synchronization. The order changes every epoch.
+
+    Parameters
+    ----------
+    length : int
+        Length of the sequence.
+    num_parts : int
+        Number of parts, usually `kvstore.num_workers`.
+    part_index : int
+        Index of the part to sample, usually `kvstore.rank`.
+    shuffle : bool, default True
+        Whether to shuffle the indices before splitting them.
+    seed : int, default 0
+        Epoch `i` is shuffled with seed ``seed + i``. Must be the same on all workers.
+    last_batch : {'pad', 'discard'}, default 'pad'
+        Specifies how the remainder is handled if `num_parts` does not evenly
+        divide `length`.
+
+        If 'pad', indices from the beginning of the shuffled sequence are repeated
+        so that every part has ``ceil(length / num_parts)`` elements.
+
+        If 'discard', the last ``length % num_parts`` shuffled indices are dropped
+        so that every part has ``length // num_parts`` elements.
+
+    Examples
+    --------
+    >>> kv = mx.kv.create('dist_sync')
+    >>> sampler = gluon.data.DistributedSampler(len(dataset), kv.num_workers, kv.rank)
+    >>> loader = gluon.data.DataLoader(dataset, batch_size=32, sampler=sampler)
+    """
+    def __init__(self, length, num_parts, part_index, shuffle=True, seed=0,
+                 last_batch='pad'):
+        if not 0 <= part_index < num_parts:
+            raise ValueError("part_index must be in [0, %d), but got %d"%(num_parts, part_index))
+        if last_batch not in ('pad', 'discard'):
+            raise ValueError(
+                "last_batch must be one of 'pad' or 'discard', but got %s"%last_batch)
+        self._length = length
+        self._num_parts = num_parts
+        self._part_index = part_index
+        self._shuffle = shuffle
+        self._seed = seed
+        self._last_batch = last_batch
+        if last_batch == 'pad':
+            self._part_len = (length + num_parts - 1) // num_parts
+        else:
+            self._part_len = length // num_parts
+        self._epoch = -1
+        self._next_epoch = 0
+        self._position = 0
+        self._resume = False
+
+    def set_epoch(self, epoch):
+        """Sets the epoch of the next iteration.
+
+        By default the epoch is incremented every time a new iteration starts.
+
+        Parameters
+        ----------
+        epoch : int
+            The epoch number.
+        """
+        self._next_epoch = epoch
+
+    def _indices(self):
+        indices = np.arange(self._length)
+        if self._shuffle:
+            np.random.RandomState(self._seed + self._epoch).shuffle(indices)
+        total = self._part_len * self._num_parts
+        if total > self._length:
+            indices = np.resize(indices, total)
+        return indices[self._part_index:total:self._num_parts]
+
+    def __iter__(self):
+        if not self._resume:
+            self._epoch = self._next_epoch
+            self._next_epoch += 1
+            self._position = 0
+        self._resume = False
+        for i in self._indices()[self._position:]:
+            self._position += 1
+            yield i
+
+    def __len__(self):
+        return self._part_len
+
+    def state_dict(self):
+        return {'epoch': self._epoch, 'position': self._position}
+
+    def load_state_dict(self, state):
+        self._epoch = state['epoch']
+        self._next_epoch = self._epoch + 1
+        self._position = state['position']
+        self._resume = self._epoch >= 0 and self._position < self._part_len
+
+
+class FixedBucketSampler(Sampler):
+    """Samples mini-batches of elements with similar lengths.
+
+    Elements are assigned to the bucket with the smallest key that is not less than
+    their length, and every mini-batch is drawn from a single bucket. Combined with
+    :py:class:`mxnet.gluon.data.batchify.Pad`, this bounds the padding of each
+    mini-batch by the width of its bucket.
+
+    Parameters
+    ----------
+    lengths : list of int
+        The length of each element of the dataset.
+    batch_size : int
+        Size of mini-batch for the bucket with the largest key.
+    num_buckets : int, default 10
+        Number of buckets. Used when `bucket_keys` is not given, in which case
+        the keys are evenly spaced between the minimum and maximum length.
+    bucket_keys : list of int, default None
+        The upper bound of the lengths in each bucket, in increasing order. Elements
+        longer than the largest key are put into the last bucket.
+    ratio : float, default 0
+        Scales up the batch size of buckets with smaller keys. The batch size of the
+        bucket with key ``k`` is ``max(batch_size, int(max_key * ratio / k * batch_size))``.
+        Setting `ratio` to 1 keeps the number of tokens per mini-batch roughly constant.
+    shuffle : bool, default False
+        Whether to shuffle the elements within each bucket and the order of the
+        mini-batches of all buckets.
+    seed : int, default None
+        If specified, epoch `i` is shuffled with seed ``seed + i``. Otherwise the seed
+        of each epoch is drawn from `numpy.random`.
+
+    Examples
+    --------
+    >>> lengths = [np.random.randint(1, 100) for _ in range(1000)]
+    >>> sampler = gluon.data.FixedBucketSampler(lengths, 8, ratio=0.5, shuffle=True)
+    >>> print(sampler.stats())
+    >>> loader = gluon.data.DataLoader(dataset, batch_sampler=sampler,
+    ...                                batchify_fn=gluon.data.batchify.Pad())
+    """
+    def __init__(self, lengths, batch_size, num_buckets=10, bucket_keys=None, ratio=0,
+                 shuffle=False, seed=None):
+        lengths = np.asarray(lengths, dtype=np.int64)
+        assert lengths.ndim == 1 and lengths.size > 0, \
+            "lengths must be a non-empty list of integers"
+        assert batch_size > 0, "batch_size must be positive, but got %d"%batch_size
+        assert ratio >= 0, "ratio must be non-negative, but got %f"%ratio
+        min_len, max_len = int(lengths.min()), int(lengths.max())
+        if bucket_keys is None:
+            assert num_buckets > 0, "num_buckets must be positive, but got %d"%num_buckets
+            bucket_keys = np.ceil(np.linspace(min_len, max_len, num_buckets + 1)[1:])
+        bucket_keys = np.unique(np.asarray(bucket_keys, dtype=np.int64))
+        bucket_ids = np.minimum(np.searchsorted(bucket_keys, lengths),
+                                len(bucket_keys) - 1)
+        order = np.argsort(bucket_ids, kind='stable')
+        splits = np.cumsum(np.bincount(bucket_ids, minlength=len(bucket_keys)))[:-1]
+        buckets = np.split(order, splits)
+        # drop the buckets without any element
+        used = [i for i, bucket in enumerate(buckets) if bucket.size]
+        self._lengths = lengths
+        self._bucket_keys = [max(int(bucket_keys[i]), int(lengths[buckets[i]].max()))
+                             for i in used]
+        self._buckets = [buckets[i] for i in used]
+        largest = max(self._bucket_keys)
+        self._bucket_batch_sizes = [max(batch_size, int(largest * ratio / max(key, 1) * batch_size))
+                                    for key in self._bucket_keys]
+        self._batch_size = batch_size
+        self._shuffle = shuffle
+        self._seed = seed
+        self._epoch = -1
+        self._epoch_seed = None
+        self._batches = None
+        self._position = 0
+        self._resume = False
+
+    def _plan(self):
+        """Splits the buckets into the mini-batches of the current epoch."""
+        rng = np.random.RandomState(self._epoch_seed) if self._shuffle else None
+        batches = []
+        for bucket, bucket_batch_size in zip(self._buckets, self._bucket_batch_sizes):
+            if rng is not None:
+                bucket = rng.permutation(bucket)
+            batches.extend(bucket[i:i + bucket_batch_size].tolist()
+                           for i in range(0, len(bucket), bucket_batch_size))
+        if rng is not None:
+            batches = [batches[i] for i in rng.permutation(len(batches))]
+        return batches
+
+    def _next_epoch(self):
+        self._epoch += 1
+        if self._seed is None:
+            self._epoch_seed = int(np.random.randint(0, 2**31 - 1))
+        else:
+            self._epoch_seed = self._seed + self._epoch
+        self._position = 0
+        self._batches = self._plan()
+        # the planned epoch is consumed by the next iteration
+        self._resume = True
+
+    def __iter__(self):
+        if not self._resume:
+            self._next_epoch()
+        self._resume = False
+        if self._batches is None:
+            self._batches = self._plan()
+        for batch in self._batches[self._position:]:
+            self._position += 1
+            yield batch
+
+    def __len__(self):
+        return sum((len(bucket) + bucket_batch_size - 1) // bucket_batch_size
+                   for bucket, bucket_batch_size in zip(self._buckets, self._bucket_batch_sizes))
+
+    @property
+    def padding_ratio(self):
+        """Fraction of padding when the mini-batches of the current epoch are padded
+        to their longest element. If no epoch has started yet, the next one is
+        planned to compute it."""
+        if self._batches is None:
+            self._next_epoch()
+        padded, total = 0, 0
+        for batch in self._batches:
+            batch_lengths = self._lengths[batch]
+            padded += int(batch_lengths.max()) * len(batch)
+            total += int(batch_lengths.sum())
+        return 1 - total / padded if padded else 0.
+
+    def stats(self):
+        """Returns a string summarizing the buckets and the padding ratio.
+
+        Returns
+        -------
+        str
+            The statistics of the sampler.
+        """
+        ret = '{name}:\n' \
+              '  sample_num={sample_num}, batch_num={batch_num}\n' \
+              '  key={bucket_keys}\n' \
+              '  cnt={bucket_counts}\n' \
+              '  batch_size={bucket_batch_sizes}\n' \
+              '  padding_ratio={padding_ratio:.4f}'\
+            .format(name=self.__class__.__name__,
+                    sample_num=len(self._lengths),
+                    batch_num=len(self),
+                    bucket_keys=self._bucket_keys,
+                    bucket_counts=[len(bucket) for bucket in self._buckets],
+                    bucket_batch_sizes=self._bucket_batch_sizes,
+                    padding_ratio=self.padding_ratio)
+        return ret
+
+    def state_dict(self):
+        return {'epoch': self._epoch, 'seed': self._epoch_seed, 'position': self._position}
+
+    def load_state_dict(self, state):
+        self._epoch = state['epoch']
+        self._epoch_seed = state['seed']
+        self._position = state['position']
+        # replan the loaded epoch so that padding_ratio does not start a new one
+        self._batches = self._plan() if self._epoch >= 0 else None
+        self._resume = self._epoch >= 0 and self._position < len(self)
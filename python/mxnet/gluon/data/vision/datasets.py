@@ -253,9 +253,12 @@ class ImageRecordDataset(dataset.RecordFileDataset):
 
             transform=lambda data, label: (data.astype(np.float32)/255, label)
 
+    use_mmap : bool, default False
+        If True, memory-map the rec file and decode images directly from the
+        mapping without copying the encoded bytes.
     """
-    def __init__(self, filename, flag=1, transform=None):
-        super(ImageRecordDataset, self).__init__(filename)
+    def __init__(self, filename, flag=1, transform=None, use_mmap=False):
+        super(ImageRecordDataset, self).__init__(filename, use_mmap=use_mmap)
         if transform is not None:
             raise DeprecationWarning(
                 'Directly apply transform to dataset is deprecated. '
@@ -265,6 +268,13 @@ class ImageRecordDataset(dataset.RecordFileDataset):
 
     def __getitem__(self, idx):
         record = super(ImageRecordDataset, self).__getitem__(idx)
+        return self._decode(record)
+
+    def __getitems__(self, indices):
+        records = super(ImageRecordDataset, self).__getitems__(indices)
+        return [self._decode(record) for record in records]
+
+    def _decode(self, record):
         header, img = recordio.unpack(record)
         if self._transform is not None:
             return self._transform(image.imdecode(img, self._flag), header.label)
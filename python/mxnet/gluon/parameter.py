@@ -136,10 +136,24 @@ class Parameter(object):
         self._grad_stype = grad_stype
         self._stype = stype
 
+    # Incremented whenever the data arrays of any Parameter are replaced, e.g. on
+    # initialization, `reset_ctx` or `cast`. Lets `HybridBlock` reuse the arrays it
+    # collected for its CachedOp until they change.
+    _data_version = 0
+
     def __repr__(self):
         s = 'Parameter (shape={shape}, dtype={dtype})'
         return s.format(shape=self.shape, dtype=self.dtype)
 
+    @property
+    def _data(self):
+        return self._data_list
+
+    @_data.setter
+    def _data(self, data):
+        self._data_list = data
+        Parameter._data_version += 1
+
     @property
     def grad_req(self):
         return self._grad_req
@@ -20,11 +20,18 @@
 """Parameter optimizer."""
 __all__ = ['Trainer']
 
+import weakref
 from collections import OrderedDict
 
+import numpy as np
+
+from .. import autograd
 from .. import optimizer as opt
+from .. import numpy as _mx_np, ndarray as nd
 from ..model import _create_kvstore, _create_sparse_kvstore
 from .parameter import Parameter
+from .utils import _global_norm, _clip_scale, _rescale
+from ..context import cpu
 from ..kvstore import KVStore
 
 
@@ -68,15 +75,45 @@ class Trainer(object):
         If None and optimizer.aggregate_num > 1, `update_on_kvstore` is set to False.
         If the `update_on_kvstore` argument is provided,
         environment variable `MXNET_UPDATE_ON_KVSTORE` will be ignored.
+    bucket_size : int, default None
+        If set, dense gradients are packed into contiguous buffers of about `bucket_size`
+        bytes, in the reverse order of the parameters, and each buffer is reduced with one
+        `pushpull` instead of one per parameter. This reduces the per-message overhead of
+        models with many small parameters. Only used when parameters are not updated on kvstore.
+    overlap_backward : bool, default False
+        If True, the gradients are reduced as soon as `backward` has been called on every
+        context, instead of in `step`. Operators of the reduction are queued right behind the
+        backward pass, so communication of the gradients of the last layers overlaps with the
+        backward computation of the first layers and with any code run before `step`. Only
+        backward passes that write the gradients of this trainer's parameters start a
+        reduction; if a later pass overwrites them before `step`, it must do so on every
+        context, and they are reduced again.
+        With a distributed kvstore every worker must run the same backward passes. This
+        cannot be combined with gradient accumulation over several backward passes.
+        Only used when parameters are not updated on kvstore.
+    max_grad_norm : float, default None
+        If set, the reduced gradients are rescaled in `step` and `update` so that their
+        global 2-norm, after normalization by `1/batch_size`, is at most `max_grad_norm`.
+        Unlike :func:`mxnet.gluon.utils.clip_global_norm`, this never synchronizes with
+        the host: the norm is available afterwards as `grad_norm`. Gradients with a
+        non-finite norm are left unchanged. Cannot be used when parameters are updated
+        on kvstore, or with several contexts and no kvstore, where the gradients of the
+        contexts are not reduced and have no common norm.
 
     Properties
     ----------
     learning_rate : float
         The current learning rate of the optimizer. Given an Optimizer object
         optimizer, its learning rate can be accessed as optimizer.learning_rate.
+    grad_norm : NDArray
+        Global norm of the gradients computed by the last `step` or `update`, before
+        clipping, or None if `max_grad_norm` is not set.
+    grad_norm_isfinite : NDArray
+        1 if `grad_norm` is finite and 0 otherwise, or None if `max_grad_norm` is not set.
     """
     def __init__(self, params, optimizer, optimizer_params=None, kvstore='device',
-                 compression_params=None, update_on_kvstore=None):
+                 compression_params=None, update_on_kvstore=None, bucket_size=None,
+                 overlap_backward=False, max_grad_norm=None):
         param_list = []
         if isinstance(params, (dict, OrderedDict)):
             for key in sorted(list(params.keys())):
@@ -118,12 +155,79 @@ class Trainer(object):
         if update_on_kvstore is None and self._optimizer.aggregate_num > 1:
             update_on_kvstore = False
         self._kvstore_params = {'kvstore': kvstore, 'update_on_kvstore': update_on_kvstore}
+        self._bucket_size = bucket_size
+        self._grad_buckets = None
+        self._next_bucket_key = None
         self._kv_initialized = False
         self._kvstore = None
         self._update_on_kvstore = None
         self._distributed = None
         self._params_to_init = []
+        self._backward_contexts = set()
+        self._grads_reduced = False
+        self._grads_overwritten = False
+        self._max_grad_norm = max_grad_norm
+        self._grad_norm = None
+        self._grad_norm_isfinite = None
         self._reset_kvstore()
+        if overlap_backward:
+            trainer_ref = weakref.ref(self)
+            def backward_hook(heads):
+                trainer = trainer_ref()
+                if trainer is None:
+                    autograd._remove_backward_hook(backward_hook)
+                    return None
+                return trainer._on_backward(heads)
+            autograd._register_backward_hook(backward_hook)
+
+    def _on_backward(self, heads):
+        """Called before a backward pass over `heads`. Returns the callback that starts
+        reducing the gradients once backward has written the gradients of this trainer
+        on every context, or None if `heads` are on none of its contexts."""
+        contexts = set(head.ctx for head in heads).intersection(self._contexts)
+        if not contexts:
+            return None
+        arrays = [data for param in self._params
+                  if param.grad_req != 'null' and param._data is not None
+                  for data in param._check_and_get(param._data, list) if data.ctx in contexts]
+        # the pass writes a gradient iff it sets its fresh flag, so the flags are
+        # cleared for the pass and the ones cleared here are restored afterwards
+        was_fresh = [data for data in arrays if data._fresh_grad]
+        for data in was_fresh:
+            data._fresh_grad = False
+
+        def after_backward(done):
+            written = set(data.ctx for data in arrays if data._fresh_grad)
+            for data in was_fresh:
+                data._fresh_grad = True
+            if not done or not written:
+                # the pass does not depend on the parameters of this trainer
+                return
+            if self._grads_reduced:
+                # the reduction issued before was of gradients this pass overwrote
+                self._grads_reduced = False
+                self._grads_overwritten = True
+            self._backward_contexts.update(written)
+            if not self._backward_contexts.issuperset(self._contexts):
+                return
+            self._backward_contexts.clear()
+            self._grads_overwritten = False
+            if not self._kv_initialized:
+                self._init_kvstore()
+            if self._params_to_init:
+                self._init_params()
+            if self._kvstore and not self._update_on_kvstore:
+                self._allreduce_grads()
+                self._grads_reduced = True
+        return after_backward
+
+    @property
+    def grad_norm(self):
+        return self._grad_norm
+
+    @property
+    def grad_norm_isfinite(self):
+        return self._grad_norm_isfinite
 
     def _check_contexts(self):
         contexts = None
@@ -183,6 +287,11 @@ class Trainer(object):
         self._kvstore = None
         self._distributed = None
         self._update_on_kvstore = None
+        self._grad_buckets = None
+        self._next_bucket_key = None
+        self._backward_contexts = set()
+        self._grads_reduced = False
+        self._grads_overwritten = False
         self._params_to_init = [param for param in self._params]
 
     def _init_kvstore(self):
@@ -356,8 +465,14 @@ class Trainer(object):
             self._init_kvstore()
         if self._params_to_init:
             self._init_params()
+        assert self._max_grad_norm is None or not (self._kvstore and self._update_on_kvstore), \
+                'max_grad_norm when parameters are updated on kvstore ' \
+                'is not supported. Try setting `update_on_kvstore` ' \
+                'to False when creating trainer.'
 
-        self._allreduce_grads()
+        self._allreduce_grads_once()
+        if self._max_grad_norm is not None:
+            self._clip_grads()
         self._update(ignore_stale_grad)
 
     def allreduce_grads(self):
@@ -380,14 +495,73 @@ class Trainer(object):
                 'is not supported. Try setting `update_on_kvstore` ' \
                 'to False when creating trainer.'
 
-        self._allreduce_grads()
+        self._allreduce_grads_once()
+
+    def _allreduce_grads_once(self):
+        """Reduces the gradients, unless the backward hook of `overlap_backward` already
+        did it for the current gradients. `_grads_reduced` is cleared by any later
+        backward pass that writes the gradients, so a reduction is only skipped if it
+        was issued for the gradients that are about to be used."""
+        reduced, overwritten = self._grads_reduced, self._grads_overwritten
+        self._grads_reduced = self._grads_overwritten = False
+        self._backward_contexts.clear()
+        if overwritten:
+            # the reduction was done in place, the contexts that were not written
+            # again hold the reduced gradients of the earlier passes
+            raise RuntimeError("With overlap_backward=True, the gradients reduced after "
+                               "backward was called on every context were overwritten "
+                               "on some of the contexts only before step. Run backward "
+                               "again on every context, or on none of them.")
+        if not reduced:
+            self._allreduce_grads()
+
+    def _init_grad_buckets(self):
+        """Packs the dense gradients into buckets of about `bucket_size` bytes."""
+        self._grad_buckets = []
+        if not self._bucket_size or self._update_on_kvstore:
+            return
+        # keys of the buckets follow the keys of the parameters, and are never reused
+        # because a key cannot be initialized twice
+        if self._next_bucket_key is None:
+            self._next_bucket_key = max(self._param2idx.values()) + 1
+        next_key = self._next_bucket_key
+        bucket = []
+        bucket_bytes = 0
+        # gradients of the last parameters are computed first by backward
+        for i in reversed(range(len(self._params))):
+            param = self._params[i]
+            if param.grad_req == 'null' or param in self._params_to_init or \
+                    param._grad_stype != 'default':
+                continue
+            grad = param.list_grad()[0]
+            if bucket and grad.dtype != bucket[0][1].dtype:
+                self._grad_buckets.append(_GradBucket(next_key, bucket, self._kvstore))
+                next_key += 1
+                bucket, bucket_bytes = [], 0
+            bucket.append((i, grad))
+            bucket_bytes += grad.size * np.dtype(grad.dtype).itemsize
+            if bucket_bytes >= self._bucket_size:
+                self._grad_buckets.append(_GradBucket(next_key, bucket, self._kvstore))
+                next_key += 1
+                bucket, bucket_bytes = [], 0
+        if bucket:
+            self._grad_buckets.append(_GradBucket(next_key, bucket, self._kvstore))
+            next_key += 1
+        self._next_bucket_key = next_key
 
     def _allreduce_grads(self):
         # nothing to reduce
         if not self._kvstore:
             return
+        if self._grad_buckets is None or \
+                any(bucket.is_stale(self._params) for bucket in self._grad_buckets):
+            self._init_grad_buckets()
+        bucketed = set()
+        for bucket in self._grad_buckets:
+            bucket.allreduce(self._kvstore, self._params)
+            bucketed.update(bucket.indices)
         for i, param in enumerate(self._params):
-            if param.grad_req != 'null':
+            if param.grad_req != 'null' and i not in bucketed:
                 idx = self._param2idx[param._uuid]
                 grad_list = param.list_grad()
                 # sparse gradients, call push and pull separately
@@ -439,12 +613,43 @@ class Trainer(object):
                 'to False when creating trainer.'
 
         self._check_and_rescale_grad(self._scale / batch_size)
+        if self._max_grad_norm is not None:
+            self._clip_grads()
         self._update(ignore_stale_grad)
 
+    def _clip_grads(self):
+        """Clips the reduced gradients by their global norm, without blocking."""
+        assert self._kvstore or len(self._contexts) == 1, \
+                'max_grad_norm with several contexts requires a kvstore to reduce ' \
+                'the gradients. Try setting `kvstore` to "device" when creating trainer.'
+        grads = [param.list_grad() for param in self._params
+                 if param.grad_req != 'null' and param._grad is not None]
+        if not grads:
+            return
+        is_np = isinstance(grads[0][0], _mx_np.ndarray)
+        if is_np:
+            grads = [[grad.as_nd_ndarray() for grad in grad_list] for grad_list in grads]
+        # the reduced gradients are the same on every context, so the norm of the first
+        # copy is the global norm. It is normalized the same way as in the optimizer.
+        total_norm = _global_norm([grad_list[0] for grad_list in grads])
+        total_norm = total_norm * self._optimizer.rescale_grad
+        loss_scaler = getattr(self, '_amp_loss_scaler', None)
+        if hasattr(loss_scaler, 'rescale_grad'):
+            total_norm = total_norm / loss_scaler.scale(total_norm.context)
+        scale, is_finite = _clip_scale(total_norm, self._max_grad_norm)
+        _rescale([grad for grad_list in grads for grad in grad_list], scale)
+        if is_np:
+            total_norm, is_finite = total_norm.as_np_ndarray(), is_finite.as_np_ndarray()
+        self._grad_norm, self._grad_norm_isfinite = total_norm, is_finite
+
     def _update(self, ignore_stale_grad=False):
         loss_scaler = getattr(self, '_amp_loss_scaler', None)
         if loss_scaler is not None:
-            if loss_scaler.has_overflow(self._params):
+            if hasattr(loss_scaler, 'rescale_grad'):
+                # overflow is checked on device and skips the update in the optimizer
+                self._optimizer.rescale_grad = loss_scaler.rescale_grad(
+                    self._params, self._optimizer.rescale_grad)
+            elif loss_scaler.has_overflow(self._params):
                 return  # skip on overflow
 
         updates = [[] for _ in self._updaters]
@@ -505,8 +710,30 @@ class Trainer(object):
                                              "parameters are not yet initialized in kvstore."
             self._kvstore.save_optimizer_states(fname, dump_optimizer=True)
         else:
-            with open(fname, 'wb') as fout:
-                fout.write(self._updaters[0].get_states(dump_optimizer=True))
+            self._updaters[0].save_states(fname, dump_optimizer=True)
+
+    def _snapshot_states(self):
+        """Copies trainer states to host memory for a deferred `save_states`.
+
+        Returns an Updater whose `save_states` with `dump_optimizer=True` writes
+        the file `save_states` would. The copies are asynchronous, so training can
+        continue while the snapshot is written out from another thread.
+        """
+        assert self._optimizer is not None
+
+        if not self._kv_initialized:
+            self._init_kvstore()
+        if self._params_to_init:
+            self._init_params()
+
+        if self._update_on_kvstore:
+            assert not self._params_to_init, "Cannot save trainer states when some " \
+                                             "parameters are not yet initialized in kvstore."
+            updater = self._kvstore._updater
+            assert updater is not None, "Cannot save states for distributed training"
+        else:
+            updater = self._updaters[0]
+        return updater._snapshot_states(cpu())
 
     def load_states(self, fname):
         """Loads trainer states (e.g. optimizer, momentum) from a file.
@@ -531,11 +758,65 @@ class Trainer(object):
             self._kvstore.load_optimizer_states(fname)
             self._optimizer = self._kvstore._updater.optimizer
         else:
-            with open(fname, 'rb') as f:
-                states = f.read()
             for updater in self._updaters:
-                updater.set_states(states)
+                updater.load_states(fname)
                 updater.optimizer = self._updaters[0].optimizer
             self._optimizer = self._updaters[0].optimizer
         param_dict = {i: param for i, param in enumerate(self._params)}
         self._optimizer.param_dict = param_dict
+
+
+class _GradBucket(object):
+    """Contiguous buffers holding the gradients of several parameters, one per context.
+
+    Parameters
+    ----------
+    key : int
+        The kvstore key of the bucket.
+    grads : list of (int, NDArray)
+        Index of each parameter in the Trainer and its gradient on the first context.
+    kvstore : KVStore
+        The kvstore that reduces the bucket.
+    """
+    def __init__(self, key, grads, kvstore):
+        self.key = key
+        self.indices = [i for i, _ in grads]
+        self.shapes = [grad.shape for _, grad in grads]
+        self.dtype = grads[0][1].dtype
+        sizes = [grad.size for _, grad in grads]
+        self.offsets = np.cumsum([0] + sizes).tolist()
+        # gradients of the first parameters are needed first by the next forward pass
+        self.priority = -min(self.indices)
+        self.buffers = None
+        self._views = None
+        self._kvstore = kvstore
+
+    def _init_buffers(self, grad_list):
+        self.buffers = [nd.zeros((self.offsets[-1],), ctx=grad.ctx, dtype=self.dtype)
+                        for grad in grad_list]
+        self._views = [[buf[begin:end].reshape(shape)
+                        for begin, end, shape in zip(self.offsets[:-1], self.offsets[1:],
+                                                     self.shapes)]
+                       for buf in self.buffers]
+        if isinstance(grad_list[0], _mx_np.ndarray):
+            self._views = [[view.as_np_ndarray() for view in views] for views in self._views]
+        self._kvstore.broadcast(self.key, self.buffers[0], self.buffers)
+
+    def is_stale(self, params):
+        """Whether the gradients no longer match the buffers, e.g. after `Parameter.cast`."""
+        return any(params[i].grad_req == 'null' or params[i].list_grad()[0].dtype != self.dtype
+                   or params[i].list_grad()[0].shape != shape
+                   for i, shape in zip(self.indices, self.shapes))
+
+    def allreduce(self, kvstore, params):
+        """Copies the gradients into the buffers, reduces them and copies them back."""
+        grad_lists = [params[i].list_grad() for i in self.indices]
+        if self.buffers is None:
+            self._init_buffers(grad_lists[0])
+        for grad_list, views in zip(grad_lists, zip(*self._views)):
+            for grad, view in zip(grad_list, views):
+                grad.copyto(view)
+        kvstore.pushpull(self.key, self.buffers, priority=self.priority)
+        for grad_list, views in zip(grad_lists, zip(*self._views)):
+            for grad, view in zip(grad_list, views):
+                view.copyto(grad)
@@ -20,7 +20,7 @@
 """Parallelization utility optimizer."""
 
 __all__ = ['split_data', 'split_and_load', 'clip_global_norm',
-           'check_sha1', 'download', 'replace_file']
+           'clip_global_norm_async', 'check_sha1', 'download', 'replace_file']
 
 import os
 import sys
@@ -114,6 +114,40 @@ def split_and_load(data, ctx_list, batch_axis=0, even_split=True):
     return [i.as_in_context(ctx) for i, ctx in zip(slices, ctx_list)]
 
 
+def _global_norm(arrays):
+    """Computes the 2-norm of all arrays on the context of the first array,
+    without waiting for the result."""
+    groups = collections.OrderedDict()
+    for arr in arrays:
+        groups.setdefault(arr.context, []).append(arr)
+    ctx = arrays[0].context
+    all_ctx_sum = []
+    for group in groups.values():
+        sum_sq = ndarray.multi_sum_sq(*group, num_arrays=len(group))
+        sum_sq = ndarray.add_n(*sum_sq)
+        all_ctx_sum.append(sum_sq.as_in_context(ctx))
+    return ndarray.add_n(*all_ctx_sum).sqrt()
+
+
+def _rescale(arrays, scale):
+    """Multiplies arrays in-place by a scale of shape (1,), copying it once per context."""
+    scales = {scale.context: scale}
+    for arr in arrays:
+        ctx = arr.context
+        if ctx not in scales:
+            scales[ctx] = scale.as_in_context(ctx)
+        arr *= scales[ctx]
+
+
+def _clip_scale(total_norm, max_norm):
+    """Returns the factor that brings `total_norm` down to `max_norm`, or 1 if
+    `total_norm` is not finite, together with the finiteness flag."""
+    is_finite = ndarray.contrib.isfinite(total_norm)
+    scale = ndarray.minimum(max_norm / (total_norm + 1e-8), 1.0)
+    scale = ndarray.where(is_finite, scale, ndarray.ones_like(scale))
+    return scale, is_finite
+
+
 def clip_global_norm(arrays, max_norm, check_isfinite=True):
     """Rescales NDArrays so that the sum of their 2-norm is smaller than `max_norm`.
 
@@ -123,7 +157,8 @@ def clip_global_norm(arrays, max_norm, check_isfinite=True):
     max_norm : float
     check_isfinite : bool, default True
          If True, check that the total_norm is finite (not nan or inf). This
-         requires a blocking .asscalar() call.
+         requires a blocking .asscalar() call. See `clip_global_norm_async`
+         for a version that never blocks.
 
     Returns
     -------
@@ -132,38 +167,53 @@ def clip_global_norm(arrays, max_norm, check_isfinite=True):
       False. Otherwise a float is returned.
 
     """
-    # group arrays by ctx
-    def group_by_ctx(arr_list):
-        groups = collections.defaultdict(list)
-        for arr in arr_list:
-            ctx = arr.context
-            groups[ctx].append(arr)
-        return groups
-    arrays_groups = group_by_ctx(arrays)
-    all_ctx_sum = []
-    ctx = arrays[0].context
-    for group in arrays_groups:
-        sum_sq = ndarray.multi_sum_sq(*arrays_groups[group],
-                                      num_arrays=len(arrays_groups[group]))
-        sum_sq = ndarray.add_n(*sum_sq)
-        all_ctx_sum.append(sum_sq.as_in_context(ctx))
-    # global reduce
-    total_norm = ndarray.add_n(*all_ctx_sum).sqrt()
+    total_norm = _global_norm(arrays)
     if check_isfinite:
         if not np.isfinite(total_norm.asscalar()):
             warnings.warn(
                 UserWarning('nan or inf is detected. '
                             'Clipping results will be undefined.'), stacklevel=2)
     scale = max_norm / (total_norm + 1e-8)
-    scale = ndarray.min(ndarray.concat(scale, ndarray.ones(1, ctx=ctx), dim=0))
-    for arr in arrays:
-        arr *= scale.as_in_context(arr.context)
+    scale = ndarray.minimum(scale, 1.0)
+    _rescale(arrays, scale)
     if check_isfinite:
         return total_norm.asscalar()
     else:
         return total_norm
 
 
+def clip_global_norm_async(arrays, max_norm):
+    """Rescales NDArrays so that the sum of their 2-norm is smaller than `max_norm`,
+    without synchronizing with the host.
+
+    The norm, the scale and the rescaling are all computed on device and only pushed
+    to the engine, so this can be called every iteration without stalling it. If the
+    norm is not finite (nan or inf), the arrays are left unchanged.
+
+    Parameters
+    ----------
+    arrays : list of NDArray
+    max_norm : float
+
+    Returns
+    -------
+    total_norm : NDArray
+      Total norm, of shape (1,), on the context of the first array.
+    is_finite : NDArray
+      1 if the total norm is finite, 0 otherwise. Of shape (1,), on the context of the
+      first array. Reading it blocks until the norm has been computed.
+    """
+    is_np = isinstance(arrays[0], _mx_np.ndarray)
+    if is_np:
+        arrays = [arr.as_nd_ndarray() for arr in arrays]
+    total_norm = _global_norm(arrays)
+    scale, is_finite = _clip_scale(total_norm, max_norm)
+    _rescale(arrays, scale)
+    if is_np:
+        return total_norm.as_np_ndarray(), is_finite.as_np_ndarray()
+    return total_norm, is_finite
+
+
 def _indent(s_, numSpaces):
     """Indent string
     """
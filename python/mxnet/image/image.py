@@ -25,8 +25,11 @@ import os
 import random
 import logging
 import json
+import threading
 import warnings
 
+from collections import deque
+from multiprocessing.pool import ThreadPool
 from numbers import Number
 
 import numpy as np
@@ -44,7 +47,7 @@ from .. import ndarray as nd
 from ..ndarray import _internal
 from .. import io
 from .. import recordio
-from .. util import is_np_array
+from .. util import is_np_array, is_np_shape, set_np
 from ..ndarray.numpy import _internal as _npi
 
 
@@ -159,7 +162,7 @@ def imdecode(buf, *args, **kwargs):
 
     Parameters
     ----------
-    buf : str/bytes/bytearray or numpy.ndarray
+    buf : str/bytes/bytearray/memoryview or numpy.ndarray
         Binary image data as string or numpy ndarray.
     flag : int, optional, default=1
         1 for three channel color output. 0 for grayscale output.
@@ -201,8 +204,8 @@ def imdecode(buf, *args, **kwargs):
     <NDArray 224x224x3 @cpu(0)>
     """
     if not isinstance(buf, nd.NDArray):
-        if not isinstance(buf, (bytes, bytearray, np.ndarray)):
-            raise ValueError('buf must be of type bytes, bytearray or numpy.ndarray,'
+        if not isinstance(buf, (bytes, bytearray, memoryview, np.ndarray)):
+            raise ValueError('buf must be of type bytes, bytearray, memoryview or numpy.ndarray,'
                              'if you would like to input type str, please convert to bytes')
         array_fn = _mx_np.array if is_np_array() else nd.array
         buf = array_fn(np.frombuffer(buf, dtype=np.uint8), dtype=np.uint8)
@@ -945,6 +948,14 @@ class RandomOrderAug(Augmenter):
             src = t(src)
         return src
 
+    def _fusable(self):
+        return all(_is_fusable(t) for t in self.ts)
+
+    def _fuse(self, affine):
+        random.shuffle(self.ts)
+        for t in self.ts:
+            t._fuse(affine)
+
 
 class BrightnessJitterAug(Augmenter):
     """Random brightness jitter augmentation.
@@ -964,6 +975,10 @@ class BrightnessJitterAug(Augmenter):
         src *= alpha
         return src
 
+    def _fuse(self, affine):
+        alpha = 1.0 + random.uniform(-self.brightness, self.brightness)
+        affine.transform(alpha * np.eye(3))
+
 
 class ContrastJitterAug(Augmenter):
     """Random contrast jitter augmentation.
@@ -987,6 +1002,12 @@ class ContrastJitterAug(Augmenter):
         src += gray
         return src
 
+    def _fuse(self, affine):
+        alpha = 1.0 + random.uniform(-self.contrast, self.contrast)
+        # the mean gray level of the image is added to every channel
+        coef = self.coef.asnumpy().reshape((3, 1))
+        affine.transform(alpha * np.eye(3), mean_mat=(1.0 - alpha) * coef.dot(np.ones((1, 3))))
+
 
 class SaturationJitterAug(Augmenter):
     """Random saturation jitter augmentation.
@@ -1011,6 +1032,11 @@ class SaturationJitterAug(Augmenter):
         src += gray
         return src
 
+    def _fuse(self, affine):
+        alpha = 1.0 + random.uniform(-self.saturation, self.saturation)
+        coef = self.coef.asnumpy().reshape((3, 1))
+        affine.transform(alpha * np.eye(3) + (1.0 - alpha) * coef.dot(np.ones((1, 3))))
+
 
 class HueJitterAug(Augmenter):
     """Random hue jitter augmentation.
@@ -1045,6 +1071,15 @@ class HueJitterAug(Augmenter):
         src = nd.dot(src, nd.array(t))
         return src
 
+    def _fuse(self, affine):
+        alpha = random.uniform(-self.hue, self.hue)
+        u = np.cos(alpha * np.pi)
+        w = np.sin(alpha * np.pi)
+        bt = np.array([[1.0, 0.0, 0.0],
+                       [0.0, u, -w],
+                       [0.0, w, u]])
+        affine.transform(np.dot(np.dot(self.ityiq, bt), self.tyiq).T)
+
 
 class ColorJitterAug(RandomOrderAug):
     """Apply random brightness, contrast and saturation jitter in random order.
@@ -1094,6 +1129,10 @@ class LightingAug(Augmenter):
         src += nd.array(rgb)
         return src
 
+    def _fuse(self, affine):
+        alpha = np.random.normal(0, self.alphastd, size=(3,))
+        affine.transform(np.eye(3), np.dot(self.eigvec * alpha, self.eigval))
+
 
 class ColorNormalizeAug(Augmenter):
     """Mean and std normalization.
@@ -1114,6 +1153,25 @@ class ColorNormalizeAug(Augmenter):
         """Augmenter body"""
         return color_normalize(src, self.mean, self.std)
 
+    def apply_batch(self, src):
+        """Normalizes a batch of images in NCHW layout."""
+        for stat, op in ((self.mean, 'sub'), (self.std, 'div')):
+            if stat is None:
+                continue
+            stat = stat.as_in_context(src.context).reshape((1, -1, 1, 1))
+            if is_np_array():
+                stat = stat.as_np_ndarray()
+                src = src - stat if op == 'sub' else src / stat
+            else:
+                src = getattr(nd, 'broadcast_' + op)(src, stat)
+        return src
+
+    def _fuse(self, affine):
+        mean = np.zeros(3) if self.mean is None else self.mean.asnumpy()
+        std = np.ones(3) if self.std is None else self.std.asnumpy()
+        scale = np.diag(np.broadcast_to(1.0 / std, (3,)))
+        affine.transform(scale, -np.broadcast_to(mean, (3,)).dot(scale))
+
 
 class RandomGrayAug(Augmenter):
     """Randomly convert to gray image.
@@ -1136,6 +1194,10 @@ class RandomGrayAug(Augmenter):
             src = nd.dot(src, self.mat)
         return src
 
+    def _fuse(self, affine):
+        if random.random() < self.p:
+            affine.transform(self.mat.asnumpy())
+
 
 class HorizontalFlipAug(Augmenter):
     """Random horizontal flip.
@@ -1167,10 +1229,102 @@ class CastAug(Augmenter):
         src = src.astype(self.typ)
         return src
 
+    def apply_batch(self, src):
+        """Casts a batch of images."""
+        return src.astype(self.typ)
+
+
+class _ColorAffine(object):
+    """Per-pixel affine color transform ``p M + b + m K``, with ``p`` an RGB pixel
+    and ``m`` the mean pixel of the input image."""
+    def __init__(self):
+        self.M = np.eye(3)
+        self.b = np.zeros(3)
+        self.K = np.zeros((3, 3))
+
+    def transform(self, mat, bias=0, mean_mat=None):
+        """Follow the transform with ``p mat + bias + q mean_mat``, where ``q`` is
+        the mean pixel of the current output."""
+        K = self.K.dot(mat)
+        b = self.b.dot(mat) + bias
+        if mean_mat is not None:
+            K += (self.M + self.K).dot(mean_mat)
+            b += self.b.dot(mean_mat)
+        self.M = self.M.dot(mat)
+        self.K = K
+        self.b = b
+
+
+def _is_fusable(aug):
+    fusable = getattr(aug, '_fusable', None)
+    return fusable() if fusable is not None else hasattr(aug, '_fuse')
+
+
+class FusedColorAug(Augmenter):
+    """Applies a chain of color augmenters as one affine transform per image.
+
+    Brightness, contrast, saturation, hue, lighting, gray and normalization
+    augmenters are all affine in the RGB value of a pixel. The random parameters
+    of every augmenter are drawn in the same order as by applying the chain, and
+    the composed transform is applied with a single matrix product, instead of
+    several operators and temporary arrays per augmenter.
+
+    Parameters
+    ----------
+    ts : list of augmenters
+        Color augmenters to fuse, optionally starting with a `CastAug`.
+    """
+    def __init__(self, ts):
+        super(FusedColorAug, self).__init__()
+        self.ts = ts
+        self.typ = ts[0].typ if ts and isinstance(ts[0], CastAug) else None
+        assert all(_is_fusable(t) for t in ts[1 if self.typ else 0:]), \
+            "FusedColorAug only supports color augmenters"
+
+    def dumps(self):
+        """Override the default to avoid duplicate dump."""
+        return [self.__class__.__name__.lower(), [x.dumps() for x in self.ts]]
+
+    def __call__(self, src):
+        """Augmenter body"""
+        affine = _ColorAffine()
+        for t in self.ts[1 if self.typ else 0:]:
+            t._fuse(affine)
+        if self.typ:
+            src = src.astype(self.typ)
+        ctx, dtype = src.context, src.dtype
+        bias = nd.array(affine.b, ctx=ctx, dtype=dtype)
+        if affine.K.any():
+            bias = bias + nd.dot(nd.mean(src, axis=(0, 1)),
+                                 nd.array(affine.K, ctx=ctx, dtype=dtype))
+        if not (affine.M == np.eye(3)).all():
+            src = nd.dot(src, nd.array(affine.M, ctx=ctx, dtype=dtype))
+        return nd.broadcast_add(src, bias.reshape((1, 1, 3)))
+
+
+def _fuse_augmenters(auglist):
+    """Replaces runs of color augmenters in auglist by a FusedColorAug."""
+    fused = []
+    run = []
+    for aug in auglist:
+        if _is_fusable(aug) or (isinstance(aug, CastAug) and not run):
+            run.append(aug)
+            continue
+        if run:
+            fused.append(FusedColorAug(run) if len(run) > 1 else run[0])
+            run = []
+        if isinstance(aug, CastAug):
+            run.append(aug)
+        else:
+            fused.append(aug)
+    if run:
+        fused.append(FusedColorAug(run) if len(run) > 1 else run[0])
+    return fused
+
 
 def CreateAugmenter(data_shape, resize=0, rand_crop=False, rand_resize=False, rand_mirror=False,
                     mean=None, std=None, brightness=0, contrast=0, saturation=0, hue=0,
-                    pca_noise=0, rand_gray=0, inter_method=2):
+                    pca_noise=0, rand_gray=0, inter_method=2, fuse=False):
     """Creates an augmenter list.
 
     Parameters
@@ -1220,6 +1374,9 @@ def CreateAugmenter(data_shape, resize=0, rand_crop=False, rand_resize=False, ra
         When shrinking an image, it will generally look best with AREA-based
         interpolation, whereas, when enlarging an image, it will generally look best
         with Bicubic (slow) or Bilinear (faster but still looks OK).
+    fuse : bool, default False
+        Whether to replace the cast and all following color augmenters by one
+        `FusedColorAug`, which applies them as a single affine transform per image.
 
     Examples
     --------
@@ -1279,9 +1436,14 @@ def CreateAugmenter(data_shape, resize=0, rand_crop=False, rand_resize=False, ra
     if mean is not None or std is not None:
         auglist.append(ColorNormalizeAug(mean, std))
 
+    if fuse:
+        auglist = _fuse_augmenters(auglist)
     return auglist
 
 
+_END_OF_DATA = object()
+
+
 class ImageIter(io.DataIter):
     """Image data iterator with a large number of augmentation choices.
     This iterator supports reading from both .rec files and raw image files.
@@ -1333,6 +1495,23 @@ class ImageIter(io.DataIter):
         If 'pad', the last batch will be padded with data starting from the begining
         If 'discard', the last batch will be discarded
         If 'roll_over', the remaining elements will be rolled over to the next iteration
+    num_workers : int, default 0
+        Number of threads that decode and augment images. If 0, images are processed
+        on the calling thread. Samples are still read in order on the calling thread,
+        so the order of the images and the handling of the last batch are unchanged.
+        Each image is augmented with the Python and NumPy random generators seeded
+        from a number drawn on the calling thread, so a seeded run is reproducible for
+        any `num_workers` > 0, although it differs from a run with `num_workers` = 0.
+        Only the decoding runs in parallel, the augmenters of different images take
+        turns.
+    prefetch : int, default 1
+        Number of batches whose images are read and submitted to the workers ahead
+        of the batch being returned. Only used if `num_workers` > 0.
+    batched_tail : bool, default False
+        If True, images are stacked in HWC layout and the transpose to CHW, as well
+        as the trailing augmenters that support batches (`CastAug` and
+        `ColorNormalizeAug`), are applied once to the whole batch instead of to
+        every image. `postprocess_batch` replaces `postprocess_data` in this mode.
     kwargs : ...
         More arguments for creating augmenter. See mx.image.CreateAugmenter.
     """
@@ -1341,7 +1520,8 @@ class ImageIter(io.DataIter):
                  path_imgrec=None, path_imglist=None, path_root=None, path_imgidx=None,
                  shuffle=False, part_index=0, num_parts=1, aug_list=None, imglist=None,
                  data_name='data', label_name='softmax_label', dtype='float32',
-                 last_batch_handle='pad', **kwargs):
+                 last_batch_handle='pad', num_workers=0, prefetch=1, batched_tail=False,
+                 **kwargs):
         super(ImageIter, self).__init__()
         assert path_imgrec or path_imglist or (isinstance(imglist, list))
         assert dtype in ['int32', 'float32', 'int64', 'float64'], dtype + ' label not supported'
@@ -1423,6 +1603,12 @@ class ImageIter(io.DataIter):
             self.auglist = CreateAugmenter(data_shape, **kwargs)
         else:
             self.auglist = aug_list
+        self.batched_tail = batched_tail
+        self._num_batch_augs = 0
+        if batched_tail:
+            while self._num_batch_augs < len(self.auglist) and hasattr(
+                    self.auglist[-1 - self._num_batch_augs], 'apply_batch'):
+                self._num_batch_augs += 1
         self.cur = 0
         self._allow_read = True
         self.last_batch_handle = last_batch_handle
@@ -1430,12 +1616,28 @@ class ImageIter(io.DataIter):
         self._cache_data = None
         self._cache_label = None
         self._cache_idx = None
+        self._pool = None
+        # samples read ahead of the current batch, as (label, pending result) pairs
+        # and a trailing _END_OF_DATA if reading stopped with StopIteration
+        self._lookahead = deque()
+        self._prefetch = prefetch
+        # guards the global random state, which the workers reseed for every image
+        self._rng_lock = threading.Lock()
+        if num_workers > 0:
+            self._pool = ThreadPool(num_workers, initializer=set_np,
+                                    initargs=(is_np_shape(), is_np_array()))
         self.reset()
 
+    def __del__(self):
+        if getattr(self, '_pool', None) is not None:
+            self._pool.terminate()
+
     def reset(self):
         """Resets the iterator to the beginning of the data."""
+        self._lookahead.clear()
         if self.seq is not None and self.shuffle:
-            random.shuffle(self.seq)
+            with self._rng_lock:
+                random.shuffle(self.seq)
         if self.last_batch_handle != 'roll_over' or \
             self._cache_data is None:
             if self.imgrec is not None:
@@ -1446,8 +1648,10 @@ class ImageIter(io.DataIter):
 
     def hard_reset(self):
         """Resets the iterator and ignore roll over data"""
+        self._lookahead.clear()
         if self.seq is not None and self.shuffle:
-            random.shuffle(self.seq)
+            with self._rng_lock:
+                random.shuffle(self.seq)
         if self.imgrec is not None:
             self.imgrec.reset()
         self.cur = 0
@@ -1487,10 +1691,60 @@ class ImageIter(io.DataIter):
             header, img = recordio.unpack(s)
             return header.label, img
 
+    def _read_ahead(self, num_samples):
+        """Reads samples until `num_samples` are pending and submits them to the workers."""
+        while len(self._lookahead) < num_samples and \
+                not (self._lookahead and self._lookahead[-1] is _END_OF_DATA):
+            try:
+                label, s = self.next_sample()
+            except StopIteration:
+                self._lookahead.append(_END_OF_DATA)
+                break
+            with self._rng_lock:
+                seed = random.getrandbits(32)
+            self._lookahead.append((label, self._pool.apply_async(self._process_sample,
+                                                                  (s, seed))))
+
+    def _process_sample(self, s, seed):
+        """Decodes and augments one sample with the random generators seeded by `seed`,
+        returns None for an invalid image."""
+        data = self.imdecode(s)
+        try:
+            self.check_valid_image(data)
+        except RuntimeError as e:
+            logging.debug('Invalid image, skipping:  %s', str(e))
+            return None
+        with self._rng_lock:
+            state, np_state = random.getstate(), np.random.get_state()
+            random.seed(seed)
+            np.random.seed(seed)
+            try:
+                data = self.augmentation_transform(data)
+            finally:
+                random.setstate(state)
+                np.random.set_state(np_state)
+        return data if self.batched_tail else self.postprocess_data(data)
+
     def _batchify(self, batch_data, batch_label, start=0):
         """Helper function for batchifying data"""
         i = start
         batch_size = self.batch_size
+        if self._pool is not None:
+            while i < batch_size:
+                self._read_ahead(batch_size - i)
+                item = self._lookahead.popleft()
+                if item is _END_OF_DATA:
+                    if not i:
+                        raise StopIteration
+                    break
+                label, result = item
+                data = result.get()
+                if data is None:
+                    continue
+                batch_data[i] = data
+                batch_label[i] = label
+                i += 1
+            return i
         try:
             while i < batch_size:
                 label, s = self.next_sample()
@@ -1502,7 +1756,7 @@ class ImageIter(io.DataIter):
                     continue
                 data = self.augmentation_transform(data)
                 assert i < batch_size, 'Batch size must be multiples of augmenter output length'
-                batch_data[i] = self.postprocess_data(data)
+                batch_data[i] = data if self.batched_tail else self.postprocess_data(data)
                 batch_label[i] = label
                 i += 1
         except StopIteration:
@@ -1530,7 +1784,8 @@ class ImageIter(io.DataIter):
             else:
                 zeros_fn = nd.zeros
                 empty_fn = nd.empty
-            batch_data = zeros_fn((batch_size, c, h, w))
+            batch_data = zeros_fn((batch_size, h, w, c) if self.batched_tail
+                                  else (batch_size, c, h, w))
             batch_label = empty_fn(self.provide_label[0][1])
             i = self._batchify(batch_data, batch_label)
         # calculate the padding
@@ -1555,6 +1810,11 @@ class ImageIter(io.DataIter):
                 self._cache_label = None
                 self._cache_idx = None
 
+        if self._pool is not None:
+            # start on the next batches while this one is consumed
+            self._read_ahead(self._prefetch * batch_size)
+        if self.batched_tail:
+            batch_data = self.postprocess_batch(batch_data)
         return io.DataBatch([batch_data], [batch_label], pad=pad)
 
     def check_data_shape(self, data_shape):
@@ -1602,7 +1862,7 @@ class ImageIter(io.DataIter):
 
     def augmentation_transform(self, data):
         """Transforms input data with specified augmentation."""
-        for aug in self.auglist:
+        for aug in self.auglist[:len(self.auglist) - self._num_batch_augs]:
             data = aug(data)
         return data
 
@@ -1612,3 +1872,13 @@ class ImageIter(io.DataIter):
             return datum.transpose(2, 0, 1)
         else:
             return nd.transpose(datum, axes=(2, 0, 1))
+
+    def postprocess_batch(self, batch):
+        """Final postprocessing step on a whole NHWC batch with `batched_tail`."""
+        if is_np_array():
+            batch = batch.transpose(0, 3, 1, 2)
+        else:
+            batch = nd.transpose(batch, axes=(0, 3, 1, 2))
+        for aug in self.auglist[len(self.auglist) - self._num_batch_augs:]:
+            batch = aug.apply_batch(batch)
+        return batch
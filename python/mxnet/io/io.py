@@ -35,7 +35,8 @@ from ..ndarray import NDArray
 from ..ndarray.sparse import CSRNDArray
 from ..util import is_np_array
 from ..ndarray import array
-from ..ndarray import concat, tile
+from ..ndarray import concat, tile, take
+from .. import numpy as _mx_np
 
 from .utils import _init_data, _has_instance, _getdata_by_idx
 
@@ -589,8 +590,10 @@ class NDArrayIter(DataIter):
     batch_size: int
         Batch size of data.
     shuffle: bool, optional
-        Whether to shuffle the data.
-        Only supported if no h5py.Dataset inputs are used.
+        Whether to shuffle the data. Only the order of the sample indices is
+        shuffled, and each batch is gathered from the inputs when it is read, so
+        no shuffled copy of the inputs is made. ``CSRNDArray`` inputs are
+        still permuted as a whole.
     last_batch_handle : str, optional
         How to handle the last batch. This parameter can be 'pad', 'discard' or
         'roll_over'.
@@ -602,10 +605,15 @@ class NDArrayIter(DataIter):
         The data name.
     label_name : str, optional
         The label name.
+    shuffle_chunk_size : int, optional
+        If specified, `shuffle` permutes blocks of this many consecutive samples
+        and the samples within each block, so that every batch is read from a few
+        contiguous ranges of the inputs. Intended for h5py.Dataset inputs, for
+        which reading scattered samples is slow.
     """
     def __init__(self, data, label=None, batch_size=1, shuffle=False,
                  last_batch_handle='pad', data_name='data',
-                 label_name='softmax_label'):
+                 label_name='softmax_label', shuffle_chunk_size=None):
         super(NDArrayIter, self).__init__(batch_size)
 
         self.data = _init_data(data, allow_empty=False, default_name=data_name)
@@ -617,8 +625,12 @@ class NDArrayIter(DataIter):
             raise NotImplementedError("`NDArrayIter` only supports ``CSRNDArray``" \
                                       " with `last_batch_handle` set to `discard`.")
 
+        # unshuffled inputs, the sparse ones are permuted from them on each shuffle
+        self._data_source = self.data
+        self._label_source = self.label
         self.idx = np.arange(self.data[0][1].shape[0])
         self.shuffle = shuffle
+        self.shuffle_chunk_size = shuffle_chunk_size
         self.last_batch_handle = last_batch_handle
         self.batch_size = batch_size
         self.cursor = -self.batch_size
@@ -696,15 +708,33 @@ class NDArrayIter(DataIter):
         if end is None:
             end = data_source[0][1].shape[0] if data_source else 0
         s = slice(start, end)
-        return [
-            x[1][s]
-            if isinstance(x[1], (np.ndarray, NDArray)) else
-            # h5py (only supports indices in increasing order)
-            array(x[1][sorted(self.idx[s])][[
-                list(self.idx[s]).index(i)
-                for i in sorted(self.idx[s])
-            ]]) for x in data_source
-        ]
+        return [self._gather(x[1], s) for x in data_source]
+
+    def _gather(self, source, s):
+        """Read the samples at positions `s` of the shuffled order from source."""
+        if isinstance(source, CSRNDArray) or \
+                (not self.shuffle and isinstance(source, (np.ndarray, NDArray))):
+            return source[s]
+        idx = self.idx[s]
+        if isinstance(source, _mx_np.ndarray):
+            return _mx_np.take(source, _mx_np.array(idx, ctx=source.ctx, dtype=np.int64), axis=0)
+        if isinstance(source, NDArray):
+            return take(source, array(idx, ctx=source.context, dtype=np.int64), axis=0)
+        # h5py (only supports indices in increasing order)
+        if not self.shuffle:
+            return array(source[s])
+        order = np.argsort(idx)
+        sorted_idx = idx[order]
+        if self.shuffle_chunk_size:
+            # read each shuffle chunk touched by the batch as one contiguous range
+            chunks = np.split(sorted_idx, np.flatnonzero(
+                np.diff(sorted_idx // self.shuffle_chunk_size)) + 1)
+            rows = np.concatenate([source[c[0]:c[-1] + 1][c - c[0]] for c in chunks])
+        else:
+            rows = source[sorted_idx]
+        batch = np.empty_like(rows)
+        batch[order] = rows
+        return array(batch)
 
     def _concat(self, first_data, second_data):
         """Helper function to concat two NDArrays."""
@@ -791,10 +821,19 @@ class NDArrayIter(DataIter):
     def _shuffle_data(self):
         """Shuffle the data."""
         # shuffle index
-        np.random.shuffle(self.idx)
-        # get the data by corresponding index
-        self.data = _getdata_by_idx(self.data, self.idx)
-        self.label = _getdata_by_idx(self.label, self.idx)
+        if self.shuffle_chunk_size:
+            chunks = np.split(np.arange(self.num_data),
+                              np.arange(self.shuffle_chunk_size, self.num_data,
+                                        self.shuffle_chunk_size))
+            np.random.shuffle(chunks)
+            for chunk in chunks:
+                np.random.shuffle(chunk)
+            self.idx = np.concatenate(chunks)
+        else:
+            np.random.shuffle(self.idx)
+        # only sparse data is permuted, the rest is gathered by index in _getdata
+        self.data = _getdata_by_idx(self._data_source, self.idx)
+        self.label = _getdata_by_idx(self._label_source, self.idx)
 
 class MXDataIter(DataIter):
     """A python wrapper a C++ data iterator.
@@ -72,15 +72,16 @@ def _has_instance(data, dtype):
 
 
 def _getdata_by_idx(data, idx):
-    """Shuffle the data."""
+    """Shuffle the sparse arrays of the data.
+
+    Dense arrays and h5py datasets are returned as is, their batches are gathered
+    by index when they are read."""
     shuffle_data = []
 
     for k, v in data:
-        if (isinstance(v, h5py.Dataset) if h5py else False):
-            shuffle_data.append((k, v))
-        elif isinstance(v, CSRNDArray):
+        if isinstance(v, CSRNDArray):
             shuffle_data.append((k, sparse_array(v.asscipy()[idx], v.context)))
         else:
-            shuffle_data.append((k, array(v.asnumpy()[idx], v.context)))
+            shuffle_data.append((k, v))
 
     return shuffle_data
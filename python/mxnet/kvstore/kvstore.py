@@ -657,8 +657,7 @@ class KVStore(KVStoreBase):
             information such as learning rate and weight decay schedules.
         """
         assert self._updater is not None, "Cannot save states for distributed training"
-        with open(fname, 'wb') as fout:
-            fout.write(self._updater.get_states(dump_optimizer))
+        self._updater.save_states(fname, dump_optimizer)
 
     def load_optimizer_states(self, fname):
         """Loads the optimizer (updater) state from the file.
@@ -669,7 +668,7 @@ class KVStore(KVStoreBase):
             Path to input states file.
         """
         assert self._updater is not None, "Cannot load states for distributed training"
-        self._updater.set_states(open(fname, 'rb').read())
+        self._updater.load_states(fname)
 
     def _set_updater(self, updater):
         """Sets a push updater into the store.
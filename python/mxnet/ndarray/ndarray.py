@@ -2905,16 +2905,23 @@ fixed-size items.
         else:
             ograd_handles = [out_grad.handle]
 
-        check_call(_LIB.MXAutogradBackwardEx(
-            1, c_handle_array([self]),
-            c_array(NDArrayHandle, ograd_handles),
-            0,
-            ctypes.c_void_p(0),
-            ctypes.c_int(retain_graph),
-            ctypes.c_int(0),
-            ctypes.c_int(train_mode),
-            ctypes.c_void_p(0),
-            ctypes.c_void_p(0)))
+        from ..autograd import _BACKWARD_HOOKS, _run_backward_hooks, _run_backward_callbacks
+        callbacks = _run_backward_hooks([self]) if _BACKWARD_HOOKS else []
+        try:
+            check_call(_LIB.MXAutogradBackwardEx(
+                1, c_handle_array([self]),
+                c_array(NDArrayHandle, ograd_handles),
+                0,
+                ctypes.c_void_p(0),
+                ctypes.c_int(retain_graph),
+                ctypes.c_int(0),
+                ctypes.c_int(train_mode),
+                ctypes.c_void_p(0),
+                ctypes.c_void_p(0)))
+        except:  # pylint: disable=bare-except
+            _run_backward_callbacks(callbacks, False)
+            raise
+        _run_backward_callbacks(callbacks, True)
 
     def tostype(self, stype):
         """Return a copy of the array with chosen storage type.
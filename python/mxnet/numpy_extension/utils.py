@@ -20,6 +20,11 @@
 
 
 import ctypes
+import struct
+import zipfile
+
+import numpy as _np
+
 from ..util import is_np_array, is_np_shape
 from ..base import _LIB, check_call, string_types, c_str_array
 from ..base import c_handle_array, c_str, mx_uint, NDArrayHandle, py_str
@@ -121,6 +126,46 @@ def savez(file, *args, **kwds):
     check_call(_LIB.MXNDArraySave(c_str(file), mx_uint(len(handles)), handles, keys))
 
 
+def _mmap_npz(filename):
+    """Memory-maps the arrays of an uncompressed ``.npz`` file, such as written by
+    `save_parameters` under NumPy semantics or by `mx.npx.savez`.
+
+    The central directory of the archive is used as an index, so nothing but the
+    headers is read until an array is accessed.
+
+    Returns
+    -------
+    dict of str to numpy.memmap, or None
+        None if the file is not an uncompressed ``.npz`` of dense arrays.
+    """
+    if not zipfile.is_zipfile(filename):
+        return None
+    arrays = {}
+    try:
+        with open(filename, 'rb') as f, zipfile.ZipFile(f) as archive:
+            for info in archive.infolist():
+                name = info.filename
+                # sparse arrays are stored as several members in a folder
+                if '/' in name or not name.endswith('.npy') or \
+                        info.compress_type != zipfile.ZIP_STORED:
+                    return None
+                # the local header is 30 bytes followed by the name and an extra field
+                f.seek(info.header_offset + 26)
+                name_len, extra_len = struct.unpack('<HH', f.read(4))
+                f.seek(info.header_offset + 30 + name_len + extra_len)
+                version = _np.lib.format.read_magic(f)
+                if version == (1, 0):
+                    shape, fortran_order, dtype = _np.lib.format.read_array_header_1_0(f)
+                else:
+                    shape, fortran_order, dtype = _np.lib.format.read_array_header_2_0(f)
+                arrays[name[:-len('.npy')]] = _np.memmap(
+                    filename, dtype=dtype, mode='r', offset=f.tell(), shape=shape,
+                    order='F' if fortran_order else 'C')
+    except (ValueError, OSError, struct.error, zipfile.BadZipFile):
+        return None
+    return arrays
+
+
 def load(file):
     """Load arrays from ``.npy``, ``.npz`` or legacy MXNet file format.
 
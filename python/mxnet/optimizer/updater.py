@@ -17,10 +17,16 @@
 # under the License.
 """Updater class."""
 from __future__ import absolute_import
+import copy
+import json
 import pickle
+import zipfile
 import numpy
 from ..base import py_str
-from ..ndarray import NDArray
+from ..context import cpu
+from ..ndarray import NDArray, array, load
+from ..numpy import ndarray as np_ndarray
+from ..numpy_extension.utils import savez, _mmap_npz
 from ..profiler import scope as profiler_scope
 from ..util import is_np_array
 from .utils import _as_classic
@@ -125,6 +131,159 @@ class Updater(object):
         """
         return pickle.dumps((self.states, self.optimizer) if dump_optimizer else self.states)
 
+    def save_states(self, fname, dump_optimizer=False):
+        """Saves updater states to a file without pickling the state arrays.
+
+        Every state array is streamed to its own member of an uncompressed ``.npz``
+        archive, so no serialized copy of the states is built in memory. A JSON
+        manifest member records how the arrays nest in the state of each index,
+        along with the scalar hyperparameters of the optimizer. State values that are
+        neither arrays, tuples, lists nor scalars are pickled together into one member.
+
+        Parameters
+        ----------
+        fname : str
+            Path to the output states file.
+        dump_optimizer : bool, default False
+            Whether to also save the optimizer itself. This would also save optimizer
+            information such as learning rate and weight decay schedules.
+        """
+        arrays = {}
+        objects = []
+        manifest = {'version': _STATES_VERSION,
+                    'states': [[k, _encode_state(v, arrays, objects)]
+                               for k, v in self.states.items()]}
+        if objects:
+            arrays[_OBJECTS_KEY] = _bytes_to_array(pickle.dumps(objects))
+        if dump_optimizer:
+            manifest['optimizer'] = {
+                'class': type(self.optimizer).__name__,
+                'hyperparameters': {k: v for k, v in self.optimizer.__getstate__().items()
+                                    if isinstance(v, (bool, int, float, str))}}
+            # schedulers and index maps have no JSON form, the object itself is kept
+            arrays[_OPTIMIZER_KEY] = _bytes_to_array(pickle.dumps(self.optimizer))
+        arrays[_MANIFEST_KEY] = _bytes_to_array(json.dumps(manifest).encode('utf-8'))
+        savez(fname, **arrays)
+
+    def load_states(self, fname, indices=None):
+        """Loads updater states from a file written by `save_states`.
+
+        The arrays of the file are memory-mapped and copied one at a time, so only
+        the states requested are read. Files written from `get_states` are
+        supported as well.
+
+        Parameters
+        ----------
+        fname : str
+            Path to input states file.
+        indices : list of int or str, optional
+            Indices whose states are loaded. The states of other indices are left
+            untouched. By default, all states are loaded and replace the current ones.
+        """
+        if zipfile.is_zipfile(fname):
+            arrays = _mmap_npz(fname)
+            if arrays is None:
+                # sparse states are stored in several members and cannot be mapped
+                arrays = load(fname)
+            manifest = json.loads(_array_to_bytes(arrays[_MANIFEST_KEY]).decode('utf-8'))
+            if manifest['version'] > _STATES_VERSION:
+                raise ValueError("Optimizer states file %s has version %d, which is not "
+                                 "supported by this version of MXNet"
+                                 % (fname, manifest['version']))
+            wanted = None if indices is None else set(indices)
+            objects = []
+            if _OBJECTS_KEY in arrays:
+                objects = pickle.loads(_array_to_bytes(arrays[_OBJECTS_KEY]))
+            states = {k: _decode_state(v, arrays, objects) for k, v in manifest['states']
+                      if wanted is None or k in wanted}
+            optimizer = None
+            if _OPTIMIZER_KEY in arrays:
+                optimizer = pickle.loads(_array_to_bytes(arrays[_OPTIMIZER_KEY]))
+        else:
+            with open(fname, 'rb') as f:
+                states = pickle.loads(f.read())
+            optimizer = None
+            if isinstance(states, tuple) and len(states) == 2:
+                states, optimizer = states
+            if indices is not None:
+                states = {k: states[k] for k in indices if k in states}
+        if optimizer is not None:
+            self.optimizer = optimizer
+        if indices is None:
+            self.states = states
+            self.states_synced = dict.fromkeys(self.states.keys(), False)
+        else:
+            self.states.update(states)
+            self.states_synced.update(dict.fromkeys(states.keys(), False))
+
+    def _copy_state_to(self, state, context):
+        """Copies NDArrays nested in a state to context, even if already there."""
+        if isinstance(state, NDArray):
+            return state.copyto(context)
+        elif isinstance(state, (tuple, list)):
+            return type(state)(self._copy_state_to(i, context) for i in state)
+        else:
+            # other values may be updated in place, e.g. numpy arrays
+            return copy.deepcopy(state)
+
+    def _snapshot_states(self, context):
+        """Returns an Updater holding copies of the states on context.
+
+        The copies are pushed to the engine behind any pending update, so later
+        updates do not affect them. Saving the snapshot blocks until the copies
+        are done, which can happen on another thread.
+        """
+        # pickling round trip as a deep copy that honors Optimizer.__getstate__
+        snapshot = Updater(pickle.loads(pickle.dumps(self.optimizer)))
+        snapshot.states = {k: self._copy_state_to(v, context) for k, v in self.states.items()}
+        return snapshot
+
+
+_STATES_VERSION = 1
+_MANIFEST_KEY = 'manifest'
+_OPTIMIZER_KEY = 'optimizer'
+_OBJECTS_KEY = 'objects'
+
+
+def _bytes_to_array(buf):
+    return array(numpy.frombuffer(buf, dtype=numpy.uint8), ctx=cpu(), dtype=numpy.uint8)
+
+
+def _array_to_bytes(arr):
+    return (arr if isinstance(arr, numpy.ndarray) else arr.asnumpy()).tobytes()
+
+
+def _encode_state(state, arrays, objects):
+    """Stores the arrays of a state in arrays and any other values without a JSON
+    form in objects, and returns the JSON description of the state."""
+    if isinstance(state, NDArray):
+        key = 'state%d' % len(arrays)
+        arrays[key] = state
+        return {'array': key, 'np': isinstance(state, np_ndarray)}
+    elif type(state) in (tuple, list):
+        return {type(state).__name__: [_encode_state(i, arrays, objects) for i in state]}
+    elif state is None or type(state) in (bool, int, float, str):
+        return {'value': state}
+    # dicts, numpy arrays, named tuples and custom objects are pickled
+    objects.append(state)
+    return {'object': len(objects) - 1}
+
+
+def _decode_state(spec, arrays, objects):
+    """Rebuilds a state from its JSON description, the stored arrays and objects."""
+    if 'array' in spec:
+        arr = arrays[spec['array']]
+        if isinstance(arr, numpy.ndarray):
+            arr = array(arr, ctx=cpu(), dtype=arr.dtype)
+        return arr.as_np_ndarray() if spec['np'] else arr.as_nd_ndarray()
+    elif 'tuple' in spec:
+        return tuple(_decode_state(i, arrays, objects) for i in spec['tuple'])
+    elif 'list' in spec:
+        return [_decode_state(i, arrays, objects) for i in spec['list']]
+    elif 'object' in spec:
+        return objects[spec['object']]
+    return spec['value']
+
 
 def get_updater(optimizer):
     """Returns a closure of the updater needed for kvstore.
@@ -19,7 +19,9 @@
 from collections import namedtuple
 from multiprocessing import current_process
 
+import os
 import ctypes
+import mmap
 import struct
 import numbers
 import numpy as np
@@ -33,6 +35,34 @@ try:
 except ImportError:
     cv2 = None
 
+# on-disk layout of dmlc RecordIO: each record starts with the magic number
+# followed by a uint32 whose upper 3 bits hold the continuation flag and whose
+# lower 29 bits hold the payload length; payloads are padded to 4 bytes
+_REC_MAGIC = 0xced7230a
+_REC_MAGIC_BYTES = struct.pack('<I', _REC_MAGIC)
+_REC_HEADER_SIZE = 8
+_REC_LENGTH_MASK = (1 << 29) - 1
+
+def _parse_record(buf, pos):
+    """Parses the record starting at byte `pos` of `buf`.
+
+    Returns the record and the position of the next record. Records that were
+    split around an embedded magic number are reassembled into ``bytes``, all
+    others are returned as a ``memoryview`` of `buf` without copying."""
+    parts = []
+    while True:
+        magic, lrec = struct.unpack_from('<II', buf, pos)
+        if magic != _REC_MAGIC:
+            raise ValueError("Invalid RecordIO magic number at position %d"%pos)
+        cflag, length = lrec >> 29, lrec & _REC_LENGTH_MASK
+        start = pos + _REC_HEADER_SIZE
+        pos = start + ((length + 3) & ~3)
+        if cflag == 0 and not parts:
+            return memoryview(buf)[start:start + length], pos
+        parts.append(buf[start:start + length])
+        if cflag in (0, 3):
+            return _REC_MAGIC_BYTES.join(parts), pos
+
 class MXRecordIO(object):
     """Reads/writes `RecordIO` data format, supporting sequential read and write.
 
@@ -234,19 +264,41 @@ class MXIndexedRecordIO(MXRecordIO):
         'w' for write or 'r' for read.
     key_type : type
         Data type for keys.
+    use_mmap : bool, default False
+        Only valid for 'r'. If True, the record file is memory-mapped once and
+        records are returned as zero-copy ``memoryview`` slices of the mapping
+        instead of ``bytes``. The mapping is read-only and is inherited by forked
+        processes, so the reader can be used from DataLoader workers without reset.
+        A returned view is only valid while the reader is open.
     """
-    def __init__(self, idx_path, uri, flag, key_type=int):
+    def __init__(self, idx_path, uri, flag, key_type=int, use_mmap=False):
+        if use_mmap and flag != 'r':
+            raise ValueError("use_mmap is only supported with flag 'r', got %s"%flag)
         self.idx_path = idx_path
         self.idx = {}
         self.keys = []
         self.key_type = key_type
         self.fidx = None
+        self.use_mmap = use_mmap
+        self._mmap = None
+        self._cursor = 0
+        self._rows = {}
+        self._offsets = None
+        self._lengths = None
+        self._cflags = None
+        self._bounds = None
+        self._frec = None
+        self._frec_pid = None
         super(MXIndexedRecordIO, self).__init__(uri, flag)
 
     def open(self):
-        super(MXIndexedRecordIO, self).open()
+        if self.use_mmap:
+            self._open_mmap()
+        else:
+            super(MXIndexedRecordIO, self).open()
         self.idx = {}
         self.keys = []
+        self._bounds = None
         self.fidx = open(self.idx_path, self.flag)
         if not self.writable:
             for line in iter(self.fidx.readline, ''):
@@ -254,30 +306,113 @@ class MXIndexedRecordIO(MXRecordIO):
                 key = self.key_type(line[0])
                 self.idx[key] = int(line[1])
                 self.keys.append(key)
+        if self.use_mmap:
+            self._build_mmap_index()
+
+    def _open_mmap(self):
+        """Memory-maps the record file for zero-copy reading."""
+        with open(self.uri.value, 'rb') as frec:
+            size = os.fstat(frec.fileno()).st_size
+            # mmap cannot map an empty file
+            self._mmap = mmap.mmap(frec.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self._cursor = 0
+        self.writable = False
+        # pylint: disable=not-callable
+        # It's bug from pylint(astroid). See https://github.com/PyCQA/pylint/issues/1699
+        self.pid = current_process().pid
+        self.is_open = True
+
+    def _build_mmap_index(self):
+        """Decodes the header of every indexed record into offset/length arrays."""
+        self._rows = {key: i for i, key in enumerate(self.keys)}
+        self._offsets = np.array([self.idx[key] for key in self.keys], dtype=np.int64)
+        # records are 4-byte aligned, so headers can be read from a uint32 view of the file
+        words = np.frombuffer(self._mmap, dtype='<u4', count=len(self._mmap) // 4)
+        if self._offsets.size and (np.any(self._offsets % 4) or
+                                   np.any(self._offsets + _REC_HEADER_SIZE > len(self._mmap))):
+            raise ValueError("Index file %s does not match record file %s"
+                             %(self.idx_path, self.uri.value.decode('utf-8')))
+        magic = words[self._offsets // 4]
+        lrec = words[self._offsets // 4 + 1]
+        del words
+        if np.any(magic != _REC_MAGIC):
+            raise ValueError("Invalid RecordIO magic number in %s"
+                             %self.uri.value.decode('utf-8'))
+        self._lengths = (lrec & _REC_LENGTH_MASK).astype(np.int64)
+        self._cflags = (lrec >> 29).astype(np.uint8)
 
     def close(self):
         """Closes the record file."""
         if not self.is_open:
             return
-        super(MXIndexedRecordIO, self).close()
+        if self.use_mmap:
+            if isinstance(self._mmap, mmap.mmap):
+                try:
+                    self._mmap.close()
+                except BufferError:
+                    # views handed out by read_idx are still alive, the mapping
+                    # is released once they are garbage collected
+                    pass
+            self._mmap = None
+            self.is_open = False
+            self.pid = None
+        else:
+            super(MXIndexedRecordIO, self).close()
+        if self._frec is not None:
+            self._frec.close()
+            self._frec = None
         self.fidx.close()
 
     def __getstate__(self):
         """Override pickling behavior."""
-        d = super(MXIndexedRecordIO, self).__getstate__()
+        if self.use_mmap and self.is_open:
+            # the mapping stays valid in this process, the copy maps the file again
+            d = dict(self.__dict__)
+            del d['handle']
+            d['uri'] = self.uri.value.decode('utf-8')
+        else:
+            d = super(MXIndexedRecordIO, self).__getstate__()
         d['fidx'] = None
+        d['_mmap'] = None
+        d['_frec'] = None
         return d
 
+    def reset(self):
+        """Resets the pointer to first item.
+
+        If the record is opened with 'w', this function will truncate the file to empty.
+        """
+        if self.use_mmap and self.is_open:
+            self._cursor = 0
+            return
+        super(MXIndexedRecordIO, self).reset()
+
     def seek(self, idx):
         """Sets the current read pointer position.
 
         This function is internally called by `read_idx(idx)` to find the current
         reader pointer position. It doesn't return anything."""
         assert not self.writable
+        if self.use_mmap:
+            self._cursor = self.idx[idx]
+            return
         self._check_pid(allow_reset=True)
         pos = ctypes.c_size_t(self.idx[idx])
         check_call(_LIB.MXRecordIOReaderSeek(self.handle, pos))
 
+    def read(self):
+        """Returns the record at the current read pointer position.
+
+        See `MXRecordIO.read`. With ``use_mmap=True`` the record is returned as a
+        ``memoryview`` into the mapped file."""
+        if not self.use_mmap:
+            return super(MXIndexedRecordIO, self).read()
+        assert self.is_open
+        if self._cursor + _REC_HEADER_SIZE > len(self._mmap):
+            return None
+        buf, self._cursor = _parse_record(self._mmap, self._cursor)
+        return buf
+
     def tell(self):
         """Returns the current position of write head.
 
@@ -313,9 +448,89 @@ class MXIndexedRecordIO(MXRecordIO):
         >>> record.read_idx(3)
         record_3
         """
+        if self.use_mmap:
+            row = self._rows[idx]
+            if self._cflags[row] == 0:
+                start = int(self._offsets[row]) + _REC_HEADER_SIZE
+                return memoryview(self._mmap)[start:start + int(self._lengths[row])]
+            return _parse_record(self._mmap, int(self._offsets[row]))[0]
         self.seek(idx)
         return self.read()
 
+    def read_batch(self, idxs, max_gap=1 << 20):
+        """Returns the records at the given indices, in the same order.
+
+        Records are fetched in file order, and records that lie within `max_gap`
+        bytes of each other are read with a single sequential read, so that a
+        shuffled batch costs a few large reads instead of one seek and one small
+        read per record.
+
+        Examples
+        ---------
+        >>> record = mx.recordio.MXIndexedRecordIO('tmp.idx', 'tmp.rec', 'r')
+        >>> record.read_batch([3, 0])
+        [b'record_3', b'record_0']
+
+        Parameters
+        ----------
+        idxs : list
+            Indices of the records to read.
+        max_gap : int, default 1048576
+            Maximum number of unused bytes between two records that are still
+            fetched by the same read.
+
+        Returns
+        ----------
+        records : list
+            Records at the given indices. With ``use_mmap=True`` the records
+            are ``memoryview`` objects into the mapped file.
+        """
+        assert not self.writable
+        starts = np.array([self.idx[idx] for idx in idxs], dtype=np.int64)
+        order = np.argsort(starts, kind='stable')
+        records = [None] * len(idxs)
+        if self.use_mmap:
+            # touching the mapping in file order lets the kernel read ahead
+            for i in order:
+                records[i] = self.read_idx(idxs[i])
+            return records
+        # a record ends at the latest before the next indexed record
+        bounds = self._record_bounds()
+        ends = bounds[np.searchsorted(bounds, starts, side='right')]
+        frec = self._batch_file()
+        i = 0
+        while i < len(order):
+            run_start, run_end = starts[order[i]], ends[order[i]]
+            j = i + 1
+            while j < len(order) and starts[order[j]] - run_end <= max_gap:
+                run_end = max(run_end, ends[order[j]])
+                j += 1
+            frec.seek(int(run_start))
+            chunk = frec.read(int(run_end - run_start))
+            for k in order[i:j]:
+                records[k] = bytes(_parse_record(chunk, int(starts[k] - run_start))[0])
+            i = j
+        return records
+
+    def _record_bounds(self):
+        """Returns the sorted record offsets followed by the file size."""
+        if self._bounds is None:
+            offsets = np.unique(np.array(list(self.idx.values()), dtype=np.int64))
+            size = os.path.getsize(self.uri.value)
+            self._bounds = np.append(offsets, np.int64(size))
+        return self._bounds
+
+    def _batch_file(self):
+        """Returns a plain file handle of the record file for batched reads."""
+        # pylint: disable=not-callable
+        # It's bug from pylint(astroid). See https://github.com/PyCQA/pylint/issues/1699
+        pid = current_process().pid
+        if self._frec is None or self._frec_pid != pid:
+            # the file offset is shared with the parent after fork, never reuse it
+            self._frec = open(self.uri.value, 'rb')
+            self._frec_pid = pid
+        return self._frec
+
     def write_idx(self, idx, buf):
         """Inserts input record at given index.
 
@@ -1205,3 +1205,62 @@ def test_get_optimal_thresholds():
         assert 'layer1' in min_max_dict
         assert_almost_equal(np.array([min_max_dict['layer1'][1]]), expected_threshold, rtol=1e-2, atol=1e-4)
 
+
+def test_layer_histogram_collector():
+    arrs = [mx.nd.uniform(low=-1, high=1, shape=(4, 8, 16)) * (i + 1) for i in range(3)]
+    expected = None
+    for arr in arrs:
+        np_arr = arr.asnumpy()
+        min_range, max_range = np.min(np_arr), np.max(np_arr)
+        th = max(abs(min_range), abs(max_range))
+        if expected is None:
+            hist, hist_edges = np.histogram(np_arr, bins=8001, range=(-th, th))
+            expected = (hist, hist_edges, min_range, max_range, th)
+        else:
+            expected = mx.contrib.quant._LayerHistogramCollector.combine_histogram(
+                expected, np_arr, min_range, max_range, th)
+
+    for async_collect in [False, True]:
+        collector = mx.contrib.quant._LayerHistogramCollector(
+            'int8', include_layers=['layer1'], async_collect=async_collect)
+        for arr in arrs:
+            collector.collect('layer1', 'op', arr)
+            collector.collect('layer2', 'op', arr)
+        min_max_dict = collector.post_collect()
+        assert list(min_max_dict.keys()) == ['layer1']
+        expected_dict = mx.contrib.quant._LayerHistogramCollector.get_optimal_thresholds(
+            {'layer1': expected}, 'int8')
+        assert_almost_equal(np.array(min_max_dict['layer1']), np.array(expected_dict['layer1']),
+                            rtol=1e-3, atol=1e-4)
+
+
+def test_percentile_collector(tmpdir):
+    arrs = [mx.nd.random.normal(scale=3, shape=(64, 256)) for _ in range(4)]
+    expected = np.percentile(np.abs(np.concatenate([arr.asnumpy() for arr in arrs])), 99.9)
+
+    collector = mx.contrib.quant.PercentileCollector('int8', percentile=99.9,
+                                                     include_layers=['layer1'])
+    for arr in arrs:
+        collector.collect('layer1', 'op', arr)
+        collector.collect('layer2', 'op', arr)
+    min_max_dict = collector.post_collect()
+    assert list(min_max_dict.keys()) == ['layer1']
+    assert min_max_dict['layer1'][0] == -min_max_dict['layer1'][1]
+    assert abs(min_max_dict['layer1'][1] - expected) / expected < 0.01
+
+    # collect on two shards, save one of them and merge it into the other
+    shards = [mx.contrib.quant.PercentileCollector('int8', percentile=99.9,
+                                                   include_layers=['layer1'])
+              for _ in range(2)]
+    for i, arr in enumerate(arrs):
+        shards[i % 2].collect('layer1', 'op', arr)
+    fname = str(tmpdir.join('shard.sketch'))
+    shards[1].save(fname)
+    shards[0].load(fname)
+    assert_almost_equal(np.array(shards[0].post_collect()['layer1']),
+                        np.array(min_max_dict['layer1']))
+
+    relu = mx.contrib.quant.PercentileCollector('auto', percentile=100, include_layers=['relu'])
+    relu.collect('relu', 'op', mx.nd.relu(arrs[0]))
+    assert relu.post_collect()['relu'] == (0, mx.nd.relu(arrs[0]).max().asscalar())
+
@@ -0,0 +1,149 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+# pylint: skip-file
+import os
+import time
+import warnings
+
+import numpy as np
+import pytest
+
+import mxnet as mx
+from mxnet.contrib.text import embedding
+from mxnet.test_utils import assert_almost_equal
+
+
+def _reference_embedding(path, elem_delim, unknown_token, unknown_vec):
+    """Parses a pre-trained token embedding file one float at a time, the way the
+    embedding files were parsed before they were read in bulk."""
+    idx_to_token = [unknown_token]
+    vecs = [None]
+    tokens = set()
+    loaded_unknown_vec = None
+    with open(path, 'r', encoding='utf8') as f:
+        for line in f:
+            elems = line.rstrip().split(elem_delim)
+            token, elems = elems[0], [float(i) for i in elems[1:]]
+            if token == unknown_token and loaded_unknown_vec is None:
+                loaded_unknown_vec = elems
+                tokens.add(unknown_token)
+            elif token in tokens or len(elems) == 1:
+                continue
+            else:
+                idx_to_token.append(token)
+                vecs.append(elems)
+                tokens.add(token)
+    vecs[0] = loaded_unknown_vec if loaded_unknown_vec is not None else unknown_vec
+    return idx_to_token, np.array(vecs, dtype=np.float32)
+
+
+def _write_embedding_file(path, lines):
+    with open(path, 'w', encoding='utf8') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def _load(path, elem_delim=' '):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return embedding.CustomEmbedding(path, elem_delim=elem_delim,
+                                         init_unknown_vec=mx.nd.ones)
+
+
+@pytest.mark.parametrize('elem_delim', [' ', '\t'])
+@pytest.mark.parametrize('with_unknown', [False, True])
+def test_custom_embedding_parse(tmpdir, elem_delim, with_unknown):
+    lines = ['4 3',  # header
+             'a 0.1 0.2 0.3',
+             'b -1 2.5e-3 7',
+             'a 9 9 9',  # duplicate
+             'c 1 2 3']
+    if with_unknown:
+        lines.insert(3, '<unk> 4 5 6')
+    lines += ['tok%d %d %d %d' % (i, i, -i, 2 * i) for i in range(100)]
+    lines = [line.replace(' ', elem_delim) for line in lines]
+    path = os.path.join(str(tmpdir), 'emb.txt')
+    _write_embedding_file(path, lines)
+
+    # small chunks make the vectors span several numpy.loadtxt calls
+    orig_chunk_size = embedding._PARSE_CHUNK_SIZE
+    embedding._PARSE_CHUNK_SIZE = 64
+    try:
+        emb = _load(path, elem_delim)
+    finally:
+        embedding._PARSE_CHUNK_SIZE = orig_chunk_size
+    idx_to_token, vecs = _reference_embedding(path, elem_delim, '<unk>', [1, 1, 1])
+    assert emb.idx_to_token == idx_to_token
+    assert emb.token_to_idx == {token: i for i, token in enumerate(idx_to_token)}
+    assert emb.vec_len == 3
+    assert_almost_equal(emb.idx_to_vec.asnumpy(), vecs)
+
+    # the cached arrays give the same embedding
+    assert os.path.isfile(path + '.npy') and os.path.isfile(path + '.vocab')
+    cached = _load(path, elem_delim)
+    assert cached.idx_to_token == idx_to_token
+    assert_almost_equal(cached.idx_to_vec.asnumpy(), vecs)
+
+
+def test_custom_embedding_cache(tmpdir):
+    path = os.path.join(str(tmpdir), 'emb.txt')
+    _write_embedding_file(path, ['a 1 2', 'b 3 4'])
+    parse = embedding._parse_embedding_file
+    calls = []
+
+    def counting_parse(*args):
+        calls.append(args)
+        return parse(*args)
+
+    embedding._parse_embedding_file = counting_parse
+    try:
+        _load(path)
+        assert len(calls) == 1
+        emb = _load(path)
+        assert len(calls) == 1
+        assert_almost_equal(emb.idx_to_vec.asnumpy(), [[1, 1], [1, 2], [3, 4]])
+
+        # a text file newer than the cache is parsed again
+        _write_embedding_file(path, ['a 5 6', 'b 7 8'])
+        past = time.time() - 100
+        for cache_path in (path + '.npy', path + '.vocab'):
+            os.utime(cache_path, (past, past))
+        emb = _load(path)
+        assert len(calls) == 2
+        assert_almost_equal(emb.idx_to_vec.asnumpy(), [[1, 1], [5, 6], [7, 8]])
+        _load(path)
+        assert len(calls) == 2
+    finally:
+        embedding._parse_embedding_file = parse
+
+    # the cache is only used with the delimiter and encoding it was written with
+    assert embedding._load_embedding_cache(path, ' ', 'utf8') is not None
+    assert embedding._load_embedding_cache(path, '\t', 'utf8') is None
+    assert embedding._load_embedding_cache(path, ' ', 'latin-1') is None
+
+
+def test_custom_embedding_cache_not_writable(tmpdir):
+    path = os.path.join(str(tmpdir), 'emb.txt')
+    _write_embedding_file(path, ['a 1 2', 'b 3 4'])
+    # a directory in place of the temporary cache file makes writing it fail
+    os.mkdir(path + '.npy.tmp.npy')
+    emb = _load(path)
+    assert emb.idx_to_token == ['<unk>', 'a', 'b']
+    assert_almost_equal(emb.idx_to_vec.asnumpy(), [[1, 1], [1, 2], [3, 4]])
+    assert not os.path.exists(path + '.npy')
+    assert not os.path.exists(path + '.vocab')
+    assert embedding._load_embedding_cache(path, ' ', 'utf8') is None
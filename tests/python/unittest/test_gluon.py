@@ -1083,6 +1083,29 @@ def test_global_norm_clip():
         for check_isfinite in [True, False]:
             check_global_norm_clip(stype, check_isfinite)
 
+
+def test_global_norm_clip_async():
+    x1 = mx.nd.ones((3, 3), ctx=mx.cpu(0))
+    x2 = mx.nd.ones((4, 4), ctx=mx.cpu(1))
+    norm, is_finite = gluon.utils.clip_global_norm_async([x1, x2], 1.0)
+    assert norm.context == mx.cpu(0)
+    assert norm.asscalar() == 5.0
+    assert is_finite.asscalar() == 1
+    assert_almost_equal(x1.asnumpy(), np.ones((3, 3)) / 5)
+    assert_almost_equal(x2.asnumpy(), np.ones((4, 4)) / 5)
+
+    norm, is_finite = gluon.utils.clip_global_norm_async([x1, x2], 2.0)
+    assert_almost_equal(norm.asnumpy(), np.array([1.0]))
+    assert_almost_equal(x1.asnumpy(), np.ones((3, 3)) / 5)
+
+    x3 = mx.nd.array([1.0, 2.0, float('nan')])
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter("always")
+        _, is_finite = gluon.utils.clip_global_norm_async([x1, x3], 2.0)
+        assert is_finite.asscalar() == 0
+        assert len(w) == 0
+    assert_almost_equal(x1.asnumpy(), np.ones((3, 3)) / 5)
+
 def test_embedding():
     def check_embedding(sparse_grad):
         layer = gluon.nn.Embedding(10, 100, sparse_grad=sparse_grad)
@@ -1463,6 +1486,43 @@ def test_save_load(tmpdir):
     net2 = Network()
     net2.load_parameters(param_path)
 
+def test_load_parameters_mmap(tmpdir):
+    net = nn.HybridSequential()
+    net.add(nn.Dense(4, in_units=3), nn.Dense(2, in_units=4))
+    net.initialize()
+    params = {k: v.data() for k, v in net.collect_params().items()}
+    npz_path = os.path.join(str(tmpdir), 'mmap.params')
+    mx.npx.savez(npz_path, extra=mx.nd.ones((2,)), **params)
+    legacy_path = os.path.join(str(tmpdir), 'legacy.params')
+    mx.nd.save(legacy_path, params)
+
+    for path in [npz_path, legacy_path]:
+        for num_workers in [0, 2]:
+            net2 = nn.HybridSequential()
+            net2.add(nn.Dense(4, in_units=3), nn.Dense(2, in_units=4))
+            net2.load_parameters(path, ctx=[mx.cpu(0), mx.cpu(1)], ignore_extra=True,
+                                 mmap=True, num_workers=num_workers)
+            for k, v in net2.collect_params().items():
+                assert v.list_ctx() == [mx.cpu(0), mx.cpu(1)]
+                assert v.data(mx.cpu(1)).dtype == params[k].dtype
+                assert_almost_equal(v.data(mx.cpu(1)).asnumpy(), params[k].asnumpy())
+
+    net2 = nn.HybridSequential()
+    net2.add(nn.Dense(4, in_units=3), nn.Dense(2, in_units=4))
+    with pytest.raises(ValueError):
+        net2.load_parameters(npz_path, mmap=True)
+
+@use_np
+def test_load_dict_numpy_float64():
+    net = nn.Dense(2, in_units=3)
+    params = {k: np.random.uniform(size=v.shape) for k, v in net.collect_params().items()}
+    for num_workers in [0, 2]:
+        net.load_dict(params, num_workers=num_workers)
+        for k, v in net.collect_params().items():
+            assert v.data().dtype == np.float32
+            assert_almost_equal(v.data().asnumpy(), params[k].astype(np.float32))
+
+
 def test_save_load_deduplicate_with_shared_params(tmpdir):
     class B(mx.gluon.Block):
         def __init__(self):
@@ -1588,6 +1648,108 @@ def test_zero_grad():
                     _test_grad_reset(ctx, dtype=type, sparse=sparse, embeddingType=embType)
 
 
+def test_hybrid_cached_op_args_update():
+    net = nn.Dense(2, in_units=3)
+    net.initialize(mx.init.One())
+    net.hybridize()
+    x = mx.nd.ones((1, 3))
+    assert_almost_equal(net(x).asnumpy(), np.full((1, 2), 3))
+    cargs = net._cached_op_cargs[mx.cpu(0)][1]
+    net(x)
+    assert net._cached_op_cargs[mx.cpu(0)][1] is cargs
+
+    # set_data writes in place, the collected arrays stay valid
+    net.weight.set_data(mx.nd.full((2, 3), 2))
+    assert_almost_equal(net(x).asnumpy(), np.full((1, 2), 6))
+    assert net._cached_op_cargs[mx.cpu(0)][1] is cargs
+
+    # reset_ctx and grad_req='null' replace the arrays
+    net.reset_ctx(mx.cpu(1))
+    out = net(x.as_in_context(mx.cpu(1)))
+    assert out.context == mx.cpu(1)
+    assert_almost_equal(out.asnumpy(), np.full((1, 2), 6))
+    net.weight.grad_req = 'null'
+    net(x.as_in_context(mx.cpu(1)))
+    assert net._cached_op_cargs[mx.cpu(1)][1][1] is net.weight.data()
+
+
+def test_hybrid_cached_op_args_invalidation():
+    net = nn.Dense(2, in_units=3)
+    net.initialize(mx.init.One())
+    net.hybridize()
+    x = mx.nd.ones((1, 3))
+    net(x)
+    cargs = net._cached_op_cargs[mx.cpu(0)][1]
+
+    # re-initialization replaces the arrays
+    net.initialize(mx.init.Constant(2), force_reinit=True)
+    assert_almost_equal(net(x).asnumpy(), np.full((1, 2), 8))
+    assert net._cached_op_cargs[mx.cpu(0)][1] is not cargs
+    assert net._cached_op_cargs[mx.cpu(0)][1][1] is net.weight.data()
+
+    # set_data is visible in the very next call
+    net.bias.set_data(mx.nd.full((2,), 3))
+    assert_almost_equal(net(x).asnumpy(), np.full((1, 2), 9))
+
+    # reset_ctx collects the arrays of the new context
+    net.reset_ctx(mx.cpu(1))
+    assert_almost_equal(net(x.as_in_context(mx.cpu(1))).asnumpy(), np.full((1, 2), 9))
+    assert net._cached_op_cargs[mx.cpu(1)][1][1] is net.weight.data(mx.cpu(1))
+    net.reset_ctx(mx.cpu(0))
+
+    # casting the parameters, with the graph still cached, replaces the arrays
+    cargs = net._cached_op_cargs[mx.cpu(0)][1]
+    for param in net.collect_params().values():
+        param.cast('float64')
+    out = net(x.astype('float64'))
+    assert out.dtype == np.float64
+    assert_almost_equal(out.asnumpy(), np.full((1, 2), 9))
+    assert net._cached_op_cargs[mx.cpu(0)][1] is not cargs
+    assert net._cached_op_cargs[mx.cpu(0)][1][1] is net.weight.data()
+
+    # casting the block clears the graph, the arrays are collected again
+    net.cast('float32')
+    net.hybridize()
+    out = net(x)
+    assert out.dtype == np.float32
+    assert_almost_equal(out.asnumpy(), np.full((1, 2), 9))
+    assert net._cached_op_cargs[mx.cpu(0)][1][1] is net.weight.data()
+
+
+def test_hybrid_shape_cache():
+    net = nn.Dense(2, in_units=3)
+    net.initialize()
+    net.hybridize(static_alloc=True, static_shape=True, shape_cache_size=2)
+    for batch_size in [1, 2, 1, 3, 1, 2]:
+        x = mx.nd.random.uniform(shape=(batch_size, 3))
+        out = net(x)
+        ref = mx.nd.dot(x, net.weight.data(), transpose_b=True) + net.bias.data()
+        assert_almost_equal(out.asnumpy(), ref.asnumpy())
+    info = net.shape_cache_info()
+    assert info == {'hits': 2, 'misses': 4, 'evictions': 2, 'size': 2, 'max_size': 2}
+
+    net.hybridize(static_alloc=True, static_shape=True, shape_cache_size=4,
+                  shape_buckets={0: [2, 4]})
+    net.warmup([(2, 3), (4, 3)])
+    assert net.shape_cache_info()['misses'] == 2
+    x = mx.nd.random.uniform(shape=(3, 3))
+    out = net(x)
+    assert out.shape == (4, 2)
+    ref = mx.nd.dot(x, net.weight.data(), transpose_b=True) + net.bias.data()
+    assert_almost_equal(out[:3].asnumpy(), ref.asnumpy())
+    assert_almost_equal(out[3].asnumpy(), net.bias.data().asnumpy())
+    assert net.shape_cache_info()['hits'] == 1
+    assert net(mx.nd.ones((5, 3))).shape == (5, 2)
+    assert net.shape_cache_info()['misses'] == 3
+
+    # inputs are not padded for training
+    with mx.autograd.record():
+        out = net(x)
+    assert out.shape == (3, 2)
+    out.backward()
+    assert_almost_equal(net.bias.grad().asnumpy(), np.full((2,), 3.))
+
+
 @pytest.mark.parametrize('static_alloc', [False, True])
 @pytest.mark.parametrize('static_shape', [False, True])
 def test_hybrid_static_memory(static_alloc, static_shape):
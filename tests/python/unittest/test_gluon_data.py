@@ -118,6 +118,22 @@ def test_recordimage_dataset_with_data_loader_multiworker(prepare_record):
         assert x.shape[0] == 1 and x.shape[3] == 3
         assert y.asscalar() == i
 
+def test_recordfile_dataset_getitems(tmpdir):
+    frec = str(tmpdir.join('data.rec'))
+    record = mx.recordio.MXIndexedRecordIO(str(tmpdir.join('data.idx')), frec, 'w')
+    for i in range(20):
+        record.write_idx(i, ('record_%d' % i).encode('utf-8'))
+    record.close()
+    indices = [7, 3, 19, 3, 0]
+    for use_mmap in [False, True]:
+        dataset = gluon.data.RecordFileDataset(frec, use_mmap=use_mmap)
+        expected = [('record_%d' % i).encode('utf-8') for i in indices]
+        assert [bytes(x) for x in dataset.__getitems__(indices)] == expected
+        transformed = dataset.transform(lambda x: bytes(x) + b'!')
+        assert transformed.__getitems__(indices) == [x + b'!' for x in expected]
+        loader = gluon.data.DataLoader(dataset.take(10).transform(lambda x: len(x)), 4)
+        assert [x.asnumpy().tolist() for x in loader] == [[8] * 4, [8] * 4, [8, 8]]
+
 def test_sampler():
     seq_sampler = gluon.data.SequentialSampler(10)
     assert list(seq_sampler) == list(range(10))
@@ -347,6 +363,85 @@ def test_multi_worker_dataloader_release_pool():
         del the_iter
         del D
 
+@pytest.mark.parametrize('thread_pool', [False, True])
+def test_dataloader_worker_pool(thread_pool):
+    pool = gluon.data.WorkerPool(2, thread_pool=thread_pool)
+    X = np.random.uniform(size=(10, 3))
+    Y = np.random.uniform(size=(7, 3))
+    train_loader = DataLoader(gluon.data.ArrayDataset(X), 4, worker_pool=pool)
+    for _ in range(3):
+        # recreated every epoch, workers are reused
+        val_loader = DataLoader(gluon.data.ArrayDataset(Y), 4, worker_pool=pool)
+        assert mx.test_utils.almost_equal(np.concatenate([x.asnumpy() for x in train_loader]), X)
+        assert mx.test_utils.almost_equal(np.concatenate([y.asnumpy() for y in val_loader]), Y)
+        del val_loader
+    assert len(pool._attached) == 1
+    del train_loader
+    assert not pool._attached
+    pool.close()
+
+def test_dataloader_shared_mem_ring():
+    X = np.random.uniform(size=(50, 3, 4)).astype('float32')
+    Y = np.arange(50)
+    dataset = gluon.data.ArrayDataset(X, Y)
+    loader = DataLoader(dataset, 8, num_workers=2, ring_slot_size=1024)
+    for epoch in range(2):
+        for i, (x, y) in enumerate(loader):
+            assert x.dtype == np.float32
+            assert mx.test_utils.almost_equal(x.asnumpy(), X[i*8:(i+1)*8])
+            assert (y.asnumpy() == Y[i*8:(i+1)*8]).all()
+
+    seqs = [np.random.randint(0, 10, size=(i % 5 + 1,)) for i in range(20)]
+    dataset = gluon.data.SimpleDataset([(seq, len(seq)) for seq in seqs])
+    batchify_fn = gluon.data.batchify.Group(gluon.data.batchify.Pad(val=-1),
+                                            gluon.data.batchify.Stack())
+    loader = DataLoader(dataset, 4, batchify_fn=batchify_fn, num_workers=2,
+                        ring_slot_size=1024)
+    for i, (data, length) in enumerate(loader):
+        expected = batchify_fn(dataset[i*4:(i+1)*4])
+        assert (data.asnumpy() == expected[0].asnumpy()).all()
+        assert (length.asnumpy() == expected[1].asnumpy()).all()
+
+    loader = DataLoader(gluon.data.ArrayDataset(X, Y), 8, num_workers=2, ring_slot_size=64)
+    with pytest.raises(ValueError):
+        next(iter(loader))
+
+@pytest.mark.parametrize('num_workers', [0, 2])
+def test_dataloader_state_dict(num_workers):
+    Y = np.arange(50)
+    dataset = gluon.data.ArrayDataset(Y)
+    loader = DataLoader(dataset, 4, sampler=gluon.data.RandomSampler(len(dataset), seed=7),
+                        last_batch='keep', num_workers=num_workers)
+    expected = [[y.asnumpy() for y in loader] for _ in range(2)]
+    assert not all((a == b).all() for a, b in zip(*expected))
+
+    loader = DataLoader(dataset, 4, sampler=gluon.data.RandomSampler(len(dataset), seed=7),
+                        last_batch='keep', num_workers=num_workers)
+    list(loader)
+    it = iter(loader)
+    for _ in range(5):
+        next(it)
+    state = loader.state_dict()
+    del it
+
+    resumed = DataLoader(dataset, 4, sampler=gluon.data.RandomSampler(len(dataset), seed=7),
+                         last_batch='keep', num_workers=num_workers)
+    resumed.load_state_dict(state)
+    batches = [y.asnumpy() for y in resumed]
+    assert len(batches) == len(expected[1]) - 5
+    for a, b in zip(batches, expected[1][5:]):
+        assert (a == b).all()
+
+def test_dataloader_state_dict_unsupported():
+    dataset = gluon.data.ArrayDataset(np.arange(10))
+    for loader in [DataLoader(dataset, batch_sampler=[[0, 1], [2, 3]]),
+                   DataLoader(dataset, 2, sampler=list(range(10)))]:
+        with pytest.raises(NotImplementedError):
+            loader.state_dict()
+        assert len(list(loader)) in (2, 5)
+        with pytest.raises(NotImplementedError):
+            loader.state_dict()
+
 def test_dataloader_context():
     X = np.random.uniform(size=(10, 20))
     dataset = gluon.data.ArrayDataset(X)
@@ -372,6 +467,36 @@ def test_dataloader_context():
         for _, x in enumerate(loader3):
             assert x.context == context.cpu_pinned(custom_dev_id)
 
+@pytest.mark.parametrize('num_workers', [0, 2])
+def test_dataloader_device_prefetch(num_workers):
+    X = np.random.uniform(size=(18, 3)).astype('float32')
+    Y = np.arange(18)
+    dataset = gluon.data.ArrayDataset(X, Y)
+    ctx_list = [context.cpu(0), context.cpu(1)]
+    loader = gluon.data.DataLoader(dataset, 8, num_workers=num_workers, pin_memory=True,
+                                   ctx=ctx_list)
+    it = iter(loader)
+    batches = list(it)
+    assert len(batches) == 3
+    for i, (x, y) in enumerate(batches):
+        assert [a.context for a in x] == ctx_list
+        assert [a.context for a in y] == ctx_list
+        expected = gluon.utils.split_and_load(mx.nd.array(X[i*8:(i+1)*8]), ctx_list,
+                                              even_split=False)
+        for a, b in zip(x, expected):
+            assert mx.test_utils.almost_equal(a.asnumpy(), b.asnumpy())
+        assert (np.concatenate([a.asnumpy() for a in y]) == Y[i*8:(i+1)*8]).all()
+    # batches are staged in a fixed pool of two pinned buffers per array
+    assert len(it._buffers) == 2
+    for buffers in it._buffers:
+        assert len(buffers) == 2
+        assert all(buf.context == context.cpu_pinned(0) for buf in buffers)
+
+    # a single context still returns a list per array
+    loader = gluon.data.DataLoader(dataset, 8, ctx=context.cpu(1))
+    x, y = next(iter(loader))
+    assert len(x) == 1 and x[0].context == context.cpu(1)
+
 def batchify(a):
     return a
 
@@ -600,3 +725,59 @@ def test_sampler():
     assert sorted(list(interval_sampler)) == list(range(10))
     interval_sampler = mx.gluon.data.IntervalSampler(10, 3, rollover=False)
     assert list(interval_sampler) == [0, 3, 6, 9]
+
+@pytest.mark.parametrize('last_batch', ['pad', 'discard'])
+def test_distributed_sampler(last_batch):
+    samplers = [mx.gluon.data.DistributedSampler(10, 3, i, seed=1, last_batch=last_batch)
+                for i in range(3)]
+    part_len = 4 if last_batch == 'pad' else 3
+    epochs = []
+    for _ in range(2):
+        parts = [list(s) for s in samplers]
+        assert all(len(p) == part_len == len(s) for p, s in zip(parts, samplers))
+        indices = sum(parts, [])
+        if last_batch == 'pad':
+            assert sorted(set(indices)) == list(range(10))
+        else:
+            assert len(set(indices)) == 9
+        epochs.append(parts)
+    assert epochs[0] != epochs[1]
+    sampler = mx.gluon.data.DistributedSampler(10, 3, 0, seed=1, last_batch=last_batch)
+    sampler.set_epoch(1)
+    assert list(sampler) == epochs[1][0]
+    with pytest.raises(ValueError):
+        mx.gluon.data.DistributedSampler(10, 3, 3)
+
+def test_fixed_bucket_sampler():
+    lengths = [random.randint(1, 100) for _ in range(500)]
+    sampler = mx.gluon.data.FixedBucketSampler(lengths, 8, num_buckets=10, ratio=0.5,
+                                               shuffle=True, seed=1)
+    batches = list(sampler)
+    assert len(batches) == len(sampler)
+    assert sorted(sum(batches, [])) == list(range(500))
+    for batch in batches:
+        batch_lengths = [lengths[i] for i in batch]
+        assert max(batch_lengths) - min(batch_lengths) <= 11
+    assert list(sampler) != batches
+    assert 0 <= sampler.padding_ratio < 0.15
+    assert 'padding_ratio' in sampler.stats()
+
+    dataset = gluon.data.SimpleDataset([np.ones((l,)) for l in lengths])
+    loader = DataLoader(dataset, batch_sampler=sampler,
+                        batchify_fn=gluon.data.batchify.Pad(val=0))
+    padded = sum(x.size for x in loader)
+    assert abs(1 - sum(lengths) / padded - sampler.padding_ratio) < 1e-6
+
+def test_fixed_bucket_sampler_resume_stats():
+    lengths = [random.randint(1, 100) for _ in range(200)]
+    sampler = mx.gluon.data.FixedBucketSampler(lengths, 8, shuffle=True, seed=1)
+    it = iter(sampler)
+    for _ in range(5):
+        next(it)
+    state = sampler.state_dict()
+    rest = list(it)
+    sampler = mx.gluon.data.FixedBucketSampler(lengths, 8, shuffle=True, seed=1)
+    sampler.load_state_dict(state)
+    assert 'padding_ratio' in sampler.stats()
+    assert sampler.state_dict() == state
+    assert list(sampler) == rest
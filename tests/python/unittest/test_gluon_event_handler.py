@@ -122,6 +122,38 @@ def test_checkpoint_handler():
         assert os.path.isfile(file_path + '-epoch2batch9.params')
         assert os.path.isfile(file_path + '-epoch2batch9.states')
 
+def test_checkpoint_handler_async_save():
+    with TemporaryDirectory() as tmpdir:
+        model_prefix = 'test_async'
+        file_path = os.path.join(tmpdir, model_prefix)
+        test_data = _get_test_data()
+
+        net = _get_test_network(nn.HybridSequential())
+        ce_loss = loss.SoftmaxCrossEntropyLoss()
+        acc = mx.gluon.metric.Accuracy()
+        est = estimator.Estimator(net, loss=ce_loss, train_metrics=acc)
+        checkpoint_handler = event_handler.CheckpointHandler(model_dir=tmpdir,
+                                                             model_prefix=model_prefix,
+                                                             epoch_period=None,
+                                                             batch_period=2,
+                                                             max_checkpoints=2,
+                                                             async_save=True)
+        est.fit(test_data, event_handlers=[checkpoint_handler], batches=10)
+        assert not checkpoint_handler._pending_saves
+        assert not os.path.isfile(file_path + '-epoch0batch1.params')
+        assert os.path.isfile(file_path + '-epoch1batch7.params')
+        assert os.path.isfile(file_path + '-epoch1batch7.states')
+        assert os.path.isfile(file_path + '-epoch2batch9.params')
+        assert os.path.isfile(file_path + '-epoch2batch9.states')
+        assert not [f for f in os.listdir(tmpdir) if f.endswith('.tmp')]
+
+        # the snapshot matches the final state of training
+        net2 = _get_test_network(nn.HybridSequential())
+        net2.load_parameters(file_path + '-epoch2batch9.params')
+        for name, param in net.collect_params().items():
+            mx.test_utils.assert_almost_equal(param.data(), net2.collect_params()[name].data())
+        est.trainer.load_states(file_path + '-epoch2batch9.states')
+
 def test_resume_checkpoint():
     with TemporaryDirectory() as tmpdir:
         model_prefix = 'test_net'
@@ -18,6 +18,7 @@
 import mxnet as mx
 import unittest
 import os
+import json
 import numpy as np
 from mxnet import gluon
 from mxnet.gluon import nn
@@ -166,6 +167,73 @@ def test_trainer_sparse_save_load():
     # check if parameter dict is correctly associated with optimizer after load_state
     assert trainer._kvstore._updater.optimizer._get_lr(0) == 0.2
 
+def test_trainer_save_load_states_format(tmpdir):
+    x = gluon.Parameter('x', shape=(10,))
+    y = gluon.Parameter('y', shape=(4,))
+    x.initialize(ctx=mx.cpu(0), init='ones')
+    y.initialize(ctx=mx.cpu(0), init='ones')
+    trainer = gluon.Trainer([x, y], 'adam', {'learning_rate': 0.1},
+                            update_on_kvstore=False)
+    with mx.autograd.record():
+        z = (x.data() * 2).sum() + (y.data() * 3).sum()
+    z.backward()
+    trainer.step(1)
+    fname = os.path.join(str(tmpdir), 'test_trainer_states_format.states')
+    trainer.save_states(fname)
+    states = deepcopy(trainer._updaters[0].states)
+
+    # arrays are stored as .npz members next to a JSON manifest
+    with np.load(fname) as arrays:
+        manifest = json.loads(arrays['manifest'].tobytes().decode('utf-8'))
+    assert manifest['optimizer']['class'] == 'Adam'
+    assert manifest['optimizer']['hyperparameters']['lr'] == 0.1
+    assert [k for k, _ in manifest['states']] == [0, 1]
+
+    trainer2 = gluon.Trainer([x, y], 'adam', {'learning_rate': 0.5},
+                             update_on_kvstore=False)
+    trainer2.load_states(fname)
+    assert trainer2.learning_rate == 0.1
+    updater = trainer2._updaters[0]
+    assert set(updater.states) == set(states)
+    for k in states:
+        for a, b in zip(updater.states[k], states[k]):
+            assert_almost_equal(a, b)
+
+    # partial load only replaces the requested indices
+    updater.states[1][0][:] = 0
+    updater.load_states(fname, indices=[0])
+    assert (updater.states[1][0].asnumpy() == 0).all()
+    updater.load_states(fname, indices=[1])
+    assert_almost_equal(updater.states[1][0], states[1][0])
+
+    # files with pickled states are still loaded
+    with open(fname, 'wb') as fout:
+        fout.write(trainer._updaters[0].get_states(dump_optimizer=True))
+    trainer2.load_states(fname)
+    for a, b in zip(trainer2._updaters[0].states[0], states[0]):
+        assert_almost_equal(a, b)
+
+
+def test_updater_save_load_states_objects(tmpdir):
+    # states of custom optimizers may hold values without a JSON form
+    updater = mx.optimizer.get_updater(mx.optimizer.SGD())
+    updater.states = {0: {'step': 3, 'momentum': mx.nd.ones((2,))},
+                      1: (mx.nd.zeros((3,)), np.arange(4), 'name', 0.5),
+                      2: None}
+    fname = os.path.join(str(tmpdir), 'objects.states')
+    updater.save_states(fname)
+    updater2 = mx.optimizer.get_updater(mx.optimizer.SGD())
+    updater2.load_states(fname)
+    assert set(updater2.states) == {0, 1, 2}
+    assert updater2.states[0]['step'] == 3
+    assert_almost_equal(updater2.states[0]['momentum'], np.ones((2,)))
+    arr, idx, name, value = updater2.states[1]
+    assert isinstance(arr, mx.nd.NDArray)
+    assert_almost_equal(arr, np.zeros((3,)))
+    assert (idx == np.arange(4)).all()
+    assert name == 'name' and value == 0.5
+    assert updater2.states[2] is None
+
 def test_trainer_multi_layer_init():
     class Net(gluon.Block):
         def __init__(self, **kwargs):
@@ -350,6 +418,184 @@ def test_trainer_allreduce_hybridsequential():
     trainer.allreduce_grads()
 
 
+@pytest.mark.parametrize('bucket_size', [1, 64, 1 << 20])
+def test_trainer_bucket_allreduce(bucket_size):
+    contexts = [mx.cpu(0), mx.cpu(1)]
+    net = mx.gluon.nn.HybridSequential()
+    for _ in range(4):
+        net.add(mx.gluon.nn.Dense(3))
+    net.initialize(mx.init.Uniform(), ctx=contexts)
+    trainer = mx.gluon.Trainer(net.collect_params(), 'sgd', update_on_kvstore=False,
+                               bucket_size=bucket_size)
+    x = mx.nd.random.uniform(shape=(2, 5))
+    for i, ctx in enumerate(contexts):
+        with mx.autograd.record():
+            out = net(x.as_in_context(ctx) * (i + 1))
+        out.backward()
+    params = list(net.collect_params().values())
+    expected = [sum(g.asnumpy() for g in p.list_grad()) for p in params]
+    trainer.allreduce_grads()
+    for p, e in zip(params, expected):
+        for g in p.list_grad():
+            assert_almost_equal(g.asnumpy(), e, rtol=1e-5, atol=1e-6)
+    num_buckets = len(trainer._grad_buckets)
+    assert sum(len(b.indices) for b in trainer._grad_buckets) == len(params)
+    if bucket_size == 1:
+        assert num_buckets == len(params)
+    elif bucket_size == 1 << 20:
+        assert num_buckets == 1
+    trainer.allreduce_grads()
+    assert len(trainer._grad_buckets) == num_buckets
+
+
+@pytest.mark.parametrize('bucket_size', [None, 1 << 20])
+def test_trainer_overlap_backward(bucket_size):
+    contexts = [mx.cpu(0), mx.cpu(1)]
+    x = mx.nd.random.uniform(shape=(2, 5))
+    nets, trainers = [], []
+    for overlap_backward in [False, True]:
+        net = mx.gluon.nn.Dense(3, in_units=5)
+        net.initialize(mx.init.One(), ctx=contexts)
+        nets.append(net)
+        trainers.append(mx.gluon.Trainer(net.collect_params(), 'sgd', {'learning_rate': 0.1},
+                                         update_on_kvstore=False, bucket_size=bucket_size,
+                                         overlap_backward=overlap_backward))
+    for _ in range(2):
+        for net, trainer in zip(nets, trainers):
+            for i, ctx in enumerate(contexts):
+                with mx.autograd.record():
+                    out = net(x.as_in_context(ctx) * (i + 1))
+                out.backward()
+            if trainer._grads_reduced:
+                # reduced by backward on the last context, before step
+                grads = net.weight.list_grad()
+                assert_almost_equal(grads[0].asnumpy(), grads[1].asnumpy())
+            trainer.step(1)
+        assert trainers[1]._grads_reduced is False
+        for p0, p1 in zip(nets[0].collect_params().values(), nets[1].collect_params().values()):
+            assert_almost_equal(p0.data(contexts[1]).asnumpy(), p1.data(contexts[1]).asnumpy())
+    del trainers[1]
+    assert len(mx.autograd._BACKWARD_HOOKS) == 1
+    with mx.autograd.record():
+        out = nets[1](x)
+    out.backward()
+    assert not mx.autograd._BACKWARD_HOOKS
+
+
+def test_trainer_overlap_backward_other_graphs():
+    contexts = [mx.cpu(0), mx.cpu(1)]
+    x = mx.nd.random.uniform(shape=(2, 5))
+    nets, trainers = [], []
+    for overlap_backward in [False, True]:
+        net = mx.gluon.nn.Dense(3, in_units=5)
+        net.initialize(mx.init.One(), ctx=contexts)
+        nets.append(net)
+        trainers.append(mx.gluon.Trainer(net.collect_params(), 'sgd', {'learning_rate': 0.1},
+                                         update_on_kvstore=False,
+                                         overlap_backward=overlap_backward))
+    other = mx.gluon.nn.Dense(3, in_units=5)
+    other.initialize(ctx=contexts)
+
+    def backward(net, ctx, scale):
+        with mx.autograd.record():
+            out = net(x.as_in_context(ctx) * scale)
+        out.backward()
+
+    for net, trainer in zip(nets, trainers):
+        for i, ctx in enumerate(contexts):
+            backward(net, ctx, i + 1)
+            # a pass that does not reach the parameters of the trainer is ignored,
+            # and leaves the fresh gradient flags as they were
+            backward(other, ctx, 1)
+            assert net.weight.data(ctx)._fresh_grad
+        assert trainer._grads_reduced is (trainer is trainers[1])
+        # the gradients are overwritten after the reduction was issued, and reduced again
+        backward(net, contexts[0], 3)
+        assert not trainer._grads_reduced
+        backward(net, contexts[1], 4)
+        assert trainer._grads_reduced is (trainer is trainers[1])
+        trainer.step(1)
+    for p0, p1 in zip(nets[0].collect_params().values(), nets[1].collect_params().values()):
+        for ctx in contexts:
+            assert_almost_equal(p0.data(ctx).asnumpy(), p1.data(ctx).asnumpy())
+
+    # overwriting the reduced gradients on some of the contexts only cannot be undone
+    for ctx in contexts:
+        backward(nets[1], ctx, 1)
+    backward(nets[1], contexts[0], 2)
+    with pytest.raises(RuntimeError):
+        trainers[1].step(1)
+    for ctx in contexts:
+        backward(nets[1], ctx, 1)
+    trainers[1].step(1)
+
+
+def test_trainer_max_grad_norm():
+    contexts = [mx.cpu(0), mx.cpu(1)]
+    x = mx.nd.ones((2, 4))
+    net = mx.gluon.nn.Dense(1, in_units=4, use_bias=False)
+    net.initialize(mx.init.One(), ctx=contexts)
+    trainer = mx.gluon.Trainer(net.collect_params(), 'sgd', {'learning_rate': 1},
+                               update_on_kvstore=False, max_grad_norm=1.0)
+    assert trainer.grad_norm is None
+    for ctx in contexts:
+        with mx.autograd.record():
+            out = net(x.as_in_context(ctx))
+        out.backward()
+    # each gradient is 2 per context, 4 after reduction and 2 after normalization
+    trainer.step(2)
+    assert_almost_equal(trainer.grad_norm.asnumpy(), np.array([4.0]))
+    assert trainer.grad_norm_isfinite.asscalar() == 1
+    for ctx in contexts:
+        assert_almost_equal(net.weight.data(ctx).asnumpy(), np.ones((1, 4)) - 0.5)
+
+    net.weight.set_data(mx.nd.ones((1, 4)))
+    for ctx in contexts:
+        with mx.autograd.record():
+            out = net(x.as_in_context(ctx)) * float('inf')
+        out.backward()
+    trainer.step(2)
+    assert trainer.grad_norm_isfinite.asscalar() == 0
+
+    # without kvstore the gradients of the contexts are not reduced to a common norm
+    trainer = mx.gluon.Trainer(net.collect_params(), 'sgd', {'learning_rate': 1},
+                               kvstore=None, max_grad_norm=1.0)
+    for ctx in contexts:
+        with mx.autograd.record():
+            out = net(x.as_in_context(ctx))
+        out.backward()
+    with pytest.raises(AssertionError):
+        trainer.step(2)
+
+
+def test_trainer_async_loss_scale():
+    from mxnet import amp
+    from mxnet.amp.loss_scaler import AsyncLossScaler
+    x = mx.nd.ones((2, 4))
+    net = mx.gluon.nn.Dense(1, in_units=4, use_bias=False)
+    net.initialize(mx.init.One())
+    trainer = mx.gluon.Trainer(net.collect_params(), 'adamw', {'learning_rate': 0.1},
+                               update_on_kvstore=False)
+    loss_scaler = AsyncLossScaler()
+    loss_scaler._scale_seq_len = 2
+    trainer._amp_loss_scaler = loss_scaler
+    trainer._amp_original_scale = trainer._scale
+    # an overflow halves the scale, two finite steps in a row double it
+    for factor, expected_scale in [(1., 2.**16), (float('inf'), 2.**15),
+                                   (1., 2.**15), (1., 2.**16)]:
+        weight = net.weight.data().asnumpy()
+        with mx.autograd.record():
+            out = net(x) * factor
+            with amp.scale_loss(out, trainer) as scaled_out:
+                scaled_out.backward()
+        trainer.step(1)
+        assert loss_scaler.loss_scale == expected_scale
+        if factor == 1.:
+            assert (net.weight.data().asnumpy() < weight).all()
+        else:
+            assert_almost_equal(net.weight.data().asnumpy(), weight)
+
+
 def test_trainer_share_parameters():
     class Net(gluon.Block):
         def __init__(self, **kwargs):
@@ -16,6 +16,7 @@
 # under the License.
 
 import os
+import random
 import mxnet as mx
 import numpy as np
 import scipy.ndimage
@@ -250,6 +251,41 @@ class TestImage(unittest.TestCase):
                 ]
                 _test_imageiter_last_batch(imageiter_list, (2, 3, 224, 224))
 
+    def test_imageiter_num_workers(self):
+        im_list = [[k, x] for k, x in enumerate(self.IMAGES)]
+        for last_batch_handle in ['pad', 'discard', 'roll_over']:
+            iters = [mx.image.ImageIter(3, (3, 224, 224), label_width=1, imglist=im_list,
+                                        path_root=self.IMAGES_DIR, resize=256,
+                                        last_batch_handle=last_batch_handle,
+                                        num_workers=num_workers, prefetch=2)
+                     for num_workers in [0, 2]]
+            for _ in range(3):
+                batches = [[(b.data[0].asnumpy(), b.label[0].asnumpy(), b.pad) for b in it]
+                           for it in iters]
+                assert len(batches[0]) == len(batches[1])
+                for (data, label, pad), (data2, label2, pad2) in zip(*batches):
+                    assert_almost_equal(data, data2)
+                    assert_almost_equal(label, label2)
+                    assert pad == pad2
+                for it in iters:
+                    it.reset()
+
+        # random augmenters give the same images for a fixed seed
+        batches = []
+        for num_workers in [1, 2, 3]:
+            random.seed(1)
+            np.random.seed(1)
+            it = mx.image.ImageIter(3, (3, 224, 224), label_width=1, imglist=im_list,
+                                    path_root=self.IMAGES_DIR, resize=256, rand_crop=True,
+                                    rand_mirror=True, brightness=0.3, pca_noise=0.1,
+                                    shuffle=True, num_workers=num_workers, prefetch=2)
+            batches.append([(b.data[0].asnumpy(), b.label[0].asnumpy()) for b in it])
+        for other in batches[1:]:
+            assert len(other) == len(batches[0])
+            for (data, label), (data2, label2) in zip(batches[0], other):
+                assert_almost_equal(data, data2)
+                assert_almost_equal(label, label2)
+
     def test_copyMakeBorder(self):
         try:
             import cv2
@@ -296,6 +332,38 @@ class TestImage(unittest.TestCase):
         for batch in test_iter:
             pass
 
+    def test_fused_color_aug(self):
+        src = mx.nd.array(np.random.uniform(0, 255, size=(32, 24, 3)), dtype='uint8')
+        kwargs = dict(data_shape=(3, 24, 24), mean=True, std=True, brightness=0.2,
+                      contrast=0.2, saturation=0.2, hue=0.1, pca_noise=0.1, rand_gray=0.5)
+        augs = mx.image.CreateAugmenter(**kwargs)
+        fused = mx.image.CreateAugmenter(fuse=True, **kwargs)
+        assert isinstance(fused[-1], mx.image.FusedColorAug)
+        assert len(fused) == 2
+        for seed in range(4):
+            outputs = []
+            for auglist in [augs, fused]:
+                random.seed(seed)
+                np.random.seed(seed)
+                data = src
+                for aug in auglist:
+                    data = aug(data)
+                outputs.append(data.asnumpy())
+            assert_almost_equal(outputs[0], outputs[1], rtol=1e-3, atol=1e-3)
+
+    def test_imageiter_batched_tail(self):
+        im_list = [[k, x] for k, x in enumerate(self.IMAGES)]
+        iters = [mx.image.ImageIter(2, (3, 224, 224), label_width=1, imglist=im_list,
+                                    path_root=self.IMAGES_DIR, resize=256, mean=True, std=True,
+                                    batched_tail=batched_tail)
+                 for batched_tail in [False, True]]
+        assert iters[1]._num_batch_augs == 2
+        for batch, batch2 in zip(*iters):
+            assert batch2.data[0].shape == batch.data[0].shape
+            assert_almost_equal(batch.data[0].asnumpy(), batch2.data[0].asnumpy(),
+                                rtol=1e-4, atol=1e-4)
+            assert_almost_equal(batch.label[0].asnumpy(), batch2.label[0].asnumpy())
+
     def test_image_detiter(self):
         im_list = [_generate_objects() + [x] for x in self.IMAGES]
         det_iter = mx.image.ImageDetIter(2, (3, 300, 300), imglist=im_list, path_root=self.IMAGES_DIR)
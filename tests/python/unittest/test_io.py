@@ -231,6 +231,44 @@ def test_NDArrayIter():
     _test_corner_case()
 
 
+def test_NDArrayIter_lazy_shuffle():
+    data = mx.nd.array(np.arange(100).reshape((50, 2)))
+    labels = np.arange(50)
+    dataiter = mx.io.NDArrayIter(data, labels, 8, True, last_batch_handle='discard')
+    # only the indices are shuffled, the source arrays are not copied
+    assert dataiter.data[0][1] is data
+    for epoch in range(2):
+        dataiter.reset()
+        seen = []
+        for i, batch in enumerate(dataiter):
+            idx = dataiter.idx[i * 8:(i + 1) * 8]
+            assert np.array_equal(batch.data[0].asnumpy(), data.asnumpy()[idx])
+            assert np.array_equal(batch.label[0].asnumpy(), labels[idx])
+            seen.extend(idx)
+        assert len(set(seen)) == 48
+
+    dataiter = mx.io.NDArrayIter(data, labels, 5, True, shuffle_chunk_size=10)
+    for batch in dataiter:
+        pass
+    assert sorted(dataiter.idx) == list(range(50))
+    # every chunk of 10 consecutive samples stays together
+    for i in range(0, 50, 10):
+        assert len(set(dataiter.idx[i:i + 10] // 10)) == 1
+
+
+@mx.util.use_np
+def test_NDArrayIter_lazy_shuffle_np():
+    data = mx.np.arange(100, dtype='float32').reshape((50, 2))
+    labels = mx.np.arange(50, dtype='float32')
+    dataiter = mx.io.NDArrayIter(data, labels, 8, True, last_batch_handle='discard')
+    for i, batch in enumerate(dataiter):
+        idx = dataiter.idx[i * 8:(i + 1) * 8]
+        assert isinstance(batch.data[0], mx.np.ndarray)
+        assert np.array_equal(batch.data[0].asnumpy(), data.asnumpy()[idx])
+        assert np.array_equal(batch.label[0].asnumpy(), labels.asnumpy()[idx])
+    assert i == 5
+
+
 def test_NDArrayIter_h5py():
     if not h5py:
         return
@@ -248,6 +286,15 @@ def test_NDArrayIter_h5py():
         _test_last_batch_handle(f['data'], f['label'])
         _test_last_batch_handle(f['data'], [])
         _test_last_batch_handle(f['data'])
+
+        for chunk_size in [None, 7]:
+            dataiter = mx.io.NDArrayIter(f['data'], f['label'], 10, True,
+                                         last_batch_handle='discard',
+                                         shuffle_chunk_size=chunk_size)
+            for i, batch in enumerate(dataiter):
+                idx = dataiter.idx[i * 10:(i + 1) * 10]
+                assert_almost_equal(batch.data[0].asnumpy(), data[idx])
+                assert_almost_equal(batch.label[0].asnumpy(), labels[idx])
     try:
         os.remove("ndarraytest.h5")
     except OSError:
@@ -16,12 +16,20 @@
 # under the License.
 
 # pylint: skip-file
+import os
+import struct
+import subprocess
 import sys
 import mxnet as mx
 import numpy as np
+import pickle
+import pytest
 import random
 import string
 
+curr_path = os.path.dirname(os.path.abspath(os.path.expanduser(__file__)))
+tools_path = os.path.join(curr_path, '../../../tools')
+
 def test_recordio(tmpdir):
     frec = tmpdir.join('rec')
     N = 255
@@ -54,6 +62,67 @@ def test_indexed_recordio(tmpdir):
         res = reader.read_idx(i)
         assert res == bytes(str(chr(i)), 'utf-8')
 
+def test_indexed_recordio_mmap(tmpdir):
+    fidx = tmpdir.join('idx')
+    frec = tmpdir.join('rec')
+    N = 255
+    magic = b'\x0a\x23\xd7\xce'
+    # records containing the magic number at aligned offsets are split on disk
+    records = [bytes(str(chr(i)), 'utf-8') * (i % 7) for i in range(N)]
+    records[10] = b'abcd' + magic + b'efgh' + magic
+    records[20] = magic + magic + b'xyz'
+
+    writer = mx.recordio.MXIndexedRecordIO(str(fidx), str(frec), 'w')
+    for i in range(N):
+        writer.write_idx(i, records[i])
+    del writer
+
+    reader = mx.recordio.MXIndexedRecordIO(str(fidx), str(frec), 'r', use_mmap=True)
+    keys = reader.keys
+    assert sorted(keys) == [i for i in range(N)]
+    random.shuffle(keys)
+    for i in keys:
+        res = reader.read_idx(i)
+        assert bytes(res) == records[i]
+    reader.reset()
+    for i in range(N):
+        assert bytes(reader.read()) == records[i]
+    assert reader.read() is None
+
+    header = mx.recordio.IRHeader(0, [1.0, 2.0], 7, 0)
+    writer = mx.recordio.MXIndexedRecordIO(str(fidx), str(frec), 'w')
+    writer.write_idx(0, mx.recordio.pack(header, b'payload'))
+    del writer
+    reader = mx.recordio.MXIndexedRecordIO(str(fidx), str(frec), 'r', use_mmap=True)
+    rheader, rcontent = mx.recordio.unpack(reader.read_idx(0))
+    assert isinstance(rcontent, memoryview)
+    assert (rheader.label == np.array([1.0, 2.0], dtype=np.float32)).all()
+    assert bytes(rcontent) == b'payload'
+
+    # pickling keeps the mapping of the sender open
+    copy = pickle.loads(pickle.dumps(reader))
+    assert reader.is_open and copy.is_open
+    assert bytes(reader.read_idx(0)) == bytes(copy.read_idx(0))
+
+def test_indexed_recordio_read_batch(tmpdir):
+    fidx = tmpdir.join('idx')
+    frec = tmpdir.join('rec')
+    N = 255
+    records = [bytes(str(chr(i)), 'utf-8') * (i % 13) for i in range(N)]
+
+    writer = mx.recordio.MXIndexedRecordIO(str(fidx), str(frec), 'w')
+    for i in range(N):
+        writer.write_idx(i, records[i])
+    del writer
+
+    for use_mmap in [False, True]:
+        reader = mx.recordio.MXIndexedRecordIO(str(fidx), str(frec), 'r', use_mmap=use_mmap)
+        for max_gap in [0, 64, 1 << 20]:
+            idxs = [random.randrange(N) for _ in range(64)] + [0, N - 1]
+            res = reader.read_batch(idxs, max_gap=max_gap)
+            assert [bytes(r) for r in res] == [records[i] for i in idxs]
+        reader.close()
+
 def test_recordio_pack_label():
     N = 255
 
@@ -67,3 +136,129 @@ def test_recordio_pack_label():
             rheader, rcontent = mx.recordio.unpack(s)
             assert (label == rheader.label).all()
             assert content == rcontent
+
+
+def _read_records(prefix):
+    reader = mx.recordio.MXIndexedRecordIO(prefix + '.idx', prefix + '.rec', 'r')
+    records = [(key, reader.read_idx(key)) for key in reader.keys]
+    reader.close()
+    return records
+
+
+def _im2rec(*args):
+    subprocess.check_call([sys.executable, os.path.join(tools_path, 'im2rec.py')] +
+                          list(args))
+
+
+def test_im2rec_shards_resume(tmpdir):
+    cv2 = pytest.importorskip('cv2')
+    root = str(tmpdir.mkdir('images'))
+    prefix = os.path.join(str(tmpdir), 'data')
+    num_images = 11
+    with open(prefix + '.lst', 'w') as flst:
+        for i in range(num_images):
+            img = np.random.randint(0, 256, size=(8 + i, 10, 3), dtype=np.uint8)
+            cv2.imwrite(os.path.join(root, '%d.png' % i), img)
+            # keys differ from the list positions
+            flst.write('%d\t%f\t%d.png\n' % (100 + i, i % 3, i))
+
+    _im2rec(prefix, root, '--pass-through')
+    expected = _read_records(prefix)
+    assert [key for key, _ in expected] == list(range(100, 100 + num_images))
+
+    def check_shards():
+        for shard in range(2):
+            shard_prefix = '%s_shard%d' % (prefix, shard)
+            assert _read_records(shard_prefix) == expected[shard::2]
+            assert not os.path.exists(shard_prefix + '.progress')
+
+    _im2rec(prefix, root, '--pass-through', '--num-shards', '2')
+    check_shards()
+
+    # interrupt shard 0 in the middle of its fourth record, after checkpoints that
+    # claim two and four of its records
+    shard_prefix = prefix + '_shard0'
+    with open(shard_prefix + '.idx') as fidx:
+        lines = fidx.readlines()
+    offset = int(lines[3].split('\t')[1])
+    with open(shard_prefix + '.rec', 'r+b') as frec:
+        frec.truncate(offset + 10)
+    with open(shard_prefix + '.idx', 'w') as fidx:
+        fidx.write(''.join(lines[:4]) + lines[4][:2])
+    with open(shard_prefix + '.progress', 'w') as fprogress:
+        fprogress.write('0\t0\n3\t2\n7\t4\n')
+    shard1_mtime = os.path.getmtime(prefix + '_shard1.rec')
+
+    _im2rec(prefix, root, '--pass-through', '--num-shards', '2', '--resume')
+    check_shards()
+    # the complete shard is not written again
+    assert os.path.getmtime(prefix + '_shard1.rec') == shard1_mtime
+
+
+def _rec2idx():
+    sys.path.insert(0, tools_path)
+    try:
+        import rec2idx
+    finally:
+        sys.path.remove(tools_path)
+    return rec2idx
+
+
+def test_rec2idx_build_index(tmpdir):
+    rec2idx = _rec2idx()
+    frec = str(tmpdir.join('rec'))
+    magic = struct.pack('<I', 0xced7230a)
+    # the writer splits records around an aligned magic number into parts with
+    # continuation flags 1, 2 and 3
+    payloads = [b'a', magic + b'head', b'abcd' + magic + b'efgh',
+                b'1234' + magic + b'5678' + magic + b'tail', b'xyz' * 100, b'']
+    payloads = payloads * 5
+    writer = mx.recordio.MXRecordIO(frec, 'w')
+    for payload in payloads:
+        writer.write(payload)
+    writer.close()
+
+    creator = rec2idx.IndexCreator(frec, str(tmpdir.join('slow.idx')))
+    creator.create_index()
+    creator.close()
+    for buffer_size in [16, 64, 1 << 20]:
+        fidx = str(tmpdir.join('fast.idx'))
+        assert rec2idx.build_index(frec, fidx, buffer_size=buffer_size) == len(payloads)
+        assert tmpdir.join('fast.idx').read() == tmpdir.join('slow.idx').read()
+    reader = mx.recordio.MXIndexedRecordIO(fidx, frec, 'r')
+    assert [reader.read_idx(i) for i in range(len(payloads))] == payloads
+    reader.close()
+
+
+def test_rec2idx_verify_index(tmpdir):
+    rec2idx = _rec2idx()
+    frec = str(tmpdir.join('rec'))
+    fidx = str(tmpdir.join('idx'))
+    writer = mx.recordio.MXIndexedRecordIO(fidx, frec, 'w')
+    for i in range(50):
+        writer.write_idx(i, b'record %d' % i * (i % 7 + 1))
+    writer.close()
+    assert rec2idx.verify_index(frec, fidx, num_threads=4, buffer_size=64) == []
+    with open(fidx) as f:
+        lines = f.readlines()
+
+    def verify(lines, record=frec):
+        with open(fidx, 'w') as f:
+            f.write(''.join(lines))
+        return rec2idx.verify_index(record, fidx, num_threads=4, buffer_size=64)
+
+    key, offset = lines[20].split('\t')
+    errors = verify(lines[:20] + ['%s\t%d\n' % (key, int(offset) + 4)] + lines[21:])
+    assert errors
+    errors = verify(lines[:20] + [lines[19].split('\t')[0] + '\t' + offset] + lines[21:])
+    assert any('Duplicate key' in e for e in errors)
+    errors = verify(lines + ['50\t' + offset])
+    assert any('Duplicate offset' in e for e in errors)
+    errors = verify(lines[:20] + lines[21:])
+    assert any('not indexed' in e for e in errors)
+
+    verify(lines)
+    truncated = str(tmpdir.join('truncated'))
+    with open(frec, 'rb') as fin, open(truncated, 'wb') as fout:
+        fout.write(fin.read()[:-5])
+    assert rec2idx.verify_index(truncated, fidx, num_threads=4, buffer_size=64)
@@ -55,6 +55,10 @@ def parse_args():
                         help='the optimizer set to kvstore. None means no optimizer')
     parser.add_argument('--gc-type', type=str, default='none',
                         help='type of gradient compression')
+    parser.add_argument('--bucket-size', type=int, default=0,
+                        help='if positive, pack the arrays into buckets of about this many bytes '
+                             'in reverse order and communicate one key per bucket, '
+                             'as gluon.Trainer(bucket_size=...) does')
     args = parser.parse_args()
     logging.info(args)
     return args
@@ -73,8 +77,20 @@ def error(gpu_res, cpu_res):
     res /= sum([np.sum(np.abs(g.asnumpy())) for g in cpu_res])
     return res
 
+def get_buckets(shapes, bucket_size):
+    buckets, bucket, nbytes = [], [], 0
+    for i in reversed(range(len(shapes))):
+        bucket.append(i)
+        nbytes += reduce(lambda x,y : x*y, shapes[i], 1) * 4
+        if nbytes >= bucket_size:
+            buckets.append(bucket)
+            bucket, nbytes = [], 0
+    if bucket:
+        buckets.append(bucket)
+    return buckets
+
 def run(network, optimizer, gpus, kv_store, image_shape, disp_batches,
-        num_batches, test_results, gc_type, **kwargs):
+        num_batches, test_results, gc_type, bucket_size=0, **kwargs):
     # create kvstore and optimizer
     devs = [mx.gpu(int(i)) for i in gpus.split(',')]
     kv = mx.kv.create(kv_store)
@@ -96,13 +112,30 @@ def run(network, optimizer, gpus, kv_store, image_shape, disp_batches,
     size = float(sum([reduce(lambda x,y : x*y, s, 1) for s in shapes])) * 4 / 1e6
     logging.info('num of arrays = %d, total size = %f MB' % (len(shapes), size))
 
-    for i, s in enumerate(shapes):
-        kv.init(i, mx.nd.zeros(s))
-
     grads_val = [[mx.random.uniform(-1,1,shape=s) for d in devs] for s in shapes]
     grads = [[g.as_in_context(d) for g, d in zip(gs, devs)] for gs in grads_val]
     weights = [[mx.nd.zeros(s, d) for d in devs] for s in shapes]
 
+    if bucket_size > 0:
+        buckets = get_buckets(shapes, bucket_size)
+        logging.info('num of buckets = %d' % len(buckets))
+        def flat_buffers(arrays):
+            bufs, views = [], []
+            for bucket in buckets:
+                sizes = [arrays[i][0].size for i in bucket]
+                offsets = np.cumsum([0] + sizes)
+                bufs.append([mx.nd.zeros((offsets[-1],), d) for d in devs])
+                views.append([[buf[offsets[j]:offsets[j+1]].reshape(arrays[i][0].shape)
+                               for j, i in enumerate(bucket)] for buf in bufs[-1]])
+            return bufs, views
+        grad_bufs, grad_views = flat_buffers(grads)
+        weight_bufs, weight_views = flat_buffers(weights)
+        for k, bufs in enumerate(grad_bufs):
+            kv.init(k, mx.nd.zeros(bufs[0].shape))
+    else:
+        for i, s in enumerate(shapes):
+            kv.init(i, mx.nd.zeros(s))
+
     cpu_grads = [mx.nd.array(sum([g.asnumpy() for g in gs]))*kv.num_workers for gs in grads_val]
     cpu_weights = [mx.nd.zeros(s) for s in shapes]
     toc = 0
@@ -111,11 +144,22 @@ def run(network, optimizer, gpus, kv_store, image_shape, disp_batches,
     res = []
     for b in range(0, num_batches+1):
         tic = time.time()
-        for i,g in enumerate(grads):
-            kv.push(i, g, i)
+        if bucket_size > 0:
+            for k, bucket in enumerate(buckets):
+                for d in range(len(devs)):
+                    for j, i in enumerate(bucket):
+                        grads[i][d].copyto(grad_views[k][d][j])
+                kv.push(k, grad_bufs[k], -min(bucket))
+                kv.pull(k, weight_bufs[k], -min(bucket))
+                for d in range(len(devs)):
+                    for j, i in enumerate(bucket):
+                        weight_views[k][d][j].copyto(weights[i][d])
+        else:
+            for i,g in enumerate(grads):
+                kv.push(i, g, i)
 
-        for i,w in enumerate(weights):
-            kv.pull(i, w, i)
+            for i,w in enumerate(weights):
+                kv.pull(i, w, i)
         for ws in weights:
             for w in ws:
                 w.wait_to_read()
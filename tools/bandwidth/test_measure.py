@@ -42,3 +42,5 @@ if __name__ == '__main__':
     test_measure(gpus=gpus, network='inception-bn', optimizer=None, kv_store='local')
     test_measure(gpus=gpus, network='resnet', optimizer=None, kv_store='local')
     test_measure(gpus=gpus, network='resnet', optimizer='sgd', kv_store='local')
+    test_measure(gpus=gpus, network='resnet', optimizer=None, kv_store='device',
+                 gc_type='none', bucket_size=1 << 22)
@@ -27,6 +27,8 @@ import mxnet as mx
 import random
 import argparse
 import cv2
+import functools
+import struct
 import time
 import traceback
 
@@ -147,14 +149,15 @@ def read_list(path_in):
                 continue
             yield item
 
-def image_encode(args, i, item, q_out):
-    """Reads, preprocesses, packs the image and put it back in output queue.
+def encode_item(args, item):
+    """Reads, preprocesses and packs the image of one list item.
     Parameters
     ----------
     args: object
-    i: int
     item: list
-    q_out: queue
+    Returns
+    -------
+    packed record, or None if the image could not be read or packed
     """
     fullpath = os.path.join(args.root, item[1])
 
@@ -167,25 +170,21 @@ def image_encode(args, i, item, q_out):
         try:
             with open(fullpath, 'rb') as fin:
                 img = fin.read()
-            s = mx.recordio.pack(header, img)
-            q_out.put((i, s, item))
+            return mx.recordio.pack(header, img)
         except Exception as e:
             traceback.print_exc()
             print('pack_img error:', item[1], e)
-            q_out.put((i, None, item))
-        return
+            return None
 
     try:
         img = cv2.imread(fullpath, args.color)
     except:
         traceback.print_exc()
         print('imread error trying to load file: %s ' % fullpath)
-        q_out.put((i, None, item))
-        return
+        return None
     if img is None:
         print('imread read blank (None) image for file: %s' % fullpath)
-        q_out.put((i, None, item))
-        return
+        return None
     if args.center_crop:
         if img.shape[0] > img.shape[1]:
             margin = (img.shape[0] - img.shape[1]) // 2
@@ -201,13 +200,22 @@ def image_encode(args, i, item, q_out):
         img = cv2.resize(img, newsize)
 
     try:
-        s = mx.recordio.pack_img(header, img, quality=args.quality, img_fmt=args.encoding)
-        q_out.put((i, s, item))
+        return mx.recordio.pack_img(header, img, quality=args.quality, img_fmt=args.encoding)
     except Exception as e:
         traceback.print_exc()
         print('pack_img error on file: %s' % fullpath, e)
-        q_out.put((i, None, item))
-        return
+        return None
+
+def image_encode(args, i, item, q_out):
+    """Reads, preprocesses, packs the image and put it back in output queue.
+    Parameters
+    ----------
+    args: object
+    i: int
+    item: list
+    q_out: queue
+    """
+    q_out.put((i, encode_item(args, item), item))
 
 def read_worker(args, q_in, q_out):
     """Function that will be spawned to fetch the image
@@ -262,6 +270,163 @@ def write_worker(q_out, fname, working_dir):
                 pre_time = cur_time
             count += 1
 
+def complete_records(fname_rec, fname_idx):
+    """Finds the leading records of a partially written .rec file whose data
+    is completely on disk. Trailing records that were only partially flushed
+    before the writer was interrupted are ignored.
+    Parameters
+    ----------
+    fname_rec: string
+    fname_idx: string
+    Returns
+    -------
+    keys of the complete records, in file order
+    """
+    if not (os.path.isfile(fname_rec) and os.path.isfile(fname_idx)):
+        return []
+    entries = []
+    with open(fname_idx) as fin:
+        for line in fin:
+            if not line.endswith('\n'):
+                break
+            key, pos = line.strip().split('\t')
+            entries.append((int(key), int(pos)))
+    size = os.path.getsize(fname_rec)
+    # records are contiguous, a record is complete once the next one starts on disk
+    count = 0
+    while count + 1 < len(entries) and entries[count + 1][1] <= size:
+        count += 1
+    if count == len(entries) - 1:
+        with open(fname_rec, 'rb') as fin:
+            fin.seek(entries[count][1])
+            tail = fin.read()
+        try:
+            _, end = mx.recordio._parse_record(tail, 0)
+            if end <= len(tail):
+                count += 1
+        except (struct.error, ValueError):
+            pass
+    return [key for key, _ in entries[:count]]
+
+def resume_shard(fname_rec, fname_idx, fname_progress):
+    """Recovers an interrupted shard from its progress file. The records written
+    up to the last checkpoint that is completely on disk are copied to fresh
+    .rec and .idx files, which are returned open for appending.
+    Parameters
+    ----------
+    fname_rec: string
+    fname_idx: string
+    fname_progress: string
+    Returns
+    -------
+    list position to continue from and the open record writer
+    """
+    # keep the interrupted files aside until their records have been copied, so
+    # that a failure during recovery can be recovered from as well
+    for fname in (fname_rec, fname_idx):
+        if os.path.exists(fname) and not os.path.exists(fname + '.resume'):
+            os.replace(fname, fname + '.resume')
+    keys = complete_records(fname_rec + '.resume', fname_idx + '.resume')
+    position, count = 0, 0
+    with open(fname_progress) as fin:
+        for line in fin:
+            if not line.endswith('\n'):
+                break
+            pos, records = [int(i) for i in line.split('\t')]
+            if records <= len(keys):
+                position, count = pos, records
+    record = mx.recordio.MXIndexedRecordIO(fname_idx, fname_rec, 'w')
+    if count:
+        reader = mx.recordio.MXRecordIO(fname_rec + '.resume', 'r')
+        for key in keys[:count]:
+            record.write_idx(key, reader.read())
+        reader.close()
+    for fname in (fname_rec, fname_idx):
+        if os.path.exists(fname + '.resume'):
+            os.remove(fname + '.resume')
+    with open(fname_progress + '.tmp', 'w') as fout:
+        fout.write('%d\t%d\n' % (position, count))
+    os.replace(fname_progress + '.tmp', fname_progress)
+    print('resuming %s from list position %d with %d records' % (fname_rec, position, count))
+    return position, record
+
+def write_shard(args, make_items, shard_prefix, shard, num_shards):
+    """Function that will be spawned to encode and write one shard. The shard
+    holds every num_shards-th item of the list, starting at item shard, in list
+    order. The list is read by every shard, so images never cross processes.
+    Parameters
+    ----------
+    args: object
+    make_items: callable that returns a new iterator over the list items
+    shard_prefix: string
+    shard: int
+    num_shards: int
+    """
+    fname_rec = shard_prefix + '.rec'
+    fname_idx = shard_prefix + '.idx'
+    fname_progress = shard_prefix + '.progress'
+    if args.resume and os.path.isfile(fname_progress):
+        position, record = resume_shard(fname_rec, fname_idx, fname_progress)
+    elif args.resume and os.path.isfile(fname_rec):
+        print('%s is complete, skipping' % fname_rec)
+        return
+    else:
+        position = 0
+        record = mx.recordio.MXIndexedRecordIO(fname_idx, fname_rec, 'w')
+        with open(fname_progress, 'w') as fout:
+            fout.write('0\t0\n')
+    pre_time = time.time()
+    count = 0
+    with open(fname_progress, 'a') as fprogress:
+        for i, item in enumerate(make_items()):
+            if i % num_shards != shard or i < position:
+                continue
+            s = encode_item(args, item)
+            if s is not None:
+                record.write_idx(item[0], s)
+            count += 1
+            if count % args.checkpoint_interval == 0:
+                # the records may still be buffered, resume_shard only trusts a
+                # checkpoint once its records are found on disk
+                fprogress.write('%d\t%d\n' % (i + 1, len(record.keys)))
+                fprogress.flush()
+            if count % 1000 == 0:
+                cur_time = time.time()
+                print('shard:', shard, ' time:', cur_time - pre_time, ' count:', count)
+                pre_time = cur_time
+    record.close()
+    os.remove(fname_progress)
+
+def write_record_shards(args, make_items, fname, working_dir):
+    """Writes the items to args.num_shards .rec/.idx pairs in parallel, one
+    process per shard. Shard k of list file <name>.lst is written to
+    <name>_shard<k>.rec and <name>_shard<k>.idx in working_dir.
+    Parameters
+    ----------
+    args: object
+    make_items: callable that returns a new iterator over the list items,
+        e.g. functools.partial(read_list, fname). The iterator is consumed
+        lazily, so any generator of items can be packed without loading it
+        into memory.
+    fname: string
+    working_dir: string
+    """
+    name = os.path.splitext(os.path.basename(fname))[0]
+    num_shards = args.num_shards
+    jobs = [(args, make_items, os.path.join(working_dir, '%s_shard%d' % (name, shard)),
+             shard, num_shards) for shard in range(num_shards)]
+    if num_shards > 1 and multiprocessing is not None:
+        processes = [multiprocessing.Process(target=write_shard, args=job) for job in jobs]
+        for p in processes:
+            p.start()
+        for shard, p in enumerate(processes):
+            p.join()
+            if p.exitcode != 0:
+                print('shard %d of %s failed, rerun with --resume to continue it' % (shard, fname))
+    else:
+        for job in jobs:
+            write_shard(*job)
+
 def parse_args():
     """Defines all arguments.
     Returns
@@ -317,6 +482,16 @@ def parse_args():
                         help='specify the encoding of the images.')
     rgroup.add_argument('--pack-label', action='store_true',
         help='Whether to also pack multi dimensional label in the record file')
+    rgroup.add_argument('--num-shards', type=int, default=0,
+                        help='if > 0, write the database as this many <prefix>_shard<k>.rec/.idx\
+        pairs, each encoded and written by its own process in list order. --num-thread is\
+        ignored in this mode.')
+    rgroup.add_argument('--resume', action='store_true',
+                        help='with --num-shards, continue an interrupted run from its last\
+        checkpoint instead of starting over. The number of shards must not change.')
+    rgroup.add_argument('--checkpoint-interval', type=int, default=1000,
+                        help='with --num-shards, number of images per shard between two\
+        progress checkpoints.')
     args = parser.parse_args()
     args.prefix = os.path.abspath(args.prefix)
     args.root = os.path.abspath(args.root)
@@ -342,7 +517,9 @@ if __name__ == '__main__':
                 count += 1
                 image_list = read_list(fname)
                 # -- write_record -- #
-                if args.num_thread > 1 and multiprocessing is not None:
+                if args.num_shards > 0:
+                    write_record_shards(args, functools.partial(read_list, fname), fname, working_dir)
+                elif args.num_thread > 1 and multiprocessing is not None:
                     q_in = [multiprocessing.Queue(1024) for i in range(args.num_thread)]
                     q_out = multiprocessing.Queue(1024)
                     # define the process
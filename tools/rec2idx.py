@@ -17,10 +17,15 @@
 
 from __future__ import print_function
 import os
+import sys
 import time
 import ctypes
+import struct
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from mxnet.base import _LIB
 from mxnet.base import check_call
+from mxnet.recordio import _REC_MAGIC, _REC_HEADER_SIZE, _REC_LENGTH_MASK
 import mxnet as mx
 import argparse
 
@@ -87,12 +92,167 @@ class IndexCreator(mx.recordio.MXRecordIO):
             self.fidx.write('%s\t%d\n'%(str(key), pos))
             counter = counter + 1
 
+def scan_records(frec, start=0, end=None, buffer_size=64 << 20):
+    """Generates the offset of every record in bytes [start, end) of an open
+    record file by decoding the record headers only.
+
+    The file is read sequentially in blocks of `buffer_size` bytes. Payloads
+    that extend past the current block are skipped with a seek instead of being
+    read, and no payload is ever copied into a Python object.
+
+    Parameters
+    ----------
+    frec : file
+        Record file opened in binary mode.
+    start : int
+        Offset of the first record to scan.
+    end : int
+        Offset at which scanning stops, defaults to the file size.
+    buffer_size : int
+        Size of the sequential reads.
+    """
+    if end is None:
+        end = os.fstat(frec.fileno()).st_size
+    buf = bytearray(buffer_size)
+    view = memoryview(buf)
+    buf_start, buf_len = start, 0
+    pos = start
+    while pos < end:
+        if pos + _REC_HEADER_SIZE > buf_start + buf_len:
+            frec.seek(pos)
+            buf_start = pos
+            buf_len = frec.readinto(view[:min(buffer_size, end - pos)])
+            if buf_len < _REC_HEADER_SIZE:
+                raise ValueError('Truncated record header at position %d' % pos)
+        magic, lrec = struct.unpack_from('<II', buf, pos - buf_start)
+        if magic != _REC_MAGIC:
+            raise ValueError('Invalid RecordIO magic number at position %d' % pos)
+        # parts of a record split around an embedded magic number carry
+        # continuation flags 2 and 3, only the first part starts a record
+        if lrec >> 29 in (0, 1):
+            yield pos
+        pos += _REC_HEADER_SIZE + (((lrec & _REC_LENGTH_MASK) + 3) & ~3)
+    if pos > end:
+        raise ValueError('Record before position %d extends past position %d' % (pos, end))
+
+def build_index(record, index, key_type=int, buffer_size=64 << 20):
+    """Creates the index file of a record file, like `IndexCreator`, from a
+    single sequential scan of the record headers.
+
+    Parameters
+    ----------
+    record : str
+        Path to the record file.
+    index : str
+        Path to the index file, that will be created/overwritten.
+    key_type : type
+        Data type for keys (optional, default = int).
+    buffer_size : int
+        Size of the sequential reads.
+
+    Returns
+    -------
+    int
+        Number of indexed records.
+    """
+    with open(record, 'rb') as frec:
+        offsets = list(scan_records(frec, buffer_size=buffer_size))
+    with open(index, 'w') as fidx:
+        fidx.write(''.join(['%s\t%d\n' % (str(key_type(i)), pos)
+                            for i, pos in enumerate(offsets)]))
+    return len(offsets)
+
+def _check_range(record, start, end, expected, buffer_size):
+    """Scans bytes [start, end) of a record file and compares the records found
+    with the indexed offsets `expected`. Returns a list of error messages."""
+    errors = []
+    with open(record, 'rb') as frec:
+        scanned = []
+        try:
+            for pos in scan_records(frec, start, end, buffer_size):
+                scanned.append(pos)
+        except ValueError as e:
+            errors.append(str(e))
+    scanned = np.array(scanned, dtype=np.int64)
+    bad = np.setdiff1d(expected, scanned)
+    if bad.size and not errors:
+        errors.append('%d index entries do not point at a record, first at position %d'
+                      % (bad.size, bad[0]))
+    unindexed = np.setdiff1d(scanned, expected)
+    if unindexed.size:
+        errors.append('%d records are not indexed, first at position %d'
+                      % (unindexed.size, unindexed[0]))
+    return errors
+
+def verify_index(record, index, num_threads=4, buffer_size=64 << 20):
+    """Checks an index file against its record file.
+
+    Every index entry must point at the start of a record and every record must
+    be indexed exactly once. The record file is split at indexed offsets into
+    `num_threads` ranges that are scanned in parallel.
+
+    Parameters
+    ----------
+    record : str
+        Path to the record file.
+    index : str
+        Path to the index file.
+    num_threads : int
+        Number of threads scanning the record file.
+    buffer_size : int
+        Size of the sequential reads of each thread.
+
+    Returns
+    -------
+    list of str
+        Error messages, empty if the index is valid.
+    """
+    errors = []
+    keys = set()
+    offsets = []
+    with open(index) as fidx:
+        for lineno, line in enumerate(fidx, 1):
+            line = line.strip().split('\t')
+            if len(line) != 2 or not line[1].isdigit():
+                errors.append('Malformed line %d in %s' % (lineno, index))
+                continue
+            if line[0] in keys:
+                errors.append('Duplicate key %s in %s' % (line[0], index))
+            keys.add(line[0])
+            offsets.append(int(line[1]))
+    offsets, counts = np.unique(np.array(offsets, dtype=np.int64), return_counts=True)
+    for offset in offsets[counts > 1]:
+        errors.append('Duplicate offset %d in %s' % (offset, index))
+    size = os.path.getsize(record)
+    num_threads = max(1, min(num_threads, offsets.size))
+    # ranges start at indexed offsets, so that each thread knows where a record
+    # starts; the first range also covers any unindexed records before them
+    splits = [offsets.size * i // num_threads for i in range(num_threads + 1)]
+    end = max(size, int(offsets[-1])) if offsets.size else size
+    bounds = [0] + [int(offsets[i]) for i in splits[1:-1]] + [end]
+    with ThreadPoolExecutor(num_threads) as pool:
+        results = [pool.submit(_check_range, record, bounds[i], bounds[i + 1],
+                               offsets[splits[i]:splits[i + 1]], buffer_size)
+                   for i in range(num_threads)]
+        for result in results:
+            errors.extend(result.result())
+    return errors
+
 def parse_args():
     parser = argparse.ArgumentParser(
         formatter_class=argparse.ArgumentDefaultsHelpFormatter,
         description='Create an index file from .rec file')
     parser.add_argument('record', help='path to .rec file.')
     parser.add_argument('index', help='path to index file.')
+    parser.add_argument('--verify', action='store_true',
+                        help='check the existing index file against the record file\
+        instead of creating it.')
+    parser.add_argument('--num-thread', type=int, default=4,
+                        help='number of threads used by --verify.')
+    parser.add_argument('--buffer-size', type=int, default=64,
+                        help='size in MB of the sequential reads from the record file.')
+    parser.add_argument('--slow', action='store_true',
+                        help='create the index by reading every record through IndexCreator.')
     args = parser.parse_args()
     args.record = os.path.abspath(args.record)
     args.index = os.path.abspath(args.index)
@@ -101,6 +261,19 @@ def parse_args():
 
 if __name__ == '__main__':
     args = parse_args()
-    creator = IndexCreator(args.record, args.index)
-    creator.create_index()
-    creator.close()
+    buffer_size = args.buffer_size << 20
+    start = time.time()
+    if args.verify:
+        errors = verify_index(args.record, args.index, args.num_thread, buffer_size)
+        for error in errors:
+            print(error)
+        print('time:', time.time() - start, ' index is', 'invalid' if errors else 'valid')
+        if errors:
+            sys.exit(1)
+    elif args.slow:
+        creator = IndexCreator(args.record, args.index)
+        creator.create_index()
+        creator.close()
+    else:
+        count = build_index(args.record, args.index, buffer_size=buffer_size)
+        print('time:', time.time() - start, ' count:', count)